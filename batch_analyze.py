@@ -0,0 +1,80 @@
+# 文件路径: batch_analyze.py
+# 离线批量分析历史录像 (多进程并行，不受 30FPS 实时播放限制)
+# 用法: python batch_analyze.py data/a.mp4 data/b.mp4 --workers 4 --output report.json
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core.batch_job import (plan_chunks, chunk_key, init_worker, process_chunk, aggregate,
+                            open_checkpoint, append_checkpoint, CheckpointMismatch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线批量视频流量分析")
+    parser.add_argument('videos', nargs='+', help="待分析的视频文件")
+    parser.add_argument('--model', default='weights/yolov8m_cbam.pt')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-seconds', type=float, default=60, help="每个分段的时长 (秒)")
+    parser.add_argument('--overlap', type=int, default=30, help="分段预热帧数 (用于追踪拼接)")
+    parser.add_argument('--speed-limit', type=int, default=60)
+    parser.add_argument('--checkpoint', default='batch_checkpoint.jsonl', help="断点文件，传空字符串关闭")
+    parser.add_argument('--output', default='batch_report.json')
+    args = parser.parse_args()
+
+    chunks = plan_chunks(args.videos, args.chunk_seconds, args.overlap)
+    if not chunks:
+        print("❌ 没有可处理的视频")
+        sys.exit(1)
+
+    # 模型和限速不同，分段结果就不同：写进断点文件头，参数变了不续跑
+    params = {'model': os.path.abspath(args.model), 'speed_limit': args.speed_limit}
+    try:
+        done = open_checkpoint(args.checkpoint, params)
+    except CheckpointMismatch as e:
+        print(f"❌ {e}，请换一个 --checkpoint 路径或删除旧断点文件")
+        sys.exit(1)
+    todo = [c for c in chunks if chunk_key(c) not in done]
+    print(f"📦 共 {len(chunks)} 个分段，已完成 {len(chunks) - len(todo)}，待处理 {len(todo)}")
+
+    threads_per_worker = max(1, (os.cpu_count() or 1) // max(1, args.workers))
+    t0 = time.time()
+    frames_done = 0
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                 initargs=(args.model, threads_per_worker)) as pool:
+            futures = {pool.submit(process_chunk, c, args.speed_limit): c for c in todo}
+            for i, future in enumerate(as_completed(futures), 1):
+                chunk = futures[future]
+                try:
+                    res = future.result()
+                except Exception as e:
+                    print(f"❌ 分段处理失败 {chunk_key(chunk)}: {e}")
+                    continue
+
+                done[res['key']] = res
+                append_checkpoint(args.checkpoint, res)
+                frames_done += res['frames']
+                elapsed = time.time() - t0
+                print(f"✅ [{i}/{len(todo)}] {os.path.basename(res['video'])} 分段 {res['index']} "
+                      f"({res['frames']} 帧, 累计 {frames_done / max(elapsed, 1e-6):.1f} FPS)")
+
+    results = [done[chunk_key(c)] for c in chunks if chunk_key(c) in done]
+    report = aggregate(results)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+
+    missing = len(chunks) - len(results)
+    if missing:
+        print(f"⚠️ 仍有 {missing} 个分段未完成，重新运行同一命令即可续跑")
+    for video, data in report.items():
+        print(f"📊 {os.path.basename(video)}: IN={data['in_count']} OUT={data['out_count']} "
+              f"事件={len(data['events'])}")
+    print(f"💾 报告已写入 {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# 文件路径: benchmarks/db_throughput.py
+# 多线程数据库吞吐测试：连接池 vs 旧版「每次调用都新建连接」
+# 运行方式 (项目根目录): python -m benchmarks.db_throughput --threads 4 --ops 2000
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from database.connection_pool import ConnectionPool
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_type TEXT NOT NULL,
+        camera_id TEXT NOT NULL,
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        snapshot_path TEXT,
+        video_path TEXT,
+        description TEXT
+    )
+'''
+INSERT_SQL = "INSERT INTO events (event_type, camera_id, timestamp, description) VALUES (?, ?, ?, ?)"
+QUERY_SQL = "SELECT id, description FROM events WHERE camera_id = ? ORDER BY id DESC LIMIT 20"
+
+
+class LegacyBackend:
+    """旧实现：每次操作都 connect / commit / close"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def insert(self, row):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute(INSERT_SQL, row)
+        conn.commit()
+        conn.close()
+
+    def query(self, camera_id):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        rows = conn.execute(QUERY_SQL, (camera_id,)).fetchall()
+        conn.close()
+        return rows
+
+
+class PooledBackend:
+    """新实现：线程本地读连接 + 串行化写连接"""
+
+    def __init__(self, db_path):
+        self.pool = ConnectionPool(db_path)
+
+    def insert(self, row):
+        with self.pool.writer() as conn:
+            conn.execute(INSERT_SQL, row)
+
+    def query(self, camera_id):
+        return self.pool.reader().execute(QUERY_SQL, (camera_id,)).fetchall()
+
+
+def run_workload(backend, threads, ops, mode):
+    """每个线程执行 ops 次操作，返回总吞吐 (ops/s)"""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(idx):
+        cam = f"CAM_{idx:02d}"
+        barrier.wait()
+        for i in range(ops):
+            if mode == 'insert':
+                backend.insert(("Traffic Alert", cam, "2025-01-01 00:00:00", f"bench {i}"))
+            else:
+                backend.query(cam)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return threads * ops / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 多线程吞吐测试")
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--ops', type=int, default=2000, help="每个线程的操作次数")
+    args = parser.parse_args()
+
+    print(f"线程数: {args.threads}, 每线程操作: {args.ops}")
+    print(f"{'backend':<10}{'insert ops/s':>16}{'query ops/s':>16}")
+
+    for name, cls in (('legacy', LegacyBackend), ('pooled', PooledBackend)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            conn = sqlite3.connect(db_path)
+            conn.execute(SCHEMA)
+            conn.commit()
+            conn.close()
+
+            backend = cls(db_path)
+            insert_rate = run_workload(backend, args.threads, args.ops, 'insert')
+            query_rate = run_workload(backend, args.threads, args.ops, 'query')
+            if isinstance(backend, PooledBackend):
+                backend.pool.close_all()
+
+        print(f"{name:<10}{insert_rate:>16.0f}{query_rate:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# 文件路径: benchmarks/frame_stride.py
+# 跳帧检测的精度 / 速度权衡测试
+# 运行方式 (项目根目录): python -m benchmarks.frame_stride data/test_video1.mp4 --frames 900
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from core.detector import SmartDetector
+
+
+def run(detector, video, max_frames):
+    """跑一遍视频，返回 (FPS, 进, 出, 每帧目标数序列, 实际推理帧数)"""
+    detector.reset_state()
+    cap = cv2.VideoCapture(video)
+    detector.fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    counts, detected = [], 0
+    info = {}
+
+    t0 = time.perf_counter()
+    while len(counts) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        _, info = detector.process_frame(frame, annotate=False)
+        counts.append(info['current_people'])
+        detected += int(info['detected'])
+    elapsed = time.perf_counter() - t0
+    cap.release()
+
+    return len(counts) / max(elapsed, 1e-6), info.get('in_count', 0), info.get('out_count', 0), \
+        np.array(counts), detected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跳帧检测精度/速度测试")
+    parser.add_argument('video')
+    parser.add_argument('--model', default='weights/yolov8m_cbam.pt')
+    parser.add_argument('--frames', type=int, default=900)
+    parser.add_argument('--strides', default='1,2,3,adaptive', help="逗号分隔，adaptive 表示自适应步长")
+    args = parser.parse_args()
+
+    detector = SmartDetector(model_path=args.model)
+    baseline = None
+
+    print(f"{'stride':<10}{'FPS':>8}{'推理帧':>8}{'IN':>6}{'OUT':>6}{'计数误差(IN+OUT)':>18}{'目标数MAE':>12}")
+    for spec in args.strides.split(','):
+        adaptive = spec == 'adaptive'
+        detector.stride.adaptive = adaptive
+        if not adaptive:
+            detector.stride.stride = int(spec)
+
+        fps, n_in, n_out, counts, detected = run(detector, args.video, args.frames)
+        if baseline is None:
+            baseline = (n_in, n_out, counts)
+
+        base_in, base_out, base_counts = baseline
+        n = min(len(counts), len(base_counts))
+        flow_err = abs((n_in + n_out) - (base_in + base_out)) / max(base_in + base_out, 1)
+        mae = float(np.mean(np.abs(counts[:n] - base_counts[:n]))) if n else 0.0
+        print(f"{spec:<10}{fps:>8.1f}{detected:>8}{n_in:>6}{n_out:>6}{flow_err:>17.1%}{mae:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
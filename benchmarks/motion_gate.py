@@ -0,0 +1,72 @@
+# 文件路径: benchmarks/motion_gate.py
+# 运动门控的 CPU 节省与漏检率测试
+# 运行方式 (项目根目录): python -m benchmarks.motion_gate data/night_clip.mp4 --frames 1800
+import argparse
+import time
+
+import cv2
+
+from core.detector import SmartDetector
+
+
+def run(detector, video, max_frames):
+    """返回 (每帧 CPU 毫秒, 越线事件帧号列表)"""
+    detector.reset_state()
+    cap = cv2.VideoCapture(video)
+    detector.fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    crossings = []
+    frames = 0
+
+    cpu0 = time.process_time()
+    while frames < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        _, info = detector.process_frame(frame, annotate=False)
+        n = sum(info['in_per_class'].values()) + sum(info['out_per_class'].values())
+        crossings.extend([frames] * n)
+        frames += 1
+    cpu = time.process_time() - cpu0
+    cap.release()
+    return cpu * 1000 / max(frames, 1), crossings
+
+
+def missed_rate(baseline, gated, tolerance):
+    """基准里的每个越线事件，在门控结果的 ±tolerance 帧内找不到对应事件即视为漏检"""
+    remaining = list(gated)
+    missed = 0
+    for f in baseline:
+        match = next((g for g in remaining if abs(g - f) <= tolerance), None)
+        if match is None:
+            missed += 1
+        else:
+            remaining.remove(match)
+    return missed / len(baseline) if baseline else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运动门控 CPU/漏检测试")
+    parser.add_argument('video')
+    parser.add_argument('--model', default='weights/yolov8m_cbam.pt')
+    parser.add_argument('--frames', type=int, default=1800)
+    parser.add_argument('--min-area', type=float, default=0.002)
+    parser.add_argument('--force-every', type=int, default=30)
+    args = parser.parse_args()
+
+    plain = SmartDetector(model_path=args.model)
+    gated = SmartDetector(model_path=args.model, motion_gate=True,
+                          motion_min_area=args.min_area, motion_force_every=args.force_every)
+
+    cpu_plain, events_plain = run(plain, args.video, args.frames)
+    cpu_gated, events_gated = run(gated, args.video, args.frames)
+    tolerance = int(plain.fps)  # 同一事件允许 1 秒内的时间偏差
+
+    print(f"无门控: {cpu_plain:.1f} ms/帧 CPU, 越线事件 {len(events_plain)}")
+    print(f"有门控: {cpu_gated:.1f} ms/帧 CPU, 越线事件 {len(events_gated)}, "
+          f"跳过推理 {gated.motion_gate.skip_ratio:.1%}")
+    print(f"CPU 节省: {1 - cpu_gated / max(cpu_plain, 1e-6):.1%}")
+    print(f"漏检率: {missed_rate(events_plain, events_gated, tolerance):.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# 文件路径: benchmarks/precision.py
+# 推理精度模式对比：各模式的单帧推理耗时，以及检测结果和 fp32 的一致程度
+# 运行方式 (项目根目录):
+#   python -m benchmarks.precision data/test_video1.mp4 --frames 200
+#   python -m benchmarks.precision data/test_video1.mp4 --modes fp32,fp16 --channels-last --sahi
+import argparse
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from core.detector import SmartDetector
+from core.precision import compare_detections
+
+
+def read_frames(video, max_frames):
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def run(detector, frames, use_sahi, warmup):
+    """逐帧推理，返回 (每帧检测结果, 每帧毫秒数组)"""
+    for frame in frames[:warmup]:
+        detector._infer(frame, use_sahi)  # 预热 (torch.compile 的编译也在这里完成)
+    results, ms = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        results.append(detector._infer(frame, use_sahi))
+        if detector.device == 'cuda':
+            torch.cuda.synchronize()
+        ms.append((time.perf_counter() - t0) * 1000)
+    return results, np.array(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理精度模式速度/一致性对比")
+    parser.add_argument('video')
+    parser.add_argument('--model', default='weights/yolov8m_cbam.pt')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--modes', default='fp32,fp16,bf16', help="逗号分隔，每个模式都和 fp32 基准对比")
+    parser.add_argument('--channels-last', action='store_true')
+    parser.add_argument('--compile', action='store_true')
+    parser.add_argument('--sahi', action='store_true', help="测 GPU SAHI 切片推理")
+    parser.add_argument('--warmup', type=int, default=5)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    detector = SmartDetector(model_path=args.model, use_sahi=args.sahi)
+    if args.sahi and detector.sahi_agent is None:
+        parser.error("SAHI 不可用")
+
+    # fp32 基准 (不开 channels_last / compile)
+    detector.set_precision("fp32")
+    baseline, base_ms = run(detector, frames, args.sahi, args.warmup)
+
+    print(f"📊 {len(frames)} 帧, 设备 {detector.device}, SAHI={'开' if args.sahi else '关'}")
+    print(f"{'mode':<22}{'ms/帧':>9}{'p95 ms':>9}{'加速':>8}{'一致框':>9}{'置信度差':>10}")
+    print(f"{'fp32 (基准)':<22}{base_ms.mean():>9.2f}{np.percentile(base_ms, 95):>9.2f}{1:>8.2f}x"
+          f"{1:>9.1%}{0:>10.4f}")
+    for mode in args.modes.split(','):
+        detector.set_precision(mode, args.channels_last, args.compile)
+        actual = detector.precision.precision
+        results, ms = run(detector, frames, args.sahi, args.warmup)
+        reports = [compare_detections(ref, res) for ref, res in zip(baseline, results)]
+        agreement = np.mean([r['agreement'] for r in reports]) if reports else 0.0
+        conf_diff = np.mean([r['conf_diff'] for r in reports]) if reports else 0.0
+        label = mode if actual == mode else f"{mode}->{actual}"
+        label += " +CL" * args.channels_last + " +compile" * args.compile
+        print(f"{label:<22}{ms.mean():>9.2f}{np.percentile(ms, 95):>9.2f}"
+              f"{base_ms.mean() / max(ms.mean(), 1e-6):>8.2f}x{agreement:>9.1%}{conf_diff:>10.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# 文件路径: benchmarks/resolution.py
+# 推理输入尺寸对比：固定尺寸 vs 自适应尺寸的单帧耗时和召回率
+# 以 --reference 尺寸 (默认 1280) 的检测结果作为参照，统计各模式找回了多少参照框，小目标单独统计
+# 运行方式 (项目根目录):
+#   python -m benchmarks.resolution data/test_video1.mp4 --frames 300
+#   python -m benchmarks.resolution data/test_video1.mp4 --modes 480,640,adaptive --range 320,960
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.precision import read_frames
+from core.detector import SmartDetector
+from core.trackers import assign, box_iou
+
+
+def match_count(reference, detections, iou_threshold=0.5):
+    """参照框里被找回的 (同类别且 IoU 达标) -> (N,) bool"""
+    found = np.zeros(len(reference), dtype=bool)
+    if not len(reference) or not len(detections):
+        return found
+    iou = box_iou(reference.xyxy, detections.xyxy)
+    iou[reference.class_id[:, None] != detections.class_id[None, :]] = 0
+    rows, _ = assign(1 - iou, 1 - iou_threshold)
+    found[rows] = True
+    return found
+
+
+def run(detector, frames, warmup):
+    """逐帧推理，返回 (每帧检测结果, 每帧毫秒数组, 每帧输入尺寸)"""
+    for frame in frames[:warmup]:
+        detector._infer(frame)
+    detector.resolution.reset()
+    results, ms, sizes = [], [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        results.append(detector._infer(frame))
+        if detector.device == 'cuda':
+            torch.cuda.synchronize()
+        ms.append((time.perf_counter() - t0) * 1000)
+        sizes.append(detector.resolution.last)
+    return results, np.array(ms), np.array(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理输入尺寸速度/召回对比")
+    parser.add_argument('video')
+    parser.add_argument('--model', default='weights/yolov8m_cbam.pt')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--modes', default='320,480,640,960,adaptive', help="逗号分隔，adaptive 表示自适应尺寸")
+    parser.add_argument('--range', default='320,1280', help="自适应尺寸的上下限")
+    parser.add_argument('--reference', type=int, default=1280, help="参照检测用的输入尺寸")
+    parser.add_argument('--small', type=float, default=32, help="短边小于该像素数的参照框算小目标")
+    parser.add_argument('--warmup', type=int, default=5)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    low, high = (int(v) for v in args.range.split(','))
+    detector = SmartDetector(model_path=args.model)
+
+    detector.set_resolution(args.reference, False)
+    reference, ref_ms, _ = run(detector, frames, args.warmup)
+    small = [np.minimum(r.xyxy[:, 2] - r.xyxy[:, 0], r.xyxy[:, 3] - r.xyxy[:, 1]) < args.small for r in reference]
+    n_ref = sum(len(r) for r in reference)
+    n_small = int(sum(s.sum() for s in small))
+
+    print(f"📊 {len(frames)} 帧, 参照尺寸 {args.reference}: {n_ref} 个框 (小目标 {n_small} 个), "
+          f"{ref_ms.mean():.2f} ms/帧")
+    print(f"{'mode':<12}{'平均尺寸':>9}{'ms/帧':>9}{'p95 ms':>9}{'加速':>8}{'召回':>8}{'小目标召回':>11}")
+    for mode in args.modes.split(','):
+        adaptive = mode == 'adaptive'
+        detector.set_resolution(detector.resolution.imgsz if adaptive else int(mode), adaptive, (low, high))
+        results, ms, sizes = run(detector, frames, args.warmup)
+        found = [match_count(ref, res) for ref, res in zip(reference, results)]
+        recall = sum(f.sum() for f in found) / max(n_ref, 1)
+        small_recall = sum(f[s].sum() for f, s in zip(found, small)) / max(n_small, 1)
+        print(f"{mode:<12}{sizes.mean():>9.0f}{ms.mean():>9.2f}{np.percentile(ms, 95):>9.2f}"
+              f"{ref_ms.mean() / max(ms.mean(), 1e-6):>7.2f}x{recall:>8.1%}{small_recall:>11.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# 文件路径: benchmarks/tracker_eval.py
+# 追踪器对比：在标注好的片段上算 MOTA / ID 切换次数，同时统计追踪器每帧 CPU 耗时
+# 标注与检测结果使用 MOTChallenge 格式 (每行: frame, id, x, y, w, h, conf, ...，frame 从 1 开始)
+# 运行方式 (项目根目录):
+#   python -m benchmarks.tracker_eval data/clip/gt.txt --dets data/clip/det.txt --fps 25
+#   python -m benchmarks.tracker_eval data/clip/gt.txt --video data/clip.mp4 --stride 2
+import argparse
+import time
+
+import numpy as np
+import supervision as sv
+
+from core.frame_skipper import TrackPredictor
+from core.trackers import TRACKERS, assign, box_iou, build_tracker
+
+
+def load_mot(path, min_conf=None):
+    """读取 MOT 格式文本 -> {帧号: (ids (K,), xyxy (K, 4), conf (K,))}"""
+    data = np.loadtxt(path, delimiter=',', ndmin=2)
+    if min_conf is not None:
+        data = data[data[:, 6] > min_conf]
+    xyxy = np.concatenate([data[:, 2:4], data[:, 2:4] + data[:, 4:6]], axis=1).astype(np.float32)
+    frames = {}
+    for frame in np.unique(data[:, 0]).astype(int):
+        rows = data[:, 0] == frame
+        frames[frame] = (data[rows, 1].astype(np.int64), xyxy[rows], data[rows, 6].astype(np.float32))
+    return frames
+
+
+def detect_video(video, model_path, max_frames):
+    """用 SmartDetector 的模型跑一遍视频，缓存每帧检测结果 (追踪器计时不含推理)"""
+    import cv2
+    from core.detector import SmartDetector
+
+    detector = SmartDetector(model_path=model_path)
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frames = {}
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames[len(frames) + 1] = detector._infer(frame)
+    cap.release()
+    return frames, fps
+
+
+def to_detections(item):
+    if isinstance(item, sv.Detections):
+        return item
+    _, xyxy, conf = item
+    return sv.Detections(xyxy=xyxy, confidence=conf, class_id=np.zeros(len(xyxy), dtype=int))
+
+
+def run_tracker(kind, detections, n_frames, fps, stride):
+    """
+    按检测步长跑一遍：检测帧更新追踪器，中间帧用 TrackPredictor 外推 (与 SmartDetector 一致)
+    :return: ({帧号: (ids, xyxy)}, 每帧 CPU 毫秒数组)
+    """
+    tracker = build_tracker(kind, fps=fps, stride=stride)
+    predictor = TrackPredictor()
+    hypotheses, cpu_ms = {}, []
+    empty = sv.Detections.empty()
+
+    for frame in range(1, n_frames + 1):
+        t0 = time.process_time()
+        if (frame - 1) % stride == 0:
+            result = tracker.update_with_detections(detections.get(frame, empty))
+            predictor.on_detect(result)
+        else:
+            result = predictor.predict(tracker)
+        cpu_ms.append((time.process_time() - t0) * 1000)
+        if len(result) and result.tracker_id is not None:
+            hypotheses[frame] = (np.asarray(result.tracker_id, dtype=np.int64), result.xyxy)
+    return hypotheses, np.array(cpu_ms)
+
+
+def clear_mot(gt, hypotheses, iou_threshold=0.5):
+    """
+    CLEAR MOT 指标：上一帧的对应关系只要 IoU 还够就保持，其余用匈牙利匹配；
+    某个真值目标匹配到的追踪 ID 变了记一次 ID 切换
+    :return: dict(mota, idsw, fp, fn, gt)
+    """
+    mapping = {}
+    fp = fn = idsw = n_gt = 0
+    for frame in sorted(set(gt) | set(hypotheses)):
+        g_ids, g_boxes = gt[frame][:2] if frame in gt else (np.empty(0, dtype=np.int64), np.empty((0, 4)))
+        h_ids, h_boxes = hypotheses.get(frame, (np.empty(0, dtype=np.int64), np.empty((0, 4))))
+        n_gt += len(g_ids)
+        iou = box_iou(g_boxes, h_boxes)
+        cost = 1 - iou
+
+        # 1. 保持上一帧的对应关系
+        matched = 0
+        h_index = {int(h): j for j, h in enumerate(h_ids)}
+        for i, g in enumerate(g_ids.tolist()):
+            j = h_index.get(mapping.get(g))
+            if j is not None and iou[i, j] >= iou_threshold and np.isfinite(cost[i, j]):
+                cost[i, :] = np.inf
+                cost[:, j] = np.inf
+                matched += 1
+
+        # 2. 剩下的做最优匹配
+        rows, cols = assign(np.where(np.isfinite(cost), cost, 1e6), 1 - iou_threshold)
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            g, h = int(g_ids[i]), int(h_ids[j])
+            if g in mapping and mapping[g] != h:
+                idsw += 1
+            mapping[g] = h
+        matched += len(rows)
+
+        fn += len(g_ids) - matched
+        fp += len(h_ids) - matched
+
+    mota = 1 - (fn + fp + idsw) / max(n_gt, 1)
+    return {'mota': mota, 'idsw': idsw, 'fp': fp, 'fn': fn, 'gt': n_gt}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="追踪器精度 / CPU 耗时对比")
+    parser.add_argument('gt', help="MOT 格式真值 gt.txt")
+    parser.add_argument('--dets', help="MOT 格式检测结果 det.txt (与 --video 二选一)")
+    parser.add_argument('--video', help="原视频，用模型现场检测")
+    parser.add_argument('--model', default='weights/yolov8m_cbam.pt')
+    parser.add_argument('--fps', type=float, default=None, help="视频帧率 (--dets 时需要指定，默认 30)")
+    parser.add_argument('--stride', type=int, default=1, help="检测步长，中间帧用追踪器外推")
+    parser.add_argument('--frames', type=int, default=100000)
+    parser.add_argument('--trackers', default=','.join(TRACKERS))
+    parser.add_argument('--iou', type=float, default=0.5, help="真值匹配的 IoU 阈值")
+    args = parser.parse_args()
+
+    gt = load_mot(args.gt, min_conf=0)  # conf=0 的真值行是忽略区域
+    if args.video:
+        detections, fps = detect_video(args.video, args.model, args.frames)
+    elif args.dets:
+        detections = {f: to_detections(v) for f, v in load_mot(args.dets).items()}
+        fps = 30
+    else:
+        parser.error("需要 --dets 或 --video")
+    fps = args.fps or fps
+    n_frames = min(max(max(gt, default=0), max(detections, default=0)), args.frames)
+    gt = {f: v for f, v in gt.items() if f <= n_frames}
+
+    print(f"📊 {n_frames} 帧, 真值目标 {sum(len(v[0]) for v in gt.values())} 个, fps={fps:g}, stride={args.stride}")
+    print(f"{'tracker':<12}{'MOTA':>8}{'IDSW':>7}{'FP':>8}{'FN':>8}{'CPU ms/帧':>12}{'p95 ms':>9}")
+    for kind in args.trackers.split(','):
+        hypotheses, cpu_ms = run_tracker(kind, detections, n_frames, fps, args.stride)
+        m = clear_mot(gt, hypotheses, args.iou)
+        print(f"{kind:<12}{m['mota']:>8.3f}{m['idsw']:>7}{m['fp']:>8}{m['fn']:>8}"
+              f"{cpu_ms.mean():>12.3f}{np.percentile(cpu_ms, 95):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
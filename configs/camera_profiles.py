@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field, fields, replace
+
+from configs.system_config import (ROOT_DIR, RANGES, ConfigError, _check_order, _coerce, _misordered,
+                                   sys_config)
+
+PROFILES_FILE = os.path.join(ROOT_DIR, "configs", "cameras.json")
+
+
+@dataclass(frozen=True)
+class CameraProfile:
+    """单路摄像头的完整配置 (已展开继承链，运行时直接读属性)"""
+    camera_id: str = "default"
+    name: str = ""
+    source: str = ""                 # 视频源：文件路径 / RTSP 地址 / 摄像头序号
+    speed_limit: int = 60
+    alarm_threshold: int = 20
+    conf_threshold: float = 0.25
+    use_sahi: bool = False
+    sahi_every: int = 10             # 开启 SAHI 时每 N 帧跑一次切片检测
+    detect_stride: int = 1
+    adaptive_stride: bool = False
+    max_stride: int = 4
+    motion_gate: bool = False
+    motion_min_area: float = 0.002
+    motion_force_every: int = 30
+    tracker: str = "bytetrack"
+    track_lost_seconds: float = 1.0
+    reid: bool = False
+    imgsz: int = 640
+    adaptive_imgsz: bool = False
+    imgsz_min: int = 320
+    imgsz_max: int = 1280
+    priority: float = 1.0
+    latency_slo_ms: float = 1000.0
+    zones: dict = field(default_factory=dict)        # {"lines": [...], "polygons": [...]}
+    calibration: dict = field(default_factory=dict)  # 测速标定 (透视矩阵等)
+
+
+_TYPES = {f.name: f.type for f in fields(CameraProfile)}
+
+# 与全局配置同名的字段沿用全局的取值范围，这里补上摄像头独有的字段
+_RANGES = dict(RANGES, sahi_every=(1, 1000))
+
+# 与全局配置同名的字段从 sys_config 继承，rtsp_url 对应 source
+_FROM_SETTINGS = {"source": "rtsp_url"}
+
+
+class CameraProfileStore:
+    """
+    多摄像头配置
+    cameras.json 格式：
+    {
+        "default": {"sahi_every": 10},
+        "cameras": {
+            "CAM_01": {"name": "东门", "source": "rtsp://...", "zones": {...}},
+            "CAM_02": {"inherits": "CAM_01", "source": "rtsp://...", "speed_limit": 40}
+        }
+    }
+    - 继承顺序：全局配置 (config.json) -> default -> inherits 指定的摄像头 -> 本摄像头
+      未写 inherits 的摄像头直接继承 default
+    - 加载时一次性展开所有继承链，运行时 get() 只是一次字典查找
+    - 全局配置变化 (设置页保存 / 文件热加载) 时自动重新展开并通知订阅者
+    """
+
+    def __init__(self, path=PROFILES_FILE, config=sys_config):
+        self.path = path
+        self.config = config
+        self._raw = {"default": {}, "cameras": {}}
+        self._profiles = {}
+        self._default = CameraProfile()
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self.load()
+        config.subscribe(lambda settings, changed: self._rebuild(notify=True))
+
+    # --- 加载与展开 ---
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    raw = json.load(f)
+                self._raw = {"default": raw.get("default", {}), "cameras": raw.get("cameras", {})}
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 摄像头配置读取失败，保持当前配置: {e}")
+        return self._rebuild(notify=False)
+
+    def _base(self):
+        """全局配置 -> 默认 profile"""
+        settings = self.config.settings
+        values = {}
+        for name in _TYPES:
+            key = _FROM_SETTINGS.get(name, name)
+            if hasattr(settings, key):
+                values[name] = getattr(settings, key)
+        values.pop("zones", None)  # 全局 zones 按摄像头 ID 组织，展开时单独处理
+        return replace(CameraProfile(), **values)
+
+    @staticmethod
+    def _apply(profile, overrides, origin):
+        values = {}
+        for key, value in overrides.items():
+            if key in ("inherits", "camera_id"):
+                continue
+            if key not in _TYPES:
+                print(f"⚠️ {origin}: 未知配置项 {key}，已忽略")
+                continue
+            try:
+                values[key] = _coerce(key, value, _TYPES, _RANGES)
+            except ConfigError as e:
+                print(f"⚠️ {origin}: {e}，使用继承值")
+        merged = replace(profile, **values)
+        for low, high in _misordered(merged):
+            print(f"⚠️ {origin}: 配置项 {low}={getattr(merged, low)} 大于 {high}={getattr(merged, high)}，两项都使用继承值")
+            merged = replace(merged, **{low: getattr(profile, low), high: getattr(profile, high)})
+        return merged
+
+    def _resolve(self, camera_id, base, stack=()):
+        if camera_id in stack:
+            raise ConfigError(f"摄像头配置继承出现循环: {' -> '.join(stack + (camera_id,))}")
+        raw = self._raw["cameras"].get(camera_id)
+        if raw is None:
+            raise ConfigError(f"继承的摄像头 {camera_id} 不存在")
+        parent = raw.get("inherits", "default")
+        if parent == "default":
+            profile = base
+        else:
+            profile = self._resolve(parent, base, stack + (camera_id,))
+        return self._apply(profile, raw, camera_id)
+
+    def _rebuild(self, notify):
+        base = self._apply(self._base(), self._raw["default"], "default")
+        legacy_zones = self.config.settings.zones
+
+        profiles = {}
+        for camera_id in self._raw["cameras"]:
+            try:
+                profile = self._resolve(camera_id, base)
+            except ConfigError as e:
+                print(f"❌ {e}，{camera_id} 使用默认配置")
+                profile = base
+            if not profile.zones and camera_id in legacy_zones:
+                profile = replace(profile, zones=legacy_zones[camera_id])
+            profiles[camera_id] = replace(profile, camera_id=camera_id, name=profile.name or camera_id)
+
+        with self._lock:
+            old = self._profiles
+            self._profiles = profiles
+            self._default = base
+        changed = {cid for cid in set(old) | set(profiles) if old.get(cid) != profiles.get(cid)}
+        if notify and changed:
+            self._notify(changed)
+        return changed
+
+    # --- 查询 ---
+
+    def get(self, camera_id):
+        """O(1) 查找；未配置的摄像头返回默认 profile (camera_id 换成传入值)"""
+        profile = self._profiles.get(camera_id)
+        if profile is None:
+            zones = self.config.settings.zones.get(camera_id) or self._default.zones
+            profile = replace(self._default, camera_id=camera_id, name=camera_id, zones=zones)
+            with self._lock:
+                self._profiles.setdefault(camera_id, profile)
+        return profile
+
+    def camera_ids(self):
+        return list(self._raw["cameras"])
+
+    # --- 修改 ---
+
+    def set_camera(self, camera_id, **overrides):
+        """修改某路摄像头的覆盖项并保存 (只写覆盖项，继承来的值不落盘)"""
+        for key, value in overrides.items():
+            if key == "inherits":
+                continue
+            if key not in _TYPES:
+                raise ConfigError(f"未知配置项 {key}")
+            overrides[key] = _coerce(key, value, _TYPES, _RANGES)
+        # 和继承来的值合起来检查 (例如只改 imgsz_min 时不能超过继承的 imgsz_max)
+        _check_order(replace(self.get(camera_id), **{k: v for k, v in overrides.items() if k != "inherits"}))
+        with self._lock:
+            raw = dict(self._raw["cameras"].get(camera_id, {}))
+            raw.update(overrides)
+            cameras = dict(self._raw["cameras"], **{camera_id: raw})
+            self._write({"default": self._raw["default"], "cameras": cameras})
+            self._raw["cameras"] = cameras
+        self._rebuild(notify=True)
+
+    def _write(self, data):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # --- 变更通知 ---
+
+    def subscribe(self, callback):
+        """注册回调 callback(changed_camera_ids)，返回取消订阅的函数"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _notify(self, changed):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"❌ 摄像头配置变更回调出错: {e}")
+
+
+camera_profiles = CameraProfileStore()
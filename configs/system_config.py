@@ -1,44 +1,309 @@
 import json
 import os
+import threading
+from dataclasses import dataclass, field, fields, asdict, replace
 
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_FILE = os.path.join(ROOT_DIR, "config.json")
 
-# 默认配置
-DEFAULT_CONFIG = {
-    "model_path": "weights/yolov8m_cbam.pt",
-    "rtsp_url": "data/test_video1.mp4",
-    "use_sahi": False,          # 切片检测开关
-    "conf_threshold": 0.25,
-    "alarm_threshold": 20,      # 拥堵阈值 (辆)
-    "speed_limit": 60,          # 🔴 [新增] 超速阈值 (km/h)
-    "enable_audio": True,
-    "auto_record": False
+
+class ConfigError(ValueError):
+    """配置项类型/取值不合法"""
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    配置快照 (不可变)
+    热路径直接读属性 (settings.speed_limit)，不做字典查找和类型转换；
+    修改配置会生成新的快照整体替换，读到的永远是一份完整一致的配置。
+    """
+    model_path: str = "weights/yolov8m_cbam.pt"
+    rtsp_url: str = "data/test_video1.mp4"
+    use_sahi: bool = False          # 切片检测开关
+    conf_threshold: float = 0.25
+    alarm_threshold: int = 20       # 拥堵阈值 (辆，按窗口平均值判断)
+    congestion_window: float = 3.0  # 拥堵密度平滑窗口 (秒)
+    congestion_min_duration: float = 5.0  # 超过/低于阈值持续多少秒才进入/解除拥堵
+    speed_limit: int = 60           # 🔴 [新增] 超速阈值 (km/h)
+    detect_stride: int = 1          # 每 N 帧跑一次完整推理 (1 = 每帧)
+    adaptive_stride: bool = False   # 根据画面变化自动调整步长
+    max_stride: int = 4
+    motion_gate: bool = False       # 画面静止时跳过推理
+    motion_min_area: float = 0.002  # 运动面积占比阈值
+    motion_force_every: int = 30    # 最多连续跳过多少帧后强制检测一次
+    tracker: str = "bytetrack"      # 追踪器：bytetrack / iou (低功耗) / ocsort
+    track_lost_seconds: float = 1.0  # 目标丢失多少秒后放弃原 ID
+    reid: bool = False              # 跨摄像头重识别
+    reid_threshold: float = 0.85    # 外观相似度超过它才认为是同一目标
+    reid_max_travel: float = 300.0  # 摄像头之间最长行程时间 (秒)，超过的记录不再参与匹配
+    reid_windows: dict = field(default_factory=dict)  # 指定摄像头对的行程时间窗口: {"CAM_01>CAM_02": [10, 120]}
+    imgsz: int = 640                # 推理输入尺寸 (letterbox 后的长边)
+    adaptive_imgsz: bool = False    # 按最近的目标尺寸在 [imgsz_min, imgsz_max] 内自动选择输入尺寸
+    imgsz_min: int = 320
+    imgsz_max: int = 1280
+    precision: str = "fp32"         # 推理精度：fp32 / fp16 / bf16 / auto (设备不支持时回退 fp32)
+    channels_last: bool = False     # 卷积用 NHWC 内存布局
+    compile_model: bool = False     # torch.compile 编译模型 (首次推理较慢)
+    priority: float = 1.0           # 调度优先级 (推理预算不够时优先级低的摄像头先降级)
+    latency_slo_ms: float = 1000.0  # 两次完整推理之间的最长间隔目标 (毫秒)
+    inference_budget_ms: float = 800.0  # 所有摄像头每秒合计可用的推理时间 (毫秒)
+    zones: dict = field(default_factory=dict)  # 每路摄像头的计数线/区域: {"CAM_01": {"lines": [...], "polygons": [...]}}，坐标为 0~1 比例
+    dwell_alert_seconds: float = 0  # 区域停留超过该秒数记一条事件 (0 = 关闭)
+    alert_rate: float = 0.5         # 每路摄像头每秒最多放行的报警数 (令牌桶)
+    alert_burst: int = 5            # 令牌桶容量 (允许的突发报警数)
+    enable_audio: bool = True
+    auto_record: bool = False
+
+
+# 数值型配置的取值范围 (闭区间)
+RANGES = {
+    "conf_threshold": (0.0, 1.0),
+    "alarm_threshold": (1, 1000),
+    "congestion_window": (0.1, 600),
+    "congestion_min_duration": (0, 3600),
+    "speed_limit": (1, 300),
+    "detect_stride": (1, 30),
+    "max_stride": (1, 30),
+    "motion_min_area": (0.0, 1.0),
+    "motion_force_every": (1, 3600),
+    "dwell_alert_seconds": (0, 86400),
+    "alert_rate": (0.0, 100),
+    "alert_burst": (1, 1000),
+    "track_lost_seconds": (0.1, 60),
+    "reid_threshold": (0.0, 1.0),
+    "reid_max_travel": (1, 86400),
+    "imgsz": (160, 1920),
+    "imgsz_min": (160, 1920),
+    "imgsz_max": (160, 1920),
+    "priority": (0.01, 100),
+    "latency_slo_ms": (10, 60000),
+    "inference_budget_ms": (10, 100000),
 }
 
+# 有大小关系的配置项 (下限, 上限)：单项都合法时还要满足 下限 <= 上限
+ORDERED = (
+    ("imgsz_min", "imgsz_max"),
+)
+
+# 枚举型配置的可选值
+CHOICES = {
+    "tracker": ("bytetrack", "iou", "ocsort"),
+    "precision": ("fp32", "fp16", "bf16", "auto"),
+}
+
+_TYPES = {f.name: f.type for f in fields(Settings)}
+
+# 默认配置 (保留字典形式，兼容旧代码)
+DEFAULT_CONFIG = asdict(Settings())
+
+
+def _coerce(key, value, types=_TYPES, ranges=RANGES):
+    """把 JSON / 界面传来的值转换成字段类型并检查范围，不合法时抛 ConfigError"""
+    kind = types[key]
+    try:
+        if kind is bool:
+            if isinstance(value, str):
+                value = value.strip().lower() in ("1", "true", "yes", "on")
+            value = bool(value)
+        elif kind is int:
+            if isinstance(value, float) and not value.is_integer():
+                raise ValueError(value)
+            value = int(value)
+        elif kind is float:
+            value = float(value)
+        elif kind is str:
+            value = str(value)
+        elif kind is dict:
+            value = dict(value or {})
+    except (TypeError, ValueError):
+        raise ConfigError(f"配置项 {key} 需要 {kind.__name__} 类型，收到 {value!r}")
+
+    if key in ranges:
+        low, high = ranges[key]
+        if not low <= value <= high:
+            raise ConfigError(f"配置项 {key}={value} 超出范围 [{low}, {high}]")
+    if key in CHOICES and value not in CHOICES[key]:
+        raise ConfigError(f"配置项 {key}={value!r} 不在可选值 {CHOICES[key]} 中")
+    return value
+
+
+def _misordered(config):
+    """跨字段检查 (config 为 Settings / CameraProfile)，返回不满足 下限 <= 上限 的 (下限, 上限) 列表"""
+    return [(low, high) for low, high in ORDERED if getattr(config, low) > getattr(config, high)]
+
+
+def _check_order(config):
+    """有下限大于上限的配置时抛 ConfigError"""
+    bad = _misordered(config)
+    if bad:
+        low, high = bad[0]
+        raise ConfigError(f"配置项 {low}={getattr(config, low)} 不能大于 {high}={getattr(config, high)}")
+
+
 class SystemConfig:
-    def __init__(self):
-        self.config = DEFAULT_CONFIG.copy()
+    """
+    系统配置
+    - settings：当前不可变快照，热路径读它
+    - update()：批量修改，校验通过后一次性原子写盘 (临时文件 + os.replace)，再通知订阅者
+    - start_watching()：后台轮询 config.json 的修改时间，外部改了文件自动重新加载并通知
+    - subscribe()：注册变更回调 callback(new_settings, changed_keys)
+      回调在调用 update 的线程或监视线程里执行，界面代码需要自行切回 GUI 线程
+    """
+
+    def __init__(self, path=CONFIG_FILE):
+        self.path = path
+        self.settings = Settings()
+        self._extra = {}          # 不认识的键原样保留，写回时不丢
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._mtime = None
+        self._watcher = None
+        self._stop = threading.Event()
         self.load()
 
+    # --- 读取 ---
+
     def load(self):
-        if os.path.exists(CONFIG_FILE):
+        """从文件加载；不合法的项打印警告后使用默认值"""
+        if not os.path.exists(self.path):
+            return set()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            mtime = os.path.getmtime(self.path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 配置文件读取失败，保持当前配置: {e}")
+            return set()
+
+        values, extra = {}, {}
+        for key, value in raw.items():
+            if key not in _TYPES:
+                extra[key] = value
+                continue
             try:
-                with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                    self.config.update(json.load(f))
-            except: pass
+                values[key] = _coerce(key, value)
+            except ConfigError as e:
+                print(f"⚠️ {e}，使用默认值")
+        for low, high in _misordered(replace(Settings(), **values)):
+            print(f"⚠️ 配置项 {low}={values.get(low)} 大于 {high}={values.get(high)}，两项都使用默认值")
+            values.pop(low, None)
+            values.pop(high, None)
 
-    def save(self):
-        try:
-            with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4, ensure_ascii=False)
-        except: pass
+        with self._lock:
+            old = self.settings
+            self.settings = replace(Settings(), **values)
+            self._extra = extra
+            self._mtime = mtime
+            changed = {k for k in _TYPES if getattr(old, k) != getattr(self.settings, k)}
+        return changed
 
     def get(self, key, default=None):
-        return self.config.get(key, DEFAULT_CONFIG.get(key, default))
+        """兼容旧接口；热路径请直接读 sys_config.settings 的属性"""
+        if key in _TYPES:
+            return getattr(self.settings, key)
+        return self._extra.get(key, default)
+
+    # --- 写入 ---
 
     def set(self, key, value):
-        self.config[key] = value
-        self.save()
+        self.update({key: value})
+
+    def update(self, changes):
+        """
+        批量修改并保存 (一次写盘)
+        :raises ConfigError: 任一项不合法时整体不生效
+        :raises OSError: 写文件失败 (内存中的配置不会被修改)
+        """
+        values, extra = {}, {}
+        for key, value in changes.items():
+            if key in _TYPES:
+                values[key] = _coerce(key, value)
+            else:
+                extra[key] = value
+
+        with self._lock:
+            new = replace(self.settings, **values)
+            _check_order(new)
+            new_extra = dict(self._extra, **extra)
+            self._write(new, new_extra)
+            changed = {k for k in values if getattr(self.settings, k) != getattr(new, k)}
+            self.settings = new
+            self._extra = new_extra
+        if changed:
+            self._notify(changed)
+        return changed
+
+    def save(self):
+        with self._lock:
+            self._write(self.settings, self._extra)
+
+    def _write(self, settings, extra):
+        data = dict(extra)
+        data.update(asdict(settings))
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    # --- 变更通知 ---
+
+    def subscribe(self, callback, keys=None):
+        """
+        注册变更回调 callback(settings, changed_keys)
+        :param keys: 只关心的配置项，None 表示全部
+        :return: 取消订阅的函数
+        """
+        entry = (callback, set(keys) if keys else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def _notify(self, changed):
+        settings = self.settings
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, keys in subscribers:
+            if keys is not None and not (keys & changed):
+                continue
+            try:
+                callback(settings, changed)
+            except Exception as e:
+                print(f"❌ 配置变更回调出错: {e}")
+
+    # --- 文件热加载 ---
+
+    def start_watching(self, interval=1.0):
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(2.0)
+            self._watcher = None
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                continue
+            if mtime == self._mtime:
+                continue
+            changed = self.load()
+            if changed:
+                print(f"🔄 配置文件已更新: {', '.join(sorted(changed))}")
+                self._notify(changed)
+
 
-sys_config = SystemConfig()
\ No newline at end of file
+sys_config = SystemConfig()
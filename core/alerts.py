@@ -0,0 +1,175 @@
+# core/alerts.py
+import time
+from dataclasses import dataclass, field
+
+# 各类报警的冷却时间 (秒)：同一个 (摄像头, 类型, 目标) 在冷却期内只报一次
+DEFAULT_COOLDOWN = {
+    "speeding": 30.0,
+    "congestion": 60.0,
+    "dwell": 60.0,
+}
+
+ALERT_LABELS = {"speeding": "超速", "congestion": "拥堵", "dwell": "停留"}
+
+
+@dataclass
+class Alert:
+    """一条结构化报警 (展示文本在用到时才生成)"""
+    alert_type: str            # "speeding" / "congestion" / "dwell"
+    camera_id: str
+    track_id: int = None       # 与目标无关的报警 (如整体拥堵) 为 None
+    value: float = 0.0         # 速度 km/h / 平均数量 / 停留秒数
+    zone: str = ""
+    class_id: int = None
+    epoch: int = 0             # 追踪器代数 (SmartDetector.track_epoch)，换追踪器后 track_id 从头编号
+
+    @property
+    def key(self):
+        """去重键：同一摄像头、同一类型、同一目标 (同一代追踪器内) 或同一区域"""
+        if self.track_id is not None:
+            return self.camera_id, self.alert_type, self.epoch, self.track_id
+        return self.camera_id, self.alert_type, self.zone
+
+    @property
+    def message(self):
+        if self.alert_type == "speeding":
+            return f"#{self.track_id} 超速: {self.value:.0f}km/h"
+        if self.alert_type == "congestion":
+            return f"拥堵: {self.zone} 平均 {self.value:.0f}辆"
+        if self.alert_type == "dwell":
+            return f"#{self.track_id} 在 {self.zone} 停留 {self.value:.0f} 秒"
+        return f"{self.alert_type}: {self.value}"
+
+    def __str__(self):
+        return self.message
+
+
+@dataclass
+class Incident:
+    """一段时间内同一摄像头的报警合并为一个事件 (只截一张图、录一段像、写一条记录)"""
+    camera_id: str
+    started: float
+    last_ts: float
+    alerts: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+    max_alerts: int = 20       # 只保留前 N 条明细，其余只计数
+
+    def add(self, alert, ts):
+        self.last_ts = ts
+        self.counts[alert.alert_type] = self.counts.get(alert.alert_type, 0) + 1
+        if len(self.alerts) < self.max_alerts:
+            self.alerts.append(alert)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def describe(self):
+        text = "; ".join(a.message for a in self.alerts)
+        if self.total > len(self.alerts):
+            summary = ", ".join(f"{ALERT_LABELS.get(t, t)} {n} 次" for t, n in self.counts.items())
+            text += f" ... (共 {self.total} 条: {summary})"
+        return text
+
+
+class _TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = None
+
+    def take(self, now):
+        if self.updated is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class AlertEngine:
+    """
+    报警去重 / 限流 / 合并
+    1. 冷却：同一去重键在 cooldown 秒内只放行一次 (一辆超速车不会每帧报一次)
+    2. 限流：每个摄像头一个令牌桶 (rate 条/秒，最多攒 burst 条)，突发流量下处理量有上限
+    3. 合并：Incident 从第一条报警开始，到调用方 close_incident (录像结束) 为止，期间放行的报警都归到它里面
+    """
+
+    def __init__(self, cooldown=None, rate=0.5, burst=5, max_keys=5000):
+        self.cooldown = dict(DEFAULT_COOLDOWN)
+        if cooldown:
+            self.cooldown.update(cooldown)
+        self.default_cooldown = 30.0
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+
+        self._last_fired = {}    # 去重键 -> 上次放行时间
+        self._buckets = {}       # camera_id -> _TokenBucket
+        self._incidents = {}     # camera_id -> 进行中的 Incident
+
+        self.accepted = 0
+        self.deduplicated = 0
+        self.rate_limited = 0
+
+    def submit(self, alerts, now=None, aggregate=True):
+        """
+        提交本帧的报警 (一次只提交同一个摄像头的报警)
+        :param aggregate: False 时只做去重/限流，不归入 Incident
+        :return: (放行的报警列表, Incident 或 None, 是否新开了 Incident)
+        """
+        if not alerts:
+            return [], None, False
+        now = time.time() if now is None else now
+
+        passed = []
+        for alert in alerts:
+            key = alert.key
+            last = self._last_fired.get(key)
+            if last is not None and now - last < self.cooldown.get(alert.alert_type, self.default_cooldown):
+                self.deduplicated += 1
+                continue
+            bucket = self._buckets.get(alert.camera_id)
+            if bucket is None:
+                bucket = self._buckets[alert.camera_id] = _TokenBucket(self.rate, self.burst)
+            if not bucket.take(now):
+                self.rate_limited += 1
+                continue
+            self._last_fired[key] = now
+            passed.append(alert)
+
+        self.accepted += len(passed)
+        if len(self._last_fired) > self.max_keys:
+            self._prune(now)
+        if not passed or not aggregate:
+            return passed, None, False
+
+        # 同一摄像头的报警合并进进行中的 Incident
+        camera_id = passed[0].camera_id
+        incident = self._incidents.get(camera_id)
+        is_new = incident is None
+        if is_new:
+            incident = self._incidents[camera_id] = Incident(camera_id, started=now, last_ts=now)
+        for alert in passed:
+            incident.add(alert, now)
+        return passed, incident, is_new
+
+    def close_incident(self, incident):
+        """结束进行中的 Incident (如录像结束)，该摄像头之后的报警会开新的 Incident"""
+        if self._incidents.get(incident.camera_id) is incident:
+            del self._incidents[incident.camera_id]
+
+    def _prune(self, now):
+        """去重表超过上限时清掉已过冷却期的键 (目标早已离开画面)"""
+        longest = max(self.cooldown.values(), default=self.default_cooldown)
+        self._last_fired = {k: t for k, t in self._last_fired.items() if now - t < longest}
+
+    def metrics(self):
+        return {
+            'accepted': self.accepted,
+            'deduplicated': self.deduplicated,
+            'rate_limited': self.rate_limited,
+            'tracked_keys': len(self._last_fired),
+        }
@@ -0,0 +1,285 @@
+# core/batch_job.py
+"""
+离线批量视频分析
+把一个或多个视频按帧区间切成若干分段，交给进程池里的 SmartDetector 并行处理，
+最后在分段边界处拼接追踪 ID、汇总计数与事件。
+
+分段边界处理：
+- 每个分段从 start - overlap 帧开始读 (预热段)，预热段只用来建立追踪器和越线状态，不计数
+- 相邻两段都会看到 start - 1 这一帧：前一段记为 tail，后一段记为 head，
+  用 IoU 匹配两边的框，把后一段的局部 ID 映射到全局 ID
+"""
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+_DETECTOR = None  # 每个工作进程各自持有一个检测器 (模型只加载一次)
+
+
+# --- 分段规划 ---
+
+def plan_chunks(video_paths, chunk_seconds=60, overlap_frames=30):
+    """把视频切成分段，返回 [{'video', 'index', 'start', 'end', 'overlap', 'fps'}, ...]"""
+    chunks = []
+    for video in video_paths:
+        cap = cv2.VideoCapture(video)
+        if not cap.isOpened():
+            print(f"❌ 无法打开视频: {video}")
+            continue
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+
+        step = max(1, int(chunk_seconds * fps))
+        for index, start in enumerate(range(0, total, step)):
+            chunks.append({
+                'video': os.path.abspath(video),
+                'index': index,
+                'start': start,
+                'end': min(start + step, total),
+                'overlap': overlap_frames,
+                'fps': fps,
+            })
+    return chunks
+
+
+def chunk_key(chunk):
+    # 带上帧区间，换了分段参数后旧断点不会被误用
+    return f"{chunk['video']}#{chunk['start']}-{chunk['end']}"
+
+
+# --- 工作进程 ---
+
+def init_worker(model_path, threads_per_worker=1):
+    """进程池初始化：限制每个进程的线程数，加载模型"""
+    global _DETECTOR
+    import torch
+    torch.set_num_threads(max(1, threads_per_worker))
+    cv2.setNumThreads(1)
+
+    from core.detector import SmartDetector
+    _DETECTOR = SmartDetector(model_path=model_path)
+
+
+def _snapshot_tracks(detections):
+    """记录某一帧的 (tracker_id, class_id, xyxy)，用于分段拼接"""
+    if detections is None or len(detections) == 0 or detections.tracker_id is None:
+        return []
+    return [
+        [int(tid), int(cid), [float(v) for v in box]]
+        for tid, cid, box in zip(detections.tracker_id, detections.class_id, detections.xyxy)
+    ]
+
+
+def process_chunk(chunk, speed_limit=60):
+    """在工作进程中处理一个分段，返回可 JSON 序列化的结果"""
+    detector = _DETECTOR
+    detector.reset_state()
+    detector.fps = chunk['fps']
+
+    first = max(0, chunk['start'] - chunk['overlap'])
+    cap = cv2.VideoCapture(chunk['video'])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    in_per_class, out_per_class = {}, {}
+    events, head, tail = [], [], []
+    track_classes = {}
+    t0 = time.time()
+    frame_idx = first
+
+    while frame_idx < chunk['end']:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        _, info = detector.process_frame(frame, speed_limit=speed_limit, annotate=False)
+        detections = info.get('detections')
+
+        if frame_idx == chunk['start'] - 1:
+            head = _snapshot_tracks(detections)
+        if frame_idx == chunk['end'] - 1:
+            tail = _snapshot_tracks(detections)
+
+        if frame_idx >= chunk['start']:
+            for class_id, n in info.get('in_per_class', {}).items():
+                in_per_class[class_id] = in_per_class.get(class_id, 0) + n
+            for class_id, n in info.get('out_per_class', {}).items():
+                out_per_class[class_id] = out_per_class.get(class_id, 0) + n
+            for tracker_id, class_id, speed in info.get('speeding', []):
+                events.append({
+                    'type': 'speeding', 'frame': frame_idx,
+                    'time': frame_idx / chunk['fps'],
+                    'tracker_id': tracker_id, 'class_id': class_id, 'speed': speed,
+                })
+            if detections is not None and detections.tracker_id is not None:
+                for tid, cid in zip(detections.tracker_id, detections.class_id):
+                    track_classes.setdefault(int(tid), int(cid))
+
+        frame_idx += 1
+
+    cap.release()
+    return {
+        'key': chunk_key(chunk),
+        'video': chunk['video'],
+        'index': chunk['index'],
+        'frames': max(0, frame_idx - chunk['start']),
+        'seconds': time.time() - t0,
+        'in_per_class': {str(k): v for k, v in in_per_class.items()},
+        'out_per_class': {str(k): v for k, v in out_per_class.items()},
+        'track_classes': {str(k): v for k, v in track_classes.items()},
+        'events': events,
+        'head': head,
+        'tail': tail,
+    }
+
+
+# --- 拼接与汇总 ---
+
+def _iou_matrix(boxes_a, boxes_b):
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def match_boundary(tail, head, iou_thres=0.5):
+    """
+    贪心 IoU 匹配：前一段最后一帧 (tail) 与后一段预热段的同一帧 (head)
+    :return: {后一段局部 ID: 前一段局部 ID}
+    """
+    if not tail or not head:
+        return {}
+    iou = _iou_matrix([t[2] for t in tail], [h[2] for h in head])
+    # 类别不同的不允许匹配
+    same_class = np.array([t[1] for t in tail])[:, None] == np.array([h[1] for h in head])[None, :]
+    iou = np.where(same_class, iou, 0.0)
+
+    mapping = {}
+    while iou.size and iou.max() >= iou_thres:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        mapping[head[j][0]] = tail[i][0]
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return mapping
+
+
+def aggregate(results):
+    """按视频汇总各分段结果，拼接全局追踪 ID"""
+    by_video = {}
+    for res in results:
+        by_video.setdefault(res['video'], []).append(res)
+
+    report = {}
+    for video, parts in by_video.items():
+        parts.sort(key=lambda r: r['index'])
+        in_total, out_total, unique_per_class = {}, {}, {}
+        events = []
+        next_global = 1
+        prev_map, prev_tail, prev_index = {}, [], None
+
+        for res in parts:
+            # 中间有分段缺失时不跨缺口拼接
+            link = match_boundary(prev_tail, res['head']) if res['index'] == (prev_index or 0) + 1 else {}
+            local_to_global = {}
+            for local_id, class_id in res['track_classes'].items():
+                local_id = int(local_id)
+                if local_id in link and link[local_id] in prev_map:
+                    local_to_global[local_id] = prev_map[link[local_id]]
+                else:
+                    local_to_global[local_id] = next_global
+                    next_global += 1
+                    unique_per_class[str(class_id)] = unique_per_class.get(str(class_id), 0) + 1
+
+            for cls, n in res['in_per_class'].items():
+                in_total[cls] = in_total.get(cls, 0) + n
+            for cls, n in res['out_per_class'].items():
+                out_total[cls] = out_total.get(cls, 0) + n
+            for ev in res['events']:
+                ev = dict(ev)
+                ev['track_id'] = local_to_global.get(ev.pop('tracker_id'))
+                events.append(ev)
+
+            prev_map, prev_tail, prev_index = local_to_global, res['tail'], res['index']
+
+        # 同一辆车超速会持续很多帧，按全局 ID 只保留速度最高的一条
+        dedup = {}
+        for ev in events:
+            key = (ev['type'], ev['track_id'])
+            if key not in dedup or ev['speed'] > dedup[key]['speed']:
+                dedup[key] = ev
+
+        report[video] = {
+            'frames': sum(r['frames'] for r in parts),
+            'in_per_class': in_total,
+            'out_per_class': out_total,
+            'in_count': sum(in_total.values()),
+            'out_count': sum(out_total.values()),
+            'unique_tracks_per_class': unique_per_class,
+            'events': sorted(dedup.values(), key=lambda e: e['frame']),
+        }
+    return report
+
+
+# --- 断点续跑 ---
+# 断点文件是 JSON Lines：第一行是参数头 {"params": {...}}，之后每完成一个分段追加一行结果。
+# 每段只追加一行，分段再多也不用整份重写；进程中途被杀最多留下半行，读取时丢掉即可。
+
+class CheckpointMismatch(RuntimeError):
+    """断点文件是用另一组参数 (模型 / 限速等) 跑出来的，不能续跑"""
+
+
+def open_checkpoint(path, params):
+    """
+    读取断点并核对参数，返回已完成的分段 {key: 结果}；文件不存在时写入参数头
+    :param params: 影响分段结果的运行参数 (可 JSON 序列化)，和参数头不一致时抛 CheckpointMismatch
+    """
+    if not path:
+        return {}
+    params = json.loads(json.dumps(params))  # 与读回来的 JSON 同样的类型，方便比较
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'params': params}, ensure_ascii=False) + "\n")
+        return {}
+
+    done = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    lines = text.splitlines()
+    try:
+        header = json.loads(lines[0])
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get('params') != params:
+        saved = header.get('params') if isinstance(header, dict) else None
+        raise CheckpointMismatch(f"断点文件 {path} 的参数 {saved} 与本次运行 {params} 不一致")
+    for n, line in enumerate(lines[1:], 2):
+        try:
+            res = json.loads(line)
+        except ValueError:
+            print(f"⚠️ 断点文件第 {n} 行不完整，已忽略")
+            continue
+        done[res['key']] = res
+    if not text.endswith("\n"):
+        # 上次写到半行就被杀掉了：先换行，后面追加的结果不会接在残行后面
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("\n")
+    return done
+
+
+def append_checkpoint(path, result):
+    """追加一个分段的结果 (写完立即落盘)"""
+    if not path:
+        return
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
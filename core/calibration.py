@@ -0,0 +1,74 @@
+# core/calibration.py
+import cv2
+import numpy as np
+
+
+def compute_homography(src_points, real_width, real_length):
+    """
+    4 个图像点 (顺序：左下, 右下, 右上, 左上) -> 地面坐标 (米) 的单应性矩阵
+    目标矩形直接用真实尺寸 (宽 real_width, 长 real_length)，变换后两个方向都是 1 单位 = 1 米
+    :raises ValueError: 4 个点构不成凸四边形 (三点共线 / 点重合 / 顺序交叉)
+    """
+    src = np.asarray(src_points, dtype=np.float32).reshape(4, 2)
+    edges = np.roll(src, -1, axis=0) - src
+    turns = edges[:, 0] * np.roll(edges[:, 1], -1) - edges[:, 1] * np.roll(edges[:, 0], -1)
+    if not (np.all(turns > 1e-6) or np.all(turns < -1e-6)):
+        raise ValueError("标定点必须按 左下, 右下, 右上, 左上 的顺序构成凸四边形")
+    dst = np.float32([
+        [0, real_length],
+        [real_width, real_length],
+        [real_width, 0],
+        [0, 0],
+    ])
+    return cv2.getPerspectiveTransform(src, dst)
+
+
+def scale_homography(matrix, from_size, to_size):
+    """标定时的画面尺寸与运行时不同 (如换了码流分辨率)，把矩阵换算到新的像素坐标"""
+    if from_size is None or tuple(from_size) == tuple(to_size):
+        return np.asarray(matrix, dtype=np.float64)
+    sx = from_size[0] / to_size[0]
+    sy = from_size[1] / to_size[1]
+    to_original = np.diag([sx, sy, 1.0])
+    return np.asarray(matrix, dtype=np.float64) @ to_original
+
+
+def scale_points(points, from_size, to_size):
+    """标定点从标定时的画面尺寸换算到当前画面尺寸 (与 scale_homography 对应)"""
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if from_size is None or tuple(from_size) == tuple(to_size):
+        return points
+    return points * [to_size[0] / from_size[0], to_size[1] / from_size[1]]
+
+
+def build_row_lut(matrix, frame_size, column=None):
+    """
+    地面查找表：图像每一行 -> 该行上 1 像素对应的地面距离 (米/像素)，x、y 方向各一列
+    取 column 列 (默认画面中线) 上的点，分别沿 x、y 方向移动 1 像素求地面位移。
+    透视下同一行的比例尺基本一致，测速时只需按行查表，不必每帧做透视变换。
+    :return: (H, 2) float32
+    """
+    w, h = frame_size
+    x = float(w / 2 if column is None else column)
+    rows = np.arange(h, dtype=np.float32)
+    base = np.stack([np.full(h, x, dtype=np.float32), rows], axis=1)
+    pts = np.concatenate([base, base + [1, 0], base + [0, 1]]).reshape(-1, 1, 2).astype(np.float32)
+    ground = cv2.perspectiveTransform(pts, np.asarray(matrix, dtype=np.float64)).reshape(3, h, 2)
+    lut = np.stack([np.linalg.norm(ground[1] - ground[0], axis=1),
+                    np.linalg.norm(ground[2] - ground[0], axis=1)], axis=1)
+    # 地平线附近及以上 (变换发散) 的行没有意义，置 0 (这些位置不测速)
+    lut[~np.all(np.isfinite(lut), axis=1) | np.any(lut > 10, axis=1)] = 0
+    return lut.astype(np.float32)
+
+
+def make_calibration(src_points, real_width, real_length, frame_size, use_lut=False):
+    """生成可以直接写进摄像头配置的标定字典 (矩阵预先算好)"""
+    matrix = compute_homography(src_points, real_width, real_length)
+    return {
+        "src_points": np.asarray(src_points, dtype=float).round(1).tolist(),
+        "real_width": float(real_width),
+        "real_length": float(real_length),
+        "frame_size": [int(frame_size[0]), int(frame_size[1])],
+        "matrix": matrix.tolist(),
+        "use_lut": bool(use_lut),
+    }
@@ -0,0 +1,76 @@
+# core/congestion.py
+import numpy as np
+
+
+class CongestionDetector:
+    """
+    拥堵判定：滑动窗口平均密度 + 滞回 + 最短持续时间
+    - 每个通道 (全画面 / 各区域) 维护一个环形缓冲区和累加和，每帧 O(1) 更新窗口均值
+    - 均值 >= on_level 持续 min_duration 秒才进入拥堵；
+      均值 < on_level * release_ratio 持续 min_duration 秒才解除 (避免在阈值附近来回跳)
+    - update() 只在状态切换时返回事件，调用方据此报警，而不是每帧都报
+    """
+
+    def __init__(self, names, thresholds, window=90, release_ratio=0.8, min_duration=3.0):
+        self.names = list(names)
+        self.window = max(1, int(window))
+        self.release_ratio = release_ratio
+        self.min_duration = min_duration
+        self.set_thresholds(thresholds)
+
+        k = len(self.names)
+        self._buf = np.zeros((self.window, k), dtype=np.float64)
+        self._sum = np.zeros(k, dtype=np.float64)
+        self._idx = 0
+        self._filled = 0
+
+        self.level = np.zeros(k, dtype=np.float64)     # 当前窗口平均数量
+        self.congested = np.zeros(k, dtype=bool)
+        self.started_at = np.full(k, np.nan)            # 本次拥堵开始时间
+        self._pending_since = np.full(k, np.nan)       # 满足切换条件的起始时间
+
+    def set_thresholds(self, thresholds):
+        """更新阈值 (设置页修改后无需重建)，None 表示该通道只统计密度不判拥堵"""
+        on = np.array([np.inf if t is None else t for t in thresholds], dtype=np.float64)
+        self.on_level = on
+        self.off_level = on * self.release_ratio
+
+    def update(self, counts, ts):
+        """
+        :param counts: 各通道本帧数量 (与 names 一一对应)
+        :param ts: 当前时间 (秒)
+        :return: 状态切换事件 [{'zone', 'state': 'start'/'end', 'level', 'duration'}, ...]
+        """
+        counts = np.asarray(counts, dtype=np.float64)
+        self._sum += counts - self._buf[self._idx]
+        self._buf[self._idx] = counts
+        self._idx = (self._idx + 1) % self.window
+        self._filled = min(self._filled + 1, self.window)
+        if self._idx == 0:
+            # 每绕一圈重新求和一次，消除浮点累加误差 (均摊仍是 O(1))
+            self._sum = self._buf.sum(axis=0)
+        self.level = self._sum / self._filled
+
+        want = np.where(self.congested, self.level >= self.off_level, self.level >= self.on_level)
+        switching = want != self.congested
+        self._pending_since[~switching] = np.nan
+        self._pending_since[switching & np.isnan(self._pending_since)] = ts
+        fire = switching & (ts - self._pending_since >= self.min_duration)
+
+        events = []
+        for k in np.flatnonzero(fire):
+            self.congested[k] = want[k]
+            self._pending_since[k] = np.nan
+            if want[k]:
+                self.started_at[k] = ts
+                events.append({'zone': self.names[k], 'state': 'start',
+                               'level': float(self.level[k]), 'duration': 0.0})
+            else:
+                events.append({'zone': self.names[k], 'state': 'end', 'level': float(self.level[k]),
+                               'duration': float(ts - self.started_at[k])})
+                self.started_at[k] = np.nan
+        return events
+
+    def summary(self):
+        return {name: {'level': float(self.level[k]), 'congested': bool(self.congested[k])}
+                for k, name in enumerate(self.names)}
@@ -4,7 +4,9 @@ import torch
 import numpy as np
 import supervision as sv
 from ultralytics import YOLO
+import math
 import os
+import time
 
 try:
     from core.speed_estimator import SpeedEstimator
@@ -14,6 +16,17 @@ except ImportError:
     sys.path.append(os.getcwd())
     from core.speed_estimator import SpeedEstimator
 
+from core.frame_skipper import AdaptiveStride, TrackPredictor
+from core.motion_gate import MotionGate
+from core.zones import ZoneEngine
+from core.dwell import DwellTracker
+from core.track_slots import TrackSlots
+from core.trackers import build_tracker, update_rate
+from core.reid import TrackEmbeddings
+from core.precision import InferencePrecision
+from core.resolution import AdaptiveResolution, round_size
+from core.alerts import Alert
+
 # 导入 GPU 版 SAHI
 try:
     from core.sahi_inference import SahiWrapper
@@ -24,8 +37,21 @@ except ImportError:
     SAHI_AVAILABLE = False
 
 
+# 计数线统计的机动车类别 / 需要测速的类别 (VisDrone 类别编号)
+COUNT_CLASS_IDS = np.array([0, 2, 3, 4, 7, 8, 9])
+SPEED_CLASS_IDS = np.array([2, 3, 4, 8, 9])
+# 追踪槽位在追踪器丢失时长之外多留的帧数 (跳帧 / 静止画面时 ID 可能晚几帧才重新出现)
+SLOT_TTL_MARGIN = 30
+
+
 class SmartDetector:
-    def __init__(self, model_path=None, rtsp_url=None, use_sahi=False):
+    def __init__(self, model_path=None, rtsp_url=None, use_sahi=False,
+                 detect_stride=1, adaptive_stride=False, max_stride=4,
+                 motion_gate=False, motion_min_area=0.002, motion_force_every=30,
+                 camera_id="CAM_01", zones=None, calibration=None,
+                 tracker="bytetrack", track_lost_seconds=1.0, reid=False,
+                 precision="fp32", channels_last=False, compile_model=False,
+                 imgsz=640, adaptive_imgsz=False, imgsz_range=(320, 1280), scheduler=None):
         if model_path is None:
             current_dir = os.path.dirname(os.path.abspath(__file__))
             root_dir = os.path.dirname(current_dir)
@@ -41,6 +67,18 @@ class SmartDetector:
             print("⚠️ 模型加载失败，使用默认 yolov8n.pt")
             self.model = YOLO('yolov8n.pt')
 
+        # 推理精度 (fp32 / fp16 / bf16 / auto) + channels_last + torch.compile，普通推理和 SAHI 共用
+        # 非 fp32 时第一帧有目标的画面会和 fp32 对比一次，差别太大自动回退 fp32
+        self.precision = InferencePrecision(precision, self.device, channels_last, compile_model)
+        self.precision.apply(self.model)
+        self._precision_checked = self.precision.precision == "fp32"
+
+        # 推理输入尺寸：固定 imgsz，或按最近的目标尺寸在 imgsz_range 内自动选择 (只作用于普通推理，SAHI 按切片尺寸)
+        self.resolution = AdaptiveResolution(imgsz, adaptive_imgsz, *imgsz_range)
+
+        # 类别名查表数组 (class_id -> 名称)，避免每个目标都做 isinstance + dict 查找
+        self.class_names = self._build_class_names(self.model.names)
+
         self.sahi_agent = None
         self.use_sahi_init = use_sahi
 
@@ -48,13 +86,33 @@ class SmartDetector:
         if use_sahi and SAHI_AVAILABLE:
             self._init_sahi()
 
-        self.tracker = sv.ByteTrack(track_activation_threshold=0.25, lost_track_buffer=30, frame_rate=30)
-        self.estimator = SpeedEstimator()
-
-        self.line_zone = None
-        self.line_annotator = sv.LineZoneAnnotator(
-            thickness=4, text_thickness=2, text_scale=1.0, color=sv.Color.from_hex("#FF0000")
-        )
+        self.fps = 30  # 视频帧率，测速用
+        # 跳帧检测：每 detect_stride 帧推理一次，中间帧由追踪器外推
+        self.stride = AdaptiveStride(detect_stride, adaptive=adaptive_stride, max_stride=max_stride)
+        self.predictor = TrackPredictor()
+        # 运动门控：画面没动时跳过推理 (夜间空场景省 CPU)
+        self.motion_gate = MotionGate(motion_min_area, motion_force_every) if motion_gate else None
+        # 计数线 / 区域配置 (相对坐标)，为空时使用默认的单条计数线
+        self.camera_id = camera_id
+        self.zone_config = zones
+        # 测速标定 (预先算好的单应性矩阵)，为空时使用默认梯形点
+        self.calibration = calibration
+        # 追踪器类型 (bytetrack / iou / ocsort)，参数按实际帧率和检测步长换算
+        self.tracker_kind = tracker
+        self.track_lost_seconds = track_lost_seconds
+        self.reid_enabled = reid  # 跨摄像头重识别 (外观特征进共享索引)
+        # 多摄像头推理调度 (core/scheduler.py)：按它给的步长下限 / SAHI 开关降级，每帧回报推理耗时
+        self.scheduler = scheduler
+        self.schedule = None
+        self.reid = None
+        self.tracker = None
+        # 追踪器代数：每次新建追踪器 (换源 / 换追踪器 / 帧率变化，ID 从 1 重新编号) 换一个新值，
+        # 取建好时的毫秒时间戳，重启程序后也不会重复；落库的轨迹 / OD 出行按 (代数, ID) 区分目标
+        self.track_epoch = 0
+        self.estimator = None
+        self.zone_engine = None
+        self.dwell = None
+        self.reset_state()
 
         # 🟢 [核心修复] 恢复手动调色板，确保每一类都有颜色！
         # 如果不加这个，Supervision 可能不知道该用什么颜色画框，导致“隐形”
@@ -86,15 +144,183 @@ class SmartDetector:
         if rtsp_url is not None:
             self.cap = cv2.VideoCapture(rtsp_url)
 
+    def reset_state(self):
+        """清空追踪/测速/计数状态 (切换视频源或离线分段处理时调用，模型不重新加载)"""
+        self.tracker = None      # 依赖视频帧率 (fps 在换源后才知道)，第一帧时创建
+        # 追踪ID -> 稠密槽位，测速/计数线/停留的逐目标状态都按槽位存放在定长数组里
+        # 槽位回收不能早于追踪器丢弃 ID，否则同一个 ID 找回来时会被当成新目标
+        self.slots = TrackSlots(ttl=int(math.ceil(self.track_lost_seconds * self.fps)) + SLOT_TTL_MARGIN)
+        if self.reid is not None:
+            self.reid.flush()  # 换源前把在场目标发布出去
+        self.reid = TrackEmbeddings(self.camera_id) if self.reid_enabled else None
+        self.estimator = None    # 依赖画面尺寸，第一帧时创建
+        self.zone_engine = None
+        self.dwell = None
+        self._frame_index = 0     # 已处理帧数，换算视频时间 (停留时长用)
+        self.predictor.reset()
+        self.stride.reset()
+        self._was_gated = False
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self.resolution.reset()
+
     def _init_sahi(self):
         try:
             print("🚀 初始化 GPU 加速 SAHI 引擎...")
-            self.sahi_agent = SahiWrapper(self.model)
+            self.sahi_agent = SahiWrapper(self.model, self.precision)
             print("✅ GPU SAHI 就绪")
         except Exception as e:
             print(f"❌ SAHI 初始化失败: {e}")
 
-    def process_frame(self, img=None, use_sahi_override=False, speed_limit=60):
+    @staticmethod
+    def _build_class_names(names):
+        if isinstance(names, dict):
+            size = max(names.keys(), default=-1) + 1
+            table = [names.get(i, f"ID-{i}") for i in range(size)]
+        else:
+            table = list(names)
+        # 末尾多放一个 Unknown，负数和越界的 class_id 统一映射到这里
+        return np.array(table + ["Unknown"], dtype=object)
+
+    @staticmethod
+    def _count_by_class(class_ids):
+        """class_id 数组 -> {class_id: 数量}"""
+        if class_ids is None or len(class_ids) == 0:
+            return {}
+        ids, counts = np.unique(class_ids, return_counts=True)
+        return dict(zip(ids.tolist(), counts.tolist()))
+
+    def configure_sampling(self, detect_stride, adaptive_stride, max_stride,
+                           motion_gate, motion_min_area, motion_force_every):
+        """运行中修改跳帧/运动门控参数 (配置热更新时调用)，追踪状态保留"""
+        self.stride.adaptive = adaptive_stride
+        self.stride.max_stride = max(self.stride.min_stride, max_stride)
+        self.stride.stride = self.stride.min_stride if adaptive_stride else max(1, detect_stride)
+        self.stride.force_detect()
+        if not motion_gate:
+            self.motion_gate = None
+        elif self.motion_gate is None:
+            self.motion_gate = MotionGate(motion_min_area, motion_force_every)
+        else:
+            self.motion_gate.min_area = motion_min_area
+            self.motion_gate.force_every = motion_force_every
+        self._was_gated = False
+
+    def set_tracker(self, kind, lost_seconds=1.0):
+        """更换追踪器 (新追踪器的 ID 从头编号，逐目标状态一并清空)"""
+        self.tracker_kind = kind
+        self.track_lost_seconds = lost_seconds
+        self.reset_state()
+
+    def set_reid(self, enabled):
+        """开关跨摄像头重识别 (关闭前把在场目标发布出去)"""
+        self.reid_enabled = enabled
+        if enabled and self.reid is None:
+            self.reid = TrackEmbeddings(self.camera_id)
+        elif not enabled and self.reid is not None:
+            self.reid.flush()
+            self.reid = None
+
+    def set_precision(self, precision, channels_last=False, compile_model=False):
+        """修改推理精度 / 内存布局 / 编译选项 (下一次推理重建 predictor，并重新和 fp32 对比)"""
+        self.precision.set_precision(self.model, precision, channels_last, compile_model)
+        self._precision_checked = self.precision.precision == "fp32"
+
+    def set_resolution(self, imgsz, adaptive, imgsz_range=(320, 1280)):
+        """修改推理输入尺寸 (追踪状态保留，框坐标始终是原画面坐标)"""
+        self.resolution.imgsz = round_size(imgsz)
+        self.resolution.adaptive = adaptive
+        self.resolution.set_range(*imgsz_range)
+        self.resolution.reset()
+
+    def set_scheduler(self, scheduler):
+        """接入 / 断开多摄像头调度器 (断开时恢复配置的步长)"""
+        self.scheduler = scheduler
+        if scheduler is None:
+            self.schedule = None
+            self.stride.set_floor(1)
+
+    def _apply_schedule(self):
+        decision = self.scheduler.decision(self.camera_id)
+        if decision == self.schedule:
+            return
+        self.schedule = decision
+        # 调度器还没给 (或已注销) 本路的决定：不限步长，按配置跑
+        self.stride.set_floor(1 if decision is None else decision.stride)
+
+    def set_stream_fps(self, fps):
+        """视频源的实际帧率 (换源时调用)，测速和追踪器参数都按它换算"""
+        if fps and fps > 0 and fps != self.fps:
+            self.fps = fps
+            self.reset_state()
+
+    def set_zones(self, zones):
+        """更换计数线/区域配置 (计数从零开始)"""
+        self.zone_config = zones
+        self.zone_engine = None
+        self.dwell = None
+
+    def set_calibration(self, calibration):
+        """更换测速标定 (下一帧按新矩阵重建测速器)"""
+        self.calibration = calibration
+        self.estimator = None
+
+    def _build_zone_engine(self, frame):
+        h, w = frame.shape[:2]
+        config = self.zone_config or ZoneEngine.default_config((w, h), COUNT_CLASS_IDS)
+        return ZoneEngine(config, (w, h), num_classes=len(self.class_names) - 1)
+
+    def _gate_events(self, zone_result, tracker_ids, class_ids):
+        """本帧的越线 + 进入区域事件 [(线/区域名, 追踪ID, 类别, 方向 +1 进 / -1 出)]"""
+        events = [(self.zone_engine.line_names[line], int(tracker_ids[det]), int(class_ids[det]), int(direction))
+                  for line, det, direction in zone_result['crossings'].tolist()]
+        events.extend((zone, tid, cid, 1) for zone, tid, cid in self.dwell.last_entries)
+        return events
+
+    @staticmethod
+    def _nonzero_by_class(counts):
+        """按类别的计数数组 -> {class_id: 数量} (只保留非零项)"""
+        ids = np.flatnonzero(counts)
+        return dict(zip(ids.tolist(), counts[ids].tolist()))
+
+    def _infer(self, frame, use_sahi=False):
+        """跑一次完整推理，返回未追踪的 sv.Detections"""
+        if use_sahi and self.sahi_agent:
+            try:
+                # GPU SAHI 推理
+                return self.sahi_agent.infer(frame, conf_thres=0.35, slice_height=960, slice_width=960)
+            except Exception as e:
+                print(f"❌ GPU SAHI 出错: {e}")
+
+        # 普通 YOLO 推理 (ultralytics 会把框还原到原画面坐标，换尺寸不影响追踪)
+        detections = self._predict(frame, self.resolution.select())
+        self.resolution.observe(detections.xyxy, frame.shape)
+        return detections
+
+    def _predict(self, frame, imgsz):
+        """按指定输入尺寸跑一次普通推理 (不经过自适应尺寸的选择 / 统计)"""
+        results = self.precision.run(self.model, frame, verbose=False, conf=0.25, imgsz=imgsz)[0]
+        return sv.Detections.from_ultralytics(results)
+
+    def _check_precision(self, frame):
+        """
+        低精度推理的正确性校验：和 fp32 对比一次 (画面里没目标时等下一次检测帧)
+        两次推理固定用当前输入尺寸，不计入自适应尺寸的统计
+        """
+        imgsz = self.resolution.current
+        try:
+            report = self.precision.verify(self.model, lambda f: self._predict(f, imgsz), frame)
+        except Exception as e:
+            print(f"⚠️ 推理精度校验出错，回退 fp32: {e}")
+            self.precision.set_precision(self.model, "fp32")
+            report = {}
+        self._precision_checked = report is not None
+
+    def process_handle(self, ring, handle, **kwargs):
+        """处理共享内存里的一帧 (utils.shm_ring.FrameRing 句柄)，直接在槽位上读写不拷贝；引用由调用方负责 release"""
+        return self.process_frame(ring.view(handle), **kwargs)
+
+    def process_frame(self, img=None, use_sahi_override=False, speed_limit=60, annotate=True):
         if img is None:
             if self.cap is None: return None, {}
             ret, frame = self.cap.read()
@@ -102,80 +328,137 @@ class SmartDetector:
         else:
             frame = img
 
-        if self.line_zone is None:
+        if self.zone_engine is None:
+            self.zone_engine = self._build_zone_engine(frame)
+            self.dwell = DwellTracker(self.zone_engine.polygon_names, self.zone_engine.num_classes)
+        if self.tracker is None:
+            self.tracker = build_tracker(self.tracker_kind, fps=self.fps, stride=self.stride.effective,
+                                         lost_seconds=self.track_lost_seconds)
+            self.track_epoch = max(time.time_ns() // 1_000_000, self.track_epoch + 1)
+            self._tracker_stride = self.stride.effective
+        if self.estimator is None:
             h, w = frame.shape[:2]
-            line_y = int(h * 0.35)
-            self.line_zone = sv.LineZone(start=sv.Point(50, line_y), end=sv.Point(w - 50, line_y))
+            self.estimator = SpeedEstimator.from_calibration(self.calibration, (w, h))
+        self._frame_index += 1
+        video_ts = self._frame_index / self.fps
 
         # 1. 动态加载
         if use_sahi_override and SAHI_AVAILABLE and self.sahi_agent is None:
             self._init_sahi()
 
-        detections = None
+        # 2. 推理 (跳帧模式下，非检测帧由追踪器的运动模型外推目标框)
+        has_motion = self.motion_gate is None or self.motion_gate.check(frame)
+        if has_motion and self._was_gated:
+            # 门控刚放行 (有运动或到了强制检查周期)，这一帧必须真正推理
+            self.stride.force_detect()
+        self._was_gated = not has_motion
+        if self.scheduler is not None:
+            self._apply_schedule()
+            use_sahi_override = use_sahi_override and (self.schedule is None or self.schedule.allow_sahi)
+        if self.stride.effective != self._tracker_stride:
+            # 自适应步长 / 调度器改了步长：追踪器按新的更新频率换算丢失时长和速度 (不重建，ID 不变)
+            self._tracker_stride = self.stride.effective
+            self.tracker.set_frame_rate(update_rate(self.fps, self._tracker_stride))
+        run_detect = use_sahi_override or (has_motion and self.stride.should_detect())
+        infer_ms = 0.0
+        if run_detect:
+            if not self._precision_checked:
+                self._check_precision(frame)
+            t0 = time.perf_counter()
+            detections = self._infer(frame, use_sahi_override)
+            infer_ms = (time.perf_counter() - t0) * 1000
 
-        # 2. 推理逻辑
-        if use_sahi_override and self.sahi_agent:
-            try:
-                # GPU SAHI 推理
-                detections = self.sahi_agent.infer(frame, conf_thres=0.35, slice_height=960, slice_width=960)
-            except Exception as e:
-                print(f"❌ GPU SAHI 出错: {e}")
-                results = self.model(frame, verbose=False, conf=0.25)[0]
-                detections = sv.Detections.from_ultralytics(results)
+            # 3. 追踪
+            detections = self.tracker.update_with_detections(detections)
+            self.predictor.on_detect(detections)
+            self.stride.update(len(detections))
+        elif not has_motion:
+            # 画面静止：复用上次的检测结果，追踪器状态保持不变
+            detections = self.predictor.hold()
         else:
-            # 普通 YOLO 推理
-            results = self.model(frame, verbose=False, conf=0.25)[0]
-            detections = sv.Detections.from_ultralytics(results)
-            # 🟢 [调试] 打印检测到的数量，确认 YOLO 是否工作
-            # if len(detections) > 0: print(f"YOLO Detected: {len(detections)}")
+            detections = self.predictor.predict(self.tracker)
+
+        class_ids = detections.class_id.astype(int) if detections.class_id is not None else np.zeros(0, dtype=int)
+        tracker_ids = detections.tracker_id
+        slots = self.slots.update(tracker_ids)
+        if tracker_ids is None:
+            slots = None
+        fresh, released = self.slots.fresh, self.slots.released
 
-        # 3. 追踪
-        detections = self.tracker.update_with_detections(detections)
+        # 4. 计数线 / 区域 (所有线、所有区域一次算完，类别过滤由各自配置决定)
+        zone_result = self.zone_engine.update(detections.xyxy, class_ids, slots, fresh)
+        zone_visits = self.dwell.update(slots, tracker_ids, class_ids, zone_result['inside'], video_ts,
+                                        fresh=fresh, released=released)
 
-        # 4. 过滤机动车 (用于计数线)
-        vehicle_ids = [0, 2, 3, 4, 7, 8, 9]
-        mask = np.isin(detections.class_id, vehicle_ids)
-        self.line_zone.trigger(detections=detections[mask])
+        # 5. 测速 (整批向量化)
+        speeds = np.zeros(len(detections), dtype=int)
+        speed_mask = np.isin(class_ids, SPEED_CLASS_IDS)
+        # 静止帧沿用的是旧框，不算作一次观测；下一次检测时位移按实际间隔的帧数折算
+        if tracker_ids is not None and has_motion and np.any(speed_mask):
+            centers = detections.get_anchors_coordinates(sv.Position.CENTER)[speed_mask]
+            speeds[speed_mask] = self.estimator.estimate_speeds(
+                slots[speed_mask], centers, fps=self.fps, frame_index=self._frame_index, fresh=fresh[speed_mask])
+        over_speed = speeds > speed_limit
 
-        # 5. 数据统计
+        # 跨摄像头重识别 (只在检测帧按槽位错开采样，外推帧的框不准不采)
+        reid_matches = []
+        if self.reid is not None:
+            reid_matches = self.reid.update(frame, detections.xyxy, slots, tracker_ids, class_ids,
+                                            fresh, released, time.time(), detected=run_detect)
+
+        # 6. 数据统计 (按类别拆分本帧的进/出/在场数量，供时序统计使用)
         info_data = {
-            'in_count': self.line_zone.in_count,
-            'out_count': self.line_zone.out_count,
+            'in_count': self.zone_engine.in_count,
+            'out_count': self.zone_engine.out_count,
             'current_people': len(detections),
-            'alerts': []
+            'in_per_class': self._nonzero_by_class(zone_result['line_in'].sum(axis=0)),
+            'out_per_class': self._nonzero_by_class(zone_result['line_out'].sum(axis=0)),
+            'present_per_class': self._count_by_class(class_ids),
+            'zones': self.zone_engine.summary(zone_result),  # 各线累计进/出、各区域当前数量
+            'zone_result': zone_result,
+            'video_ts': video_ts,      # 视频时间 (秒)
+            'dwell': self.dwell.summary(video_ts),  # 各区域在场数量 / 平均、最长停留
+            'zone_visits': zone_visits,  # 本帧结束的区域访问 [(区域, ID, 类别, 进入, 离开, 停留秒数)]
+            'gate_events': self._gate_events(zone_result, tracker_ids, class_ids),  # OD 统计用
+            'detections': detections,  # 追踪后的结果 (含 tracker_id)
+            'track_epoch': self.track_epoch,  # 追踪器代数，tracker_id 只在同一代内唯一
+            'reid_matches': reid_matches,  # 本帧从其他摄像头接力过来的目标
+            'slots': slots,            # 与 detections 一一对应的槽位 (TrackSlots)，逐目标状态可直接按它索引
+            'speeds': speeds,          # 与 detections 一一对应 (km/h)
+            'detected': run_detect,    # 本帧是否跑了完整推理
+            'imgsz': self.resolution.last,  # 最近一次推理的输入尺寸
+            'motion_gated': not has_motion,
+            'schedule': self.schedule,  # 调度器给本路摄像头的决定 (core.scheduler.Decision)，未接调度器时为 None
+            'speeding': [],            # [(tracker_id, class_id, km/h), ...]
+            'alerts': []               # [Alert, ...] 由 AlertEngine 去重/限流
         }
 
-        labels = []
-        names = self.model.names
-
-        for xyxy, mask, confidence, class_id, tracker_id, data in detections:
-            # 兼容性获取类别名
-            if isinstance(names, dict):
-                class_name = names.get(class_id, f"ID-{class_id}")
-            else:
-                class_name = names[int(class_id)] if int(class_id) < len(names) else "Unknown"
-
-            speed = 0
-            if class_id in [2, 3, 4, 8, 9] and tracker_id is not None:
-                center_x = (xyxy[0] + xyxy[2]) / 2
-                center_y = (xyxy[1] + xyxy[3]) / 2
-                speed = self.estimator.estimate_speed(tracker_id, (center_x, center_y))
-
-            label_text = f"#{tracker_id} {class_name}"
-            if speed > 0:
-                label_text += f" {int(speed)}km/h"
-                if speed > speed_limit:
-                    info_data['alerts'].append(f"#{tracker_id} 超速: {int(speed)}km/h")
-                    label_text += " [⚡]"
-            labels.append(label_text)
-
-        # 6. 绘图
-        # 如果 labels 长度匹配，Annotator 就会工作
+        for i in np.flatnonzero(over_speed):
+            tid, cid, kmh = int(tracker_ids[i]), int(class_ids[i]), int(speeds[i])
+            info_data['speeding'].append((tid, cid, kmh))
+            info_data['alerts'].append(Alert("speeding", self.camera_id, track_id=tid, value=kmh, class_id=cid,
+                                               epoch=self.track_epoch))
+
+        if self.scheduler is not None:
+            self.scheduler.report(self.camera_id, infer_ms, detected=run_detect, sahi=use_sahi_override,
+                                  objects=len(detections), alerts=len(info_data['alerts']))
+
+        if not annotate:
+            return frame, info_data
+
+        # 7. 绘图 (标签字符串只在需要画面时才生成)
         if len(detections) > 0:
+            # 负数和越界的 class_id 都落到末尾的 Unknown (不能用 clip，负数会被当成类别 0)
+            unknown = len(self.class_names) - 1
+            names = self.class_names[np.where((class_ids >= 0) & (class_ids < unknown), class_ids, unknown)]
+            labels = [f"#{tid} {name}" for tid, name in zip(tracker_ids, names)]
+            for i in np.flatnonzero(speeds > 0):
+                labels[i] += f" {speeds[i]}km/h" + (" [⚡]" if over_speed[i] else "")
+
             frame = self.trace_annotator.annotate(scene=frame, detections=detections)
             frame = self.box_annotator.annotate(scene=frame, detections=detections)
             frame = self.label_annotator.annotate(scene=frame, detections=detections, labels=labels)
 
-        self.line_annotator.annotate(frame=frame, line_counter=self.line_zone)
+        self.zone_engine.annotate(frame, zone_result)
 
         return frame, info_data
\ No newline at end of file
@@ -0,0 +1,138 @@
+# core/dwell.py
+import numpy as np
+
+from core.track_slots import grow_rows
+
+# 停留时长直方图的分箱下界 (秒)，最后一档为 600 秒以上
+DWELL_BINS = np.array([0, 5, 10, 30, 60, 120, 300, 600], dtype=np.float64)
+
+
+class DwellTracker:
+    """
+    区域停留时长统计
+    - 输入 ZoneEngine 给出的 inside (Z, N) 矩阵，记录每个目标进入各区域的时间
+    - 目标离开区域 (或追踪丢失超过 lost_timeout 秒) 时产生一条访问记录，并计入直方图
+    - 状态全部按槽位 (TrackSlots) 存放：tid (S,) / enter (S, Z)，NaN 表示不在该区域，tid 为 -1 表示空闲
+
+    时间用视频时间 (帧号 / fps)，处理速度跟不上实时时停留时长也不会被拉长。
+    """
+
+    def __init__(self, zone_names, num_classes, bins=DWELL_BINS, lost_timeout=2.0):
+        self.zone_names = list(zone_names)
+        self.num_classes = num_classes
+        self.bins = np.asarray(bins, dtype=np.float64)
+        self.lost_timeout = lost_timeout  # 短暂遮挡时 ID 会找回来，超过这个时间才算离开
+
+        n_zones = len(self.zone_names)
+        self.hist = np.zeros((n_zones, num_classes, len(self.bins)), dtype=np.int64)
+
+        self._tid = np.empty(0, dtype=np.int64)
+        self._cls = np.empty(0, dtype=np.int64)
+        self._enter = np.empty((0, n_zones), dtype=np.float64)
+        self._last_seen = np.empty(0, dtype=np.float64)
+        self.last_entries = []  # 最近一次 update 中新进入区域的 [(区域名, 追踪ID, 类别)]
+
+    def update(self, slots, tracker_ids, class_ids, inside, ts, fresh=None, released=None):
+        """
+        :param slots: (N,) 目标槽位 (TrackSlots.update 的返回值)
+        :param tracker_ids: (N,) 追踪ID (只用于输出记录)
+        :param class_ids: (N,) 类别
+        :param inside: (Z, N) 是否在各区域内
+        :param ts: 当前时间 (秒)
+        :param fresh: (N,) 槽位是否本帧新分配 (TrackSlots.fresh)
+        :param released: 本帧回收的槽位 (TrackSlots.released)
+        :return: 本帧结束的访问 [(区域名, 追踪ID, 类别, 进入时间, 离开时间, 停留秒数), ...]
+        """
+        self.last_entries = []
+        if not self.zone_names:
+            return []
+        if slots is None or tracker_ids is None:
+            slots = np.empty(0, dtype=np.int64)
+            tracker_ids = np.empty(0, dtype=np.int64)
+            inside = np.zeros((len(self.zone_names), 0), dtype=bool)
+        slots = np.asarray(slots, dtype=np.int64)
+        if len(slots) and slots.max() >= len(self._tid):
+            self._grow(max(int(slots.max()) + 1, 2 * len(self._tid)))
+
+        # 1. 槽位被回收或换了主人：上一个目标的访问按最后出现时间结束
+        stale = np.zeros(len(self._tid), dtype=bool)
+        if released is not None:
+            released = np.asarray(released, dtype=np.int64)
+            stale[released[released < len(stale)]] = True
+        if fresh is not None:
+            stale[slots[fresh]] = True
+        stale &= self._tid >= 0
+        visits = []
+        if np.any(stale):
+            visits = self._close(~np.isnan(self._enter) & stale[:, None], self._last_seen)
+            self._tid[stale] = -1
+
+        self._tid[slots] = tracker_ids
+        self._cls[slots] = class_ids
+        self._last_seen[slots] = ts
+
+        present = np.zeros(len(self._tid), dtype=bool)
+        present[slots] = True
+        now_in = np.zeros_like(self._enter, dtype=bool)
+        now_in[slots] = inside.T
+        was_in = ~np.isnan(self._enter)
+
+        # 2. 进入
+        entered = now_in & ~was_in
+        self._enter[entered] = ts
+        rows, zones = np.nonzero(entered)
+        self.last_entries = [(self.zone_names[z], int(self._tid[r]), int(self._cls[r]))
+                             for r, z in zip(rows, zones)]
+
+        # 3. 离开：在画面里但已不在区域内 / 丢失超时 (按最后出现时间结束)
+        lost = (self._tid >= 0) & ~present & (ts - self._last_seen > self.lost_timeout)
+        exited = was_in & ((present[:, None] & ~now_in) | lost[:, None])
+        visits += self._close(exited, np.where(present, ts, self._last_seen))
+        self._tid[lost] = -1
+        return visits
+
+    def flush(self):
+        """结束所有未完成的访问 (视频结束时调用)，以最后出现时间作为离开时间"""
+        if not len(self._tid):
+            return []
+        visits = self._close(~np.isnan(self._enter), self._last_seen)
+        self._tid[:] = -1
+        return visits
+
+    def _close(self, mask, exit_times):
+        rows, zones = np.nonzero(mask)
+        if not len(rows):
+            return []
+        enter = self._enter[rows, zones]
+        leave = exit_times[rows]
+        dwell = np.maximum(leave - enter, 0.0)
+        cls = self._cls[rows]
+
+        valid = (cls >= 0) & (cls < self.num_classes)
+        bin_idx = np.searchsorted(self.bins, dwell, side='right') - 1
+        np.add.at(self.hist, (zones[valid], cls[valid], bin_idx[valid]), 1)
+        self._enter[rows, zones] = np.nan
+
+        return [(self.zone_names[z], int(tid), int(c), float(t0), float(t1), float(d))
+                for z, tid, c, t0, t1, d in zip(zones, self._tid[rows], cls, enter, leave, dwell)]
+
+    def _grow(self, size):
+        self._tid = grow_rows(self._tid, size, -1)
+        self._cls = grow_rows(self._cls, size, -1)
+        self._enter = grow_rows(self._enter, size, np.nan)
+        self._last_seen = grow_rows(self._last_seen, size, 0.0)
+
+    def summary(self, ts):
+        """各区域当前在场数量、平均/最长已停留时长 (秒)"""
+        result = {}
+        inside = ~np.isnan(self._enter)
+        elapsed = np.where(inside, ts - np.nan_to_num(self._enter), 0.0)
+        counts = inside.sum(axis=0)
+        for z, name in enumerate(self.zone_names):
+            n = int(counts[z])
+            result[name] = {
+                'inside': n,
+                'avg_dwell': float(elapsed[:, z].sum() / n) if n else 0.0,
+                'max_dwell': float(elapsed[:, z].max()) if n else 0.0,
+            }
+        return result
@@ -0,0 +1,126 @@
+# core/frame_skipper.py
+import numpy as np
+import supervision as sv
+
+
+class AdaptiveStride:
+    """
+    跳帧检测步长控制
+    - fixed 模式：每 stride 帧跑一次完整推理
+    - adaptive 模式：画面稳定 (目标数变化小) 时逐步加大步长，目标数变化剧烈时立刻回到最小步长
+    - floor：外部 (多摄像头调度器) 限定的步长下限，实际步长 effective = max(stride, floor)
+    """
+
+    def __init__(self, stride=1, adaptive=False, min_stride=1, max_stride=4,
+                 stable_rounds=5, change_ratio=0.2):
+        self.adaptive = adaptive
+        self.min_stride = max(1, min_stride)
+        self.max_stride = max(self.min_stride, max_stride)
+        self.stride = max(1, stride) if not adaptive else self.min_stride
+        self.stable_rounds = stable_rounds  # 连续多少次检测都稳定才加大步长
+        self.change_ratio = change_ratio    # 目标数相对变化超过该比例视为“变化快”
+
+        self.floor = 1
+        self._countdown = 0
+        self._last_count = None
+        self._stable = 0
+
+    @property
+    def effective(self):
+        """实际使用的步长"""
+        return max(self.stride, self.floor)
+
+    def set_floor(self, floor):
+        """调度器降级时提高步长下限 (下一轮倒计时生效)"""
+        self.floor = max(1, int(floor))
+
+    def should_detect(self):
+        """本帧是否需要跑完整推理"""
+        stride = self.effective
+        if self._countdown <= 0:
+            self._countdown = stride
+        self._countdown -= 1
+        return self._countdown == stride - 1
+
+    def force_detect(self):
+        """下一次 should_detect 必定返回 True (例如运动门控刚放行)"""
+        self._countdown = 0
+
+    def reset(self):
+        """清空历史，下一帧强制检测 (切换视频源时调用)"""
+        self._countdown = 0
+        self._last_count = None
+        self._stable = 0
+        if self.adaptive:
+            self.stride = self.min_stride
+
+    def update(self, count):
+        """检测帧结束后回传当前目标数，用于调整步长"""
+        if not self.adaptive:
+            return
+        if self._last_count is not None:
+            base = max(self._last_count, 1)
+            if abs(count - self._last_count) / base > self.change_ratio:
+                # 变化剧烈：回到最小步长，下一帧就检测
+                self._stable = 0
+                if self.stride != self.min_stride:
+                    self.stride = self.min_stride
+                    self._countdown = 0
+            else:
+                self._stable += 1
+                if self._stable >= self.stable_rounds and self.stride < self.max_stride:
+                    self.stride += 1
+                    self._stable = 0
+        self._last_count = count
+
+
+class TrackPredictor:
+    """
+    跳过的帧用追踪器的运动模型外推目标框
+    只读取追踪器给出的速度 (tracker.velocities，见 core/trackers.py)，不修改追踪器状态，
+    下一次真正检测时追踪器仍按原逻辑预测 + 关联
+    """
+
+    def __init__(self):
+        self.last_detections = None  # 最近一次检测帧追踪后的结果
+        self.frames_since_detect = 0
+        self.detect_gap = 1           # 最近两次检测之间隔了多少帧 (追踪器速度以“每次更新”为单位)
+
+    def on_detect(self, detections):
+        if self.last_detections is not None:
+            self.detect_gap = max(1, self.frames_since_detect + 1)
+        self.last_detections = detections
+        self.frames_since_detect = 0
+
+    def reset(self):
+        self.last_detections = None
+        self.frames_since_detect = 0
+        self.detect_gap = 1
+
+    def hold(self):
+        """画面静止时直接沿用上次检测结果 (不外推、不推进计时)"""
+        if self.last_detections is None:
+            return sv.Detections.empty()
+        return self.last_detections
+
+    def predict(self, tracker):
+        """返回外推后的 sv.Detections (沿用上次检测的类别/置信度/tracker_id)"""
+        self.frames_since_detect += 1
+        last = self.last_detections
+        if last is None or len(last) == 0 or last.tracker_id is None:
+            return sv.Detections.empty()
+
+        # 上次输出里追踪器还在跟的目标才外推
+        found, velocity = tracker.velocities(last.tracker_id)
+        if not np.any(found):
+            return sv.Detections.empty()
+
+        # 以上次检测框为起点叠加速度 (卡尔曼均值本身是平滑后的位置，会滞后于真实框)
+        k = self.frames_since_detect / self.detect_gap
+        xyxy = last.xyxy[found] + k * velocity[found]
+        # 框不能缩成负尺寸
+        xyxy[:, 2:] = np.maximum(xyxy[:, 2:], xyxy[:, :2] + 1.0)
+
+        predicted = last[found]
+        predicted.xyxy = xyxy.astype(np.float32)
+        return predicted
@@ -0,0 +1,64 @@
+# core/motion_gate.py
+import cv2
+
+
+class MotionGate:
+    """
+    运动门控：推理前先用低分辨率帧差判断画面有没有东西在动
+    - 画面缩到 160 像素宽的灰度图，与上一次“放行”时的参考帧做差分
+      (跟参考帧比而不是跟上一帧比，慢速移动也会逐渐累积到阈值)
+    - 运动面积占比低于 min_area 时不跑推理，直接复用上一次的检测结果和追踪状态
+    - 每隔 force_every 帧强制放行一次，防止静止目标的状态过期
+    """
+
+    def __init__(self, min_area=0.002, force_every=30, width=160, diff_threshold=25):
+        self.min_area = min_area
+        self.force_every = force_every
+        self.width = width
+        self.diff_threshold = diff_threshold
+
+        self._ref = None
+        self._since_pass = 0
+        self.last_motion = 0.0
+        self.frames_total = 0
+        self.frames_skipped = 0
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        height = max(1, int(h * self.width / w))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame):
+        """返回 True 表示本帧需要推理"""
+        self.frames_total += 1
+        gray = self._prepare(frame)
+
+        if self._ref is None or self._ref.shape != gray.shape:
+            self._pass(gray)
+            return True
+
+        diff = cv2.absdiff(gray, self._ref)
+        _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+        self.last_motion = cv2.countNonZero(mask) / mask.size
+
+        self._since_pass += 1
+        if self.last_motion >= self.min_area or self._since_pass >= self.force_every:
+            self._pass(gray)
+            return True
+
+        self.frames_skipped += 1
+        return False
+
+    def _pass(self, gray):
+        self._ref = gray
+        self._since_pass = 0
+
+    def reset(self):
+        self._ref = None
+        self._since_pass = 0
+
+    @property
+    def skip_ratio(self):
+        return self.frames_skipped / self.frames_total if self.frames_total else 0.0
@@ -0,0 +1,88 @@
+# core/od_matrix.py
+import numpy as np
+
+
+class ODTracker:
+    """
+    实时 OD (起点-终点) 统计
+    - 一条出行 = 同一追踪ID 的一串闸口事件 (越线 / 进入区域)，相邻事件间隔超过 gap_timeout 秒即视为新出行
+    - 起点 = 第一个闸口，终点 = 最后一个闸口；只经过一个闸口的出行记在对角线上
+    - 出行在最后一个事件之后 gap_timeout 秒才结束，届时由 update() 返回
+    - 追踪器重建后 ID 从 1 重新编号，出行按 (追踪器代数 epoch, 追踪ID) 区分；
+      代数变化时上一代的出行不会再有新事件，立即全部结束
+    与 od_from_events() 的离线重算规则一致，两者结果可以直接相加/对比。
+    """
+
+    def __init__(self, gap_timeout=30.0):
+        self.gap_timeout = gap_timeout
+        # (epoch, track_id) -> [起点, 起点时间, 终点, 最后事件时间, 类别]
+        self._open = {}
+        self._epoch = None
+        self._last_scan = None
+
+    def update(self, gate_events, ts, epoch=0):
+        """
+        :param gate_events: [(闸口名, 追踪ID, 类别, 方向), ...]
+        :param epoch: 追踪器代数 (SmartDetector.track_epoch)
+        :return: 已结束的出行 [(起点, 终点, 类别, 起点时间), ...]
+        """
+        finished = []
+        if epoch != self._epoch:
+            finished.extend(self.flush())
+            self._epoch = epoch
+        for gate, tid, cid, _ in gate_events:
+            key = (epoch, tid)
+            trip = self._open.get(key)
+            if trip is not None and ts - trip[3] > self.gap_timeout:
+                finished.append((trip[0], trip[2], trip[4], trip[1]))
+                trip = None
+            if trip is None:
+                self._open[key] = [gate, ts, gate, ts, cid]
+            else:
+                trip[2], trip[3] = gate, ts
+
+        # 超时扫描每秒做一次就够了
+        if self._open and (self._last_scan is None or ts - self._last_scan >= 1.0):
+            self._last_scan = ts
+            expired = [key for key, trip in self._open.items() if ts - trip[3] > self.gap_timeout]
+            for key in expired:
+                trip = self._open.pop(key)
+                finished.append((trip[0], trip[2], trip[4], trip[1]))
+        return finished
+
+    def flush(self):
+        """结束所有进行中的出行 (切换视频源 / 退出时调用)"""
+        finished = [(t[0], t[2], t[4], t[1]) for t in self._open.values()]
+        self._open.clear()
+        return finished
+
+
+def od_from_events(track_ids, gates, class_ids, ts, gap_timeout=30.0):
+    """
+    从历史闸口事件批量还原出行 (向量化 group-by)
+    :param track_ids / gates / class_ids / ts: 等长数组，gates 为整数编码
+    :return: (起点, 终点, 类别, 起点时间) 四个数组，每条出行一个元素
+    """
+    track_ids = np.asarray(track_ids)
+    if len(track_ids) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, np.empty(0, dtype=np.float64)
+    gates, class_ids, ts = np.asarray(gates), np.asarray(class_ids), np.asarray(ts, dtype=np.float64)
+
+    order = np.lexsort((ts, track_ids))
+    track_ids, gates, class_ids, ts = track_ids[order], gates[order], class_ids[order], ts[order]
+
+    new_trip = np.ones(len(ts), dtype=bool)
+    new_trip[1:] = (track_ids[1:] != track_ids[:-1]) | (np.diff(ts) > gap_timeout)
+    first = np.flatnonzero(new_trip)
+    last = np.concatenate([first[1:], [len(ts)]]) - 1
+    return gates[first], gates[last], class_ids[first], ts[first]
+
+
+def count_trips(origins, destinations, class_ids, start_ts, bucket_seconds=3600):
+    """按 (时间桶, 起点, 终点, 类别) 计数，返回 (keys (K, 4), counts (K,))"""
+    if len(origins) == 0:
+        return np.empty((0, 4), dtype=np.int64), np.empty(0, dtype=np.int64)
+    buckets = (np.asarray(start_ts) // bucket_seconds).astype(np.int64) * bucket_seconds
+    keys = np.stack([buckets, origins, destinations, class_ids], axis=1).astype(np.int64)
+    return np.unique(keys, axis=0, return_counts=True)
@@ -0,0 +1,223 @@
+# core/pipeline.py
+"""
+采集 / 推理 / 录像 多进程流水线 (绕开 GIL，用满多核)
+帧只写一次：采集进程用 VideoCapture.read 直接解码进共享内存槽位 (utils.shm_ring.FrameRing)，
+进程之间的队列里只传 FrameHandle (几十字节)，推理进程和录像进程按句柄直接读共享内存。
+
+    capture_worker ──handle──> detect_worker ──结果 (info)──> 主进程 results 队列
+          └─────────handle──> record_worker <──录像命令── 主进程
+                                    └──录像文件路径──> 主进程 events 队列
+
+引用计数：采集进程按下游数量 (推理 + 录像) 给每帧计 refs；
+某个下游的队列满了 (处理不过来) 就丢掉给它的这一份 (替它 release)，不会阻塞采集。
+推理进程 forward_frames=True 时把自己那份引用连同结果一起交给主进程 (用来显示)，由主进程 release。
+"""
+import multiprocessing as mp
+import queue
+import time
+
+import cv2
+import numpy as np
+
+from utils.shm_ring import FrameRing
+
+
+def read_frame(cap, ring, camera_id="", frame_index=0, refs=1):
+    """
+    从 VideoCapture 直接解码进共享内存槽位
+    :return: (ok, handle, frame)
+        handle 为 None 表示槽位已满 (frame 是普通 numpy 帧，调用方自己决定是否丢掉)
+        frame 在 handle 不为 None 时是共享内存里的视图
+    """
+    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    ts = time.time()
+    if w <= 0 or h <= 0:
+        # 拿不到分辨率 (部分网络流)，先解码再拷进槽位
+        ret, frame = cap.read()
+        if not ret:
+            return False, None, None
+        handle = ring.put(frame, camera_id, ts, frame_index, refs)
+        return True, handle, ring.view(handle) if handle is not None else frame
+
+    handle, view = ring.reserve((h, w, 3), camera_id, ts, frame_index, refs)
+    if view is None:
+        ret, frame = cap.read()  # 槽位已满，这一帧不进共享内存
+        return ret, None, frame if ret else None
+    ret, frame = cap.read(view)
+    if not ret:
+        ring.release(handle, refs)
+        return False, None, None
+    if np.shares_memory(frame, view):
+        return True, handle, view
+    # 实际画面尺寸和属性对不上 (OpenCV 重新分配了内存)，退回拷贝一次
+    ring.release(handle, refs)
+    handle = ring.put(frame, camera_id, ts, frame_index, refs)
+    return True, handle, ring.view(handle) if handle is not None else frame
+
+
+def _offer(ring, handle, outbox):
+    """把一份引用交给下游；下游队列满了就替它 release (丢帧)"""
+    try:
+        outbox.put_nowait(handle)
+        return True
+    except queue.Full:
+        ring.release(handle)
+        return False
+
+
+def capture_worker(source, camera_id, ring, outboxes, stop, loop=False):
+    cv2.setNumThreads(1)
+    cap = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    frame_index = 0
+    while not stop.is_set():
+        ok, handle, _ = read_frame(cap, ring, camera_id, frame_index, refs=len(outboxes))
+        if not ok:
+            if loop and cap.isOpened():
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            break
+        frame_index += 1
+        if handle is None:
+            continue  # 所有槽位都被占着，丢掉这一帧
+        for outbox in outboxes:
+            _offer(ring, handle, outbox)
+    cap.release()
+    for outbox in outboxes:
+        try:
+            outbox.put(None, timeout=1.0)  # 下游已经退出时不卡住
+        except queue.Full:
+            pass
+    ring.close()
+
+
+def detect_worker(ring, inbox, results, detector_kwargs, stop, speed_limit=60, forward_frames=False):
+    from core.detector import SmartDetector
+    detector = SmartDetector(**detector_kwargs)
+    while not stop.is_set():
+        try:
+            handle = inbox.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if handle is None:
+            break
+        try:
+            _, info = detector.process_handle(ring, handle, speed_limit=speed_limit, annotate=False)
+            info.pop('zone_result', None)  # 体积大且主进程用不到
+            results.put((handle if forward_frames else None, handle.frame_index, info))
+        finally:
+            if not forward_frames:
+                ring.release(handle)
+    results.put(None)
+    ring.close()
+
+
+def record_worker(ring, inbox, commands, events, stop, save_dir="records", max_cache_frames=150):
+    from utils.video_saver import VideoSaver
+    saver = VideoSaver(save_dir=save_dir, max_cache_frames=max_cache_frames, ring=ring)
+    while not stop.is_set():
+        try:
+            while True:
+                duration, filename = commands.get_nowait()
+                saver.start_recording(duration, filename, on_finish=events.put)
+        except queue.Empty:
+            pass
+        try:
+            handle = inbox.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if handle is None:
+            break
+        saver.update_frame(handle)  # 这份引用归录像缓存所有
+    while saver.is_recording:
+        time.sleep(0.1)
+    saver.clear()
+    ring.close()
+
+
+class FramePipeline:
+    """
+    单路摄像头的三进程流水线
+    :param max_shape: 共享内存槽位的最大帧尺寸
+    :param n_slots: 槽位数，至少 录像预录帧数 + 两个队列的长度
+    """
+
+    def __init__(self, source, camera_id="CAM_01", detector_kwargs=None, speed_limit=60,
+                 max_shape=(1080, 1920, 3), max_cache_frames=150, queue_size=8, n_slots=None,
+                 save_dir="records", forward_frames=False, loop=False):
+        self.ctx = mp.get_context('spawn')  # 子进程要用 CUDA，不能 fork
+        n_slots = n_slots or max_cache_frames + 2 * queue_size + 4
+        self.ring = FrameRing(n_slots, max_shape, ctx=self.ctx)
+        self.stop_event = self.ctx.Event()
+        self.detect_inbox = self.ctx.Queue(queue_size)
+        self.record_inbox = self.ctx.Queue(queue_size)
+        self.results = self.ctx.Queue()
+        self.commands = self.ctx.Queue()
+        self.events = self.ctx.Queue()
+        kwargs = dict(detector_kwargs or {}, camera_id=camera_id)
+        self.processes = [
+            self.ctx.Process(target=capture_worker, name=f"capture-{camera_id}", daemon=True,
+                             args=(source, camera_id, self.ring, [self.detect_inbox, self.record_inbox],
+                                   self.stop_event, loop)),
+            self.ctx.Process(target=detect_worker, name=f"detect-{camera_id}", daemon=True,
+                             args=(self.ring, self.detect_inbox, self.results, kwargs, self.stop_event,
+                                   speed_limit, forward_frames)),
+            self.ctx.Process(target=record_worker, name=f"record-{camera_id}", daemon=True,
+                             args=(self.ring, self.record_inbox, self.commands, self.events, self.stop_event,
+                                   save_dir, max_cache_frames)),
+        ]
+
+    def start(self):
+        for p in self.processes:
+            p.start()
+        return self
+
+    def record(self, duration=10, filename=None):
+        """让录像进程开始录一段 (预录缓存 + 之后 duration 秒)，文件路径完成后出现在 events 队列"""
+        self.commands.put((duration, filename))
+
+    def frame(self, handle):
+        """forward_frames 模式下取结果对应的画面 (用完调用 release)"""
+        return self.ring.view(handle)
+
+    def release(self, handle):
+        self.ring.release(handle)
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        for p in self.processes:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self.ring.reset()
+        self.ring.close()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="多进程检测流水线 (无界面)")
+    parser.add_argument('source')
+    parser.add_argument('--camera', default='CAM_01')
+    parser.add_argument('--model', default='weights/yolov8m_cbam.pt')
+    parser.add_argument('--seconds', type=float, default=0, help="运行多久 (0 = 直到视频结束)")
+    args = parser.parse_args()
+
+    pipeline = FramePipeline(args.source, args.camera, {'model_path': args.model}).start()
+    t0, frames = time.time(), 0
+    try:
+        while not args.seconds or time.time() - t0 < args.seconds:
+            item = pipeline.results.get()
+            if item is None:
+                break
+            frames += 1
+            _, index, info = item
+            if info['alerts']:
+                pipeline.record()
+                print(f"🚨 帧 {index}: {len(info['alerts'])} 条报警，开始录像")
+    finally:
+        pipeline.stop()
+    print(f"✅ 处理 {frames} 帧, {frames / max(time.time() - t0, 1e-6):.1f} FPS")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+# core/precision.py
+import contextlib
+
+import numpy as np
+import torch
+
+from core.trackers import assign, box_iou
+
+PRECISIONS = ("fp32", "fp16", "bf16", "auto")
+
+
+def cpu_bf16_supported():
+    """CPU 是否支持 bf16 推理 (oneDNN 检测的指令集，老 CPU 返回 False)"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+
+def resolve_precision(precision, device):
+    """
+    把配置的精度换算成当前设备实际能用的精度，不支持时打印警告回退 fp32
+    - fp16：只在 CUDA 上启用 (CPU 上 fp16 卷积比 fp32 还慢)
+    - bf16：CUDA 需要 Ampere 及以上，CPU 需要 oneDNN 支持 bf16 的指令集
+    - auto：CUDA 用 fp16，CPU 保持 fp32
+    """
+    cuda = str(device).startswith('cuda')
+    if precision == "auto":
+        return "fp16" if cuda else "fp32"
+    if precision == "fp16" and not cuda:
+        print("⚠️ fp16 推理需要 CUDA，回退 fp32")
+        return "fp32"
+    if precision == "bf16":
+        supported = torch.cuda.is_bf16_supported() if cuda else cpu_bf16_supported()
+        if not supported:
+            print(f"⚠️ 当前设备 ({device}) 不支持 bf16，回退 fp32")
+            return "fp32"
+    if precision not in PRECISIONS:
+        print(f"⚠️ 未知推理精度 {precision}，使用 fp32")
+        return "fp32"
+    return precision
+
+
+def compare_detections(reference, candidate, iou_threshold=0.9):
+    """
+    对比两组检测结果 (sv.Detections)：同类别且 IoU >= iou_threshold 的框算一致
+    :return: dict(agreement 一致框占比, conf_diff 一致框的平均置信度差, reference, candidate 框数)
+    """
+    n_ref, n_cand = len(reference), len(candidate)
+    iou = box_iou(reference.xyxy, candidate.xyxy)
+    same_class = np.asarray(reference.class_id)[:, None] == np.asarray(candidate.class_id)[None, :]
+    rows, cols = assign(np.where(same_class, 1 - iou, 1.0), 1 - iou_threshold)
+    conf_diff = np.abs(reference.confidence[rows] - candidate.confidence[cols]) if len(rows) else np.zeros(0)
+    return {
+        'agreement': len(rows) / max(n_ref, n_cand, 1),
+        'conf_diff': float(conf_diff.mean()) if len(conf_diff) else 0.0,
+        'reference': n_ref,
+        'candidate': n_cand,
+    }
+
+
+class InferencePrecision:
+    """
+    推理精度 / 内存布局设置，普通推理和 GPU SAHI 共用
+    - fp16：交给 ultralytics 的 half=True (模型权重和输入都转半精度)
+    - bf16：torch.autocast 包住前向，检测头 (框坐标解码) 保持 fp32，避免 bf16 尾数太短让坐标抖动
+    - channels_last：卷积权重转 NHWC，cuDNN / oneDNN 能选更快的卷积实现
+    - compile：第一次推理建好 ultralytics 的 predictor 之后再对网络做 torch.compile，
+      编译后的模型运行出错时自动退回 eager 模式
+    所有推理都在 torch.inference_mode() 里执行。
+    改了精度 / 布局要调用 apply(yolo)，它会丢掉旧的 predictor，下次推理按新设置重建。
+    """
+
+    def __init__(self, precision="fp32", device='cpu', channels_last=False, compile_model=False):
+        self.device = str(device)
+        self.requested = precision
+        self.precision = resolve_precision(precision, self.device)
+        self.channels_last = channels_last
+        self.compile_model = compile_model and hasattr(torch, 'compile')
+        if compile_model and not self.compile_model:
+            print("⚠️ 当前 PyTorch 没有 torch.compile，忽略编译选项")
+        self._eager = None      # 编译前的网络，编译版出错时换回来
+        self._compiled = False
+
+    @property
+    def device_type(self):
+        return 'cuda' if self.device.startswith('cuda') else 'cpu'
+
+    @property
+    def input_dtype(self):
+        """SAHI 切片输入的 dtype (bf16 靠 autocast，输入保持 fp32)"""
+        return torch.float16 if self.precision == "fp16" else torch.float32
+
+    def predict_kwargs(self):
+        return {'half': self.precision == "fp16"}
+
+    def context(self):
+        stack = contextlib.ExitStack()
+        stack.enter_context(torch.inference_mode())
+        if self.precision == "bf16":
+            stack.enter_context(torch.autocast(self.device_type, dtype=torch.bfloat16))
+        return stack
+
+    def prepare_input(self, tensor):
+        """(B, C, H, W) 输入转成推理用的 dtype / 内存布局"""
+        tensor = tensor.to(self.input_dtype)
+        if self.channels_last:
+            tensor = tensor.contiguous(memory_format=torch.channels_last)
+        return tensor
+
+    def apply(self, yolo):
+        """把当前设置应用到 YOLO 模型 (初始化或改设置后调用)"""
+        net = getattr(yolo, 'model', None)
+        if isinstance(net, torch.nn.Module):
+            # 之前 half=True 跑过的话权重已经是 fp16，先统一转回 fp32
+            net.float()
+            net.to(memory_format=torch.channels_last if self.channels_last else torch.contiguous_format)
+            if self.precision == "bf16":
+                self._fp32_head(net)
+        yolo.predictor = None   # half / 编译状态都绑在 predictor 上，下次推理重建
+        self._eager = None
+        self._compiled = False
+
+    def set_precision(self, yolo, precision, channels_last=None, compile_model=None):
+        """运行中修改设置"""
+        self.requested = precision
+        self.precision = resolve_precision(precision, self.device)
+        if channels_last is not None:
+            self.channels_last = channels_last
+        if compile_model is not None:
+            self.compile_model = compile_model and hasattr(torch, 'compile')
+        self.apply(yolo)
+
+    def _fp32_head(self, net):
+        """检测头关掉 autocast、输入转回 fp32 (框坐标解码在 fp32 下做)"""
+        layers = getattr(net, 'model', None)
+        head = layers[-1] if isinstance(layers, torch.nn.Sequential) and len(layers) else None
+        if head is None or getattr(head, '_fp32_head', False):
+            return
+        forward = head.forward
+        device_type = self.device_type
+
+        def fp32_forward(x):
+            with torch.autocast(device_type, enabled=False):
+                return forward([t.float() for t in x])
+
+        head.forward = fp32_forward
+        head._fp32_head = True
+
+    def run(self, yolo, source, **kwargs):
+        """按当前精度调用 YOLO (kwargs 原样传给 ultralytics)"""
+        kwargs.update(self.predict_kwargs())
+        try:
+            with self.context():
+                results = yolo(source, **kwargs)
+        except Exception as e:
+            if not self._restore_eager(yolo):
+                raise
+            print(f"⚠️ torch.compile 后的模型运行失败，退回普通模式: {e}")
+            with self.context():
+                results = yolo(source, **kwargs)
+        if self.compile_model and not self._compiled:
+            self._compile(yolo)
+        return results
+
+    def _compile(self, yolo):
+        self._compiled = True
+        backend = getattr(getattr(yolo, 'predictor', None), 'model', None)
+        net = getattr(backend, 'model', None)
+        if not isinstance(net, torch.nn.Module):
+            return
+        try:
+            backend.model = torch.compile(net, dynamic=True)
+            self._eager = net
+            print("🚀 模型已 torch.compile (首次推理会比较慢)")
+        except Exception as e:
+            print(f"⚠️ torch.compile 失败，继续使用普通模式: {e}")
+
+    def _restore_eager(self, yolo):
+        backend = getattr(getattr(yolo, 'predictor', None), 'model', None)
+        if self._eager is None or backend is None:
+            return False
+        backend.model = self._eager
+        self._eager = None
+        self.compile_model = False
+        return True
+
+    def verify(self, yolo, infer, frame, min_agreement=0.9, max_conf_diff=0.03):
+        """
+        用同一帧对比当前精度和 fp32 的检测结果，差别太大就回退 fp32 (只有回退时才 apply)
+        :param infer: infer(frame) -> sv.Detections，按当前设置跑一次推理；会被调用两次，不要带状态
+        :return: compare_detections 的结果；当前就是 fp32 或画面里没有目标 (没法对比) 时返回 None
+        """
+        if self.precision == "fp32":
+            return None
+        candidate = infer(frame)
+        if len(candidate) == 0:
+            return None
+
+        precision = self.precision
+        reference = self._reference(yolo, infer, frame)
+        report = compare_detections(reference, candidate)
+        report['precision'] = precision
+
+        if report['agreement'] >= min_agreement and report['conf_diff'] <= max_conf_diff:
+            print(f"✅ {precision} 推理校验通过: 一致框 {report['agreement']:.0%}, "
+                  f"置信度平均差 {report['conf_diff']:.4f}")
+        else:
+            print(f"⚠️ {precision} 推理与 fp32 差别过大 (一致框 {report['agreement']:.0%}, "
+                  f"置信度平均差 {report['conf_diff']:.4f})，回退 fp32")
+            self.precision = "fp32"
+            self.apply(yolo)
+        return report
+
+    def _reference(self, yolo, infer, frame):
+        """
+        临时按 fp32 跑一次参照推理，结束后原样恢复 (不调用 apply，已建好的 predictor / 编译结果保留)
+        - bf16 只是 autocast，关掉即可
+        - fp16 的 predictor 把权重和输入都固定成了半精度，参照推理用一个临时 predictor，权重先转回 fp32
+        """
+        precision, predictor = self.precision, getattr(yolo, 'predictor', None)
+        net = getattr(yolo, 'model', None)
+        half = precision == "fp16" and isinstance(net, torch.nn.Module)
+        self.precision = "fp32"
+        try:
+            if half:
+                yolo.predictor = None
+                net.float()
+            return infer(frame)
+        finally:
+            self.precision = precision
+            if half:
+                net.half()
+                yolo.predictor = predictor
@@ -0,0 +1,305 @@
+# core/reid.py
+import threading
+
+import cv2
+import numpy as np
+
+from core.track_slots import grow_rows
+
+# 外观特征：框上下两半各一个 HSV 直方图 (H x S 有色像素 + V 灰度像素)
+H_BINS, S_BINS, V_BINS = 16, 4, 8
+_HALF_DIM = H_BINS * S_BINS + V_BINS
+EMBED_DIM = 2 * _HALF_DIM
+_CROP_W, _CROP_H = 32, 64
+_MIN_SATURATION = 40  # 饱和度低于它的像素 (黑/白/灰车) 色调不可靠，只计入亮度直方图
+
+
+def extract_embeddings(frame, xyxy):
+    """
+    批量提取外观特征 (颜色直方图，不依赖额外模型)
+    每个框取中间 80% 宽度缩放到 32x64，上下两半分别统计，所有框的像素合在一次 bincount 里完成
+    :return: (N, EMBED_DIM) float32，已 L2 归一化 (Hellinger 距离 -> 点积)；框太小的行全 0
+    """
+    n = len(xyxy)
+    out = np.zeros((n, EMBED_DIM), dtype=np.float32)
+    if n == 0:
+        return out
+    h, w = frame.shape[:2]
+    boxes = np.rint(np.asarray(xyxy, dtype=np.float32)).astype(np.int64)
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, w)
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, h)
+    margin = (boxes[:, 2] - boxes[:, 0]) // 10
+    valid = ((boxes[:, 2] - boxes[:, 0]) >= 8) & ((boxes[:, 3] - boxes[:, 1]) >= 8)
+
+    idx = np.flatnonzero(valid)
+    if not len(idx):
+        return out
+    crops = np.stack([cv2.resize(frame[y1:y2, x1 + m:x2 - m], (_CROP_W, _CROP_H), interpolation=cv2.INTER_AREA)
+                      for x1, y1, x2, y2, m in zip(*boxes[idx].T, margin[idx])])
+    hsv = cv2.cvtColor(crops.reshape(-1, _CROP_W, 3), cv2.COLOR_BGR2HSV).reshape(len(idx), _CROP_H, _CROP_W, 3)
+    hue, sat, val = (hsv[..., c].astype(np.int64) for c in range(3))
+
+    colored = sat >= _MIN_SATURATION
+    bins = np.where(colored,
+                    (hue * H_BINS // 180) * S_BINS + sat * S_BINS // 256,
+                    H_BINS * S_BINS + val * V_BINS // 256)
+    half = (np.arange(_CROP_H) >= _CROP_H // 2).astype(np.int64)[None, :, None]
+    flat = (np.arange(len(idx))[:, None, None] * EMBED_DIM + half * _HALF_DIM + bins).ravel()
+    hist = np.bincount(flat, minlength=len(idx) * EMBED_DIM).reshape(len(idx), EMBED_DIM).astype(np.float32)
+
+    hist = np.sqrt(hist)
+    hist /= np.maximum(np.linalg.norm(hist, axis=1, keepdims=True), 1e-6)
+    out[idx] = hist
+    return out
+
+
+class ReIDIndex:
+    """
+    跨摄像头特征索引 (内存，近似最近邻)
+    - 定长环形缓冲：最多 capacity 条，写满后覆盖最旧的，内存固定 (float16 存特征)
+    - 随机超平面 LSH：n_tables 组哈希，任一组哈希值相同即为候选，只对候选算精确相似度
+    - 过期：超过 ttl 秒的记录不参与查询 (也就是最长行程时间)
+    查询是对 capacity 条哈希码的一次向量化比较，耗时与摄像头数量无关，只取决于 capacity。
+    """
+
+    def __init__(self, dim=EMBED_DIM, capacity=50000, n_tables=4, n_bits=10, ttl=900.0, seed=0):
+        rng = np.random.default_rng(seed)
+        self.dim = dim
+        self.capacity = capacity
+        self.ttl = ttl
+        planes = rng.standard_normal((n_tables * n_bits, dim))
+        # 直方图特征全是非负数，都挤在“全 1”方向附近；超平面与这个方向正交，哈希才分得开
+        uniform = np.full(dim, 1 / np.sqrt(dim))
+        self.planes = (planes - np.outer(planes @ uniform, uniform)).astype(np.float32)
+        self.n_tables, self.n_bits = n_tables, n_bits
+        self._bit_weights = (1 << np.arange(n_bits)).astype(np.int32)
+
+        self.vectors = np.zeros((capacity, dim), dtype=np.float16)
+        self.codes = np.zeros((n_tables, capacity), dtype=np.int32)  # 按哈希表分行存放，比较时是连续内存
+        self.ts = np.full(capacity, -np.inf)
+        self.camera = np.zeros(capacity, dtype=np.int32)
+        self.track = np.zeros(capacity, dtype=np.int64)
+        self.cls = np.zeros(capacity, dtype=np.int32)
+        self._next = 0
+        self.camera_names = []      # 摄像头编号 -> 名称
+        self._camera_codes = {}
+
+    def __len__(self):
+        return int(np.count_nonzero(np.isfinite(self.ts)))
+
+    def camera_code(self, camera_id):
+        code = self._camera_codes.get(camera_id)
+        if code is None:
+            code = self._camera_codes[camera_id] = len(self.camera_names)
+            self.camera_names.append(camera_id)
+        return code
+
+    def hash(self, vectors):
+        """(N, dim) -> (N, n_tables) LSH 哈希码"""
+        bits = (np.asarray(vectors, dtype=np.float32) @ self.planes.T) > 0
+        return bits.reshape(len(bits), self.n_tables, self.n_bits) @ self._bit_weights
+
+    def add(self, camera_id, track_id, class_id, vector, ts):
+        i = self._next % self.capacity
+        self._next += 1
+        self.vectors[i] = vector
+        self.codes[:, i] = self.hash(vector[None])[0]
+        self.ts[i] = ts
+        self.camera[i] = self.camera_code(camera_id)
+        self.track[i] = track_id
+        self.cls[i] = class_id
+
+    def remove(self, i):
+        self.ts[i] = -np.inf
+
+    def query(self, vector, ts, class_id=None, age_range=None, k=5):
+        """
+        :param age_range: (C, 2) 每个来源摄像头允许的 [最短, 最长] 行程时间 (秒)，按 camera_code 索引；
+                          None 表示 [0, ttl]，不在表里的摄像头 (新加入的) 用 [0, ttl]
+        :return: [(记录下标, 相似度), ...] 按相似度从高到低
+        """
+        age = ts - self.ts
+        ok = age <= self.ttl
+        if age_range is not None:
+            lo = np.zeros(len(self.camera_names))
+            hi = np.full(len(self.camera_names), self.ttl)
+            lo[:len(age_range)], hi[:len(age_range)] = age_range[:, 0], age_range[:, 1]
+            ok &= (age >= lo[self.camera]) & (age <= hi[self.camera])
+        if class_id is not None:
+            ok &= self.cls == class_id
+        code = self.hash(vector[None])[0]
+        same = self.codes[0] == code[0]
+        for t in range(1, self.n_tables):
+            same |= self.codes[t] == code[t]
+        ok &= same
+
+        idx = np.flatnonzero(ok)
+        if not len(idx):
+            return []
+        sims = self.vectors[idx].astype(np.float32) @ np.asarray(vector, dtype=np.float32)
+        top = np.argsort(-sims)[:k]
+        return list(zip(idx[top].tolist(), sims[top].tolist()))
+
+
+class ReIDService:
+    """
+    跨摄像头重识别服务 (所有摄像头共用一个实例)
+    - publish()：某路摄像头的目标离开画面时，把它的外观特征放进索引
+    - match()：新目标特征稳定后，在其他摄像头、行程时间窗口内找最相似的已离开目标，
+      相似度超过 threshold 即认为是同一目标，匹配上的记录从索引移除 (一个目标只接力一次)
+    windows 配置 {"CAM_01>CAM_02": [最短秒, 最长秒]}，未配置的摄像头对用 [0, max_travel]。
+    """
+
+    def __init__(self, threshold=0.85, max_travel=300.0, windows=None, capacity=50000):
+        self.index = ReIDIndex(capacity=capacity, ttl=max_travel)
+        self.threshold = threshold
+        self.windows = {}
+        self._ranges = {}   # 目标摄像头 -> (C, 2) 来源摄像头的行程时间窗口 (缓存)
+        self._lock = threading.Lock()
+        self.configure(threshold, max_travel, windows)
+
+    def configure(self, threshold=None, max_travel=None, windows=None):
+        with self._lock:
+            if threshold is not None:
+                self.threshold = threshold
+            if max_travel is not None:
+                self.index.ttl = max_travel
+            if windows is not None:
+                self.windows = {}
+                for key, (lo, hi) in windows.items():
+                    src, _, dst = key.partition(">")
+                    self.windows[(src.strip(), dst.strip())] = (float(lo), float(hi))
+            self._ranges = {}
+
+    def _age_range(self, camera_id):
+        ranges = self._ranges.get(camera_id)
+        if ranges is None or len(ranges) != len(self.index.camera_names):
+            ranges = np.array([self.windows.get((src, camera_id), (0.0, self.index.ttl))
+                               for src in self.index.camera_names], dtype=np.float64).reshape(-1, 2)
+            # 同一路摄像头内部不做接力 (那是追踪器的事)
+            own = self.index._camera_codes.get(camera_id)
+            if own is not None:
+                ranges[own] = (np.inf, np.inf)
+            self._ranges[camera_id] = ranges
+        return ranges
+
+    def publish(self, camera_id, track_id, class_id, embedding, ts):
+        with self._lock:
+            self.index.add(camera_id, track_id, class_id, embedding, ts)
+
+    def match(self, camera_id, class_id, embedding, ts):
+        """
+        :return: None 或 {'from_camera', 'from_track', 'similarity', 'travel_time'}
+        """
+        with self._lock:
+            self.index.camera_code(camera_id)
+            hits = self.index.query(embedding, ts, class_id=class_id, age_range=self._age_range(camera_id), k=1)
+            if not hits or hits[0][1] < self.threshold:
+                return None
+            i, sim = hits[0]
+            result = {
+                'from_camera': self.index.camera_names[self.index.camera[i]],
+                'from_track': int(self.index.track[i]),
+                'similarity': float(sim),
+                'travel_time': float(ts - self.index.ts[i]),
+            }
+            self.index.remove(i)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'items': len(self.index), 'capacity': self.index.capacity,
+                    'cameras': len(self.index.camera_names)}
+
+
+reid_service = ReIDService()
+
+
+class TrackEmbeddings:
+    """
+    单路摄像头的逐目标外观特征 (按 TrackSlots 槽位存放)
+    - 只在检测帧采样，每个目标每 sample_every 个检测帧采一次 (按槽位错开，每帧的计算量均匀)
+    - 特征做指数平均，累计 min_samples 次后去 ReIDService 查一次是不是从别的摄像头过来的
+    - 槽位回收 (目标离开) 时把特征发布到索引，供其他摄像头匹配
+    """
+
+    def __init__(self, camera_id, service=reid_service, sample_every=10, min_samples=3, momentum=0.7):
+        self.camera_id = camera_id
+        self.service = service
+        self.sample_every = sample_every
+        self.min_samples = min_samples
+        self.momentum = momentum
+        self._frame = 0  # 已处理的检测帧数 (采样相位)
+        self._emb = np.zeros((0, EMBED_DIM), dtype=np.float32)
+        self._count = np.zeros(0, dtype=np.int64)
+        self._tid = np.full(0, -1, dtype=np.int64)
+        self._cls = np.zeros(0, dtype=np.int64)
+        self._last_ts = np.zeros(0, dtype=np.float64)
+        self._queried = np.zeros(0, dtype=bool)
+
+    def _grow(self, size):
+        self._emb = grow_rows(self._emb, size)
+        self._count = grow_rows(self._count, size)
+        self._tid = grow_rows(self._tid, size, -1)
+        self._cls = grow_rows(self._cls, size)
+        self._last_ts = grow_rows(self._last_ts, size)
+        self._queried = grow_rows(self._queried, size, False)
+
+    def _publish(self, rows):
+        ready = rows[(self._tid[rows] >= 0) & (self._count[rows] >= self.min_samples)]
+        for r in ready.tolist():
+            self.service.publish(self.camera_id, int(self._tid[r]), int(self._cls[r]), self._emb[r], self._last_ts[r])
+        self._tid[rows] = -1
+
+    def update(self, frame, xyxy, slots, tracker_ids, class_ids, fresh, released, ts, detected=True):
+        """
+        :return: 本帧新匹配上的跨摄像头接力 [{'track_id', 'class_id', 'from_camera', 'from_track', ...}]
+        """
+        if slots is None:
+            return []
+        if len(slots) and slots.max() >= len(self._tid):
+            self._grow(max(int(slots.max()) + 1, 2 * len(self._tid)))
+
+        # 1. 离开的目标发布到索引；槽位换了主人时清空
+        if len(released):
+            self._publish(np.asarray(released, dtype=np.int64))
+        new_rows = slots[fresh]
+        self._count[new_rows] = 0
+        self._queried[new_rows] = False
+        self._tid[slots] = tracker_ids
+        self._cls[slots] = class_ids
+        self._last_ts[slots] = ts
+        if not detected:
+            return []
+
+        # 2. 按槽位错开采样 (相位只在检测帧推进，跳帧步长和 sample_every 有公因数时也能轮到每个槽位)
+        self._frame += 1
+        due = (slots + self._frame) % self.sample_every == 0
+        if not np.any(due):
+            return []
+        rows = slots[due]
+        emb = extract_embeddings(frame, xyxy[due])
+        ok = np.any(emb != 0, axis=1)
+        rows, emb = rows[ok], emb[ok]
+        first = self._count[rows] == 0
+        mixed = self.momentum * self._emb[rows] + (1 - self.momentum) * emb
+        mixed /= np.maximum(np.linalg.norm(mixed, axis=1, keepdims=True), 1e-6)
+        self._emb[rows] = np.where(first[:, None], emb, mixed)
+        self._count[rows] += 1
+
+        # 3. 特征稳定后查一次
+        matches = []
+        ready = rows[(self._count[rows] >= self.min_samples) & ~self._queried[rows]]
+        for r in ready.tolist():
+            self._queried[r] = True
+            hit = self.service.match(self.camera_id, int(self._cls[r]), self._emb[r], ts)
+            if hit is not None:
+                hit.update(track_id=int(self._tid[r]), class_id=int(self._cls[r]), camera_id=self.camera_id)
+                print(f"🔗 [{self.camera_id}] 目标 {hit['track_id']} <- {hit['from_camera']} 目标 {hit['from_track']} "
+                      f"(相似度 {hit['similarity']:.2f}, 行程 {hit['travel_time']:.0f} 秒)")
+                matches.append(hit)
+        return matches
+
+    def flush(self):
+        """所有在场目标都发布出去 (换源 / 退出时调用)"""
+        self._publish(np.flatnonzero(self._tid >= 0))
@@ -0,0 +1,93 @@
+# core/resolution.py
+from collections import deque
+
+import numpy as np
+
+# 候选推理尺寸 (letterbox 后的长边，YOLO 要求是 32 的倍数)
+SIZE_LADDER = (320, 416, 512, 640, 768, 896, 1024, 1280, 1536)
+
+
+def round_size(size, stride=32):
+    """推理尺寸取整到 stride 的倍数 (至少一个 stride)"""
+    return max(stride, int(round(size / stride)) * stride)
+
+
+class AdaptiveResolution:
+    """
+    按最近的检测框尺寸选择推理输入尺寸 (imgsz)
+    ultralytics 的 letterbox 把画面长边缩放到 imgsz，画面里短边为 s 像素的目标在网络输入上只剩
+    s * imgsz / max(W, H) 像素，小于 min_pixels 基本就检测不到了。
+    - 最近 window 个检测帧里，取目标短边的 quantile 分位 (偏小的那批目标)，
+      选能让它们在输入上不小于 min_pixels 的最小候选尺寸
+    - 画面里没有目标：用最小尺寸
+    - 升档立即生效 (漏检代价大)，降档要连续 patience 次都建议更小才执行，避免来回抖动
+    - 小尺寸下小目标本来就检不出来，统计会偏向大目标；每 probe_every 个检测帧用最大尺寸探测一次
+    adaptive=False 时固定用 imgsz。
+    检测框由 ultralytics 还原到原画面坐标，换尺寸不影响追踪器的坐标系。
+    """
+
+    def __init__(self, imgsz=640, adaptive=False, min_size=320, max_size=1280,
+                 min_pixels=16, quantile=0.1, window=30, patience=15, probe_every=30):
+        self.imgsz = round_size(imgsz)
+        self.adaptive = adaptive
+        self.min_pixels = min_pixels
+        self.quantile = quantile
+        self.window = window
+        self.patience = patience
+        self.probe_every = probe_every
+        self.set_range(min_size, max_size)
+        self.reset()
+
+    def set_range(self, min_size, max_size):
+        low, high = round_size(min(min_size, max_size)), round_size(max(min_size, max_size))
+        self.sizes = np.array(sorted({low, high} | {s for s in SIZE_LADDER if low <= s <= high}))
+
+    def reset(self):
+        self._history = deque(maxlen=self.window)   # 每个检测帧的目标短边 (相对画面长边的比例)
+        self.current = int(self.sizes[0]) if self.adaptive else self.imgsz
+        self._down_votes = 0
+        self._since_probe = 0
+        self.probing = False
+        self.last = self.current    # 最近一次推理实际用的尺寸
+
+    def select(self):
+        """本次推理用的尺寸"""
+        if not self.adaptive:
+            self.last = self.imgsz
+            return self.last
+        self._since_probe += 1
+        self.probing = self._since_probe >= self.probe_every
+        if self.probing:
+            self._since_probe = 0
+        self.last = int(self.sizes[-1]) if self.probing else self.current
+        return self.last
+
+    def observe(self, xyxy, frame_shape):
+        """记录一次检测结果，更新下一次的尺寸"""
+        if not self.adaptive:
+            return
+        h, w = frame_shape[:2]
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        short = np.minimum(xyxy[:, 2] - xyxy[:, 0], xyxy[:, 3] - xyxy[:, 1]) / max(h, w)
+        self._history.append(short)
+
+        target = self._target_size()
+        if target > self.current:
+            self.current = target
+            self._down_votes = 0
+        elif target < self.current:
+            self._down_votes += 1
+            if self._down_votes >= self.patience:
+                self.current = target
+                self._down_votes = 0
+        else:
+            self._down_votes = 0
+
+    def _target_size(self):
+        sizes = np.concatenate(self._history) if self._history else np.empty(0)
+        if not len(sizes):
+            return int(self.sizes[0])
+        small = max(float(np.quantile(sizes, self.quantile)), 1e-6)
+        need = self.min_pixels / small
+        idx = min(int(np.searchsorted(self.sizes, need)), len(self.sizes) - 1)
+        return int(self.sizes[idx])
@@ -3,31 +3,34 @@ import torch
 import numpy as np
 import supervision as sv
 from core.tensor_ops import TensorSlicer, run_nms
-import cv2
+from core.precision import InferencePrecision
 
 
 class SahiWrapper:
-    def __init__(self, yolo_model):
+    def __init__(self, yolo_model, precision=None):
         self.model = yolo_model
         self.device = yolo_model.device
+        # 推理精度 / 内存布局 (与 SmartDetector 共用同一个设置对象)
+        self.precision = precision or InferencePrecision("fp32", self.device)
         # 初始化切片器
         self.slicer = TensorSlicer(slice_height=960, slice_width=960, overlap_ratio=0.15)
 
     def infer(self, frame_img, conf_thres=0.25, slice_height=960, slice_width=960):
         """
         全 GPU 流程：
-        1. BGR -> RGB
-        2. 图片转 Tensor 上 GPU
+        1. uint8 图片直接上 GPU (传输量只有 float32 的 1/4)
+        2. GPU 上做 BGR -> RGB、归一化，转成推理精度 (fp16 时切片也是半精度)
         3. GPU 切片
         4. YOLO Batch 推理
         5. 坐标还原 & NMS 合并
         """
-        # 1. BGR -> RGB
-        frame_rgb = cv2.cvtColor(frame_img, cv2.COLOR_BGR2RGB)
+        with torch.inference_mode():
+            return self._infer(frame_img, conf_thres, slice_height, slice_width)
 
-        # 2. 预处理：numpy (H,W,C) -> tensor (C,H,W) -> 归一化
-        img_tensor = torch.from_numpy(frame_rgb).to(self.device).float()
-        img_tensor = img_tensor.permute(2, 0, 1) / 255.0  # (C,H,W) 0-1
+    def _infer(self, frame_img, conf_thres, slice_height, slice_width):
+        # 1~2. 预处理：numpy uint8 (H,W,BGR) -> GPU -> (C,H,W) RGB 0-1
+        img_tensor = torch.from_numpy(frame_img).to(self.device, non_blocking=True)
+        img_tensor = img_tensor.flip(2).permute(2, 0, 1).to(self.precision.input_dtype) / 255.0
 
         # 3. 动态更新切片器参数
         if self.slicer.h != slice_height or self.slicer.w != slice_width:
@@ -37,7 +40,8 @@ class SahiWrapper:
         batch_patches, offsets = self.slicer.slice_batch(img_tensor)
 
         # 5. YOLO 批量推理
-        results = self.model(batch_patches, verbose=False, conf=conf_thres)
+        batch_patches = self.precision.prepare_input(batch_patches)
+        results = self.precision.run(self.model, batch_patches, verbose=False, conf=conf_thres)
 
         # 6. 结果处理与合并
         all_boxes = []
@@ -45,9 +49,10 @@ class SahiWrapper:
         all_classes = []
 
         for i, res in enumerate(results):
-            # 🟢 [关键修复] 必须加上 .clone()！
+            # 🟢 [关键修复] 必须复制一份 (copy=True)！
             # 否则 PyTorch 会报错：Inplace update to inference tensor...
-            dets = res.boxes.data.clone()
+            # 顺便转回 fp32 再加偏移 (fp16 推理时，大画面上半精度的坐标精度不够)
+            dets = res.boxes.data.to(torch.float32, copy=True)
 
             if dets.shape[0] > 0:
                 # 获取当前切片的偏移量
@@ -0,0 +1,268 @@
+# core/scheduler.py
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Decision:
+    """调度结果 (不可变快照，检测器每帧直接读)"""
+    stride: int = 1           # 检测步长下限 (降级时提高)
+    allow_sahi: bool = True   # 是否允许跑 SAHI 切片检测
+    rate: float = 0.0         # 分到的推理次数/秒
+    level: int = 0            # 0 正常 / 1 关 SAHI / 2 降步长 / 3 连延迟目标都保证不了
+
+
+LEVEL_NAMES = ("正常", "关闭SAHI", "降低步长", "低于延迟目标")
+
+
+class _Camera:
+    def __init__(self, camera_id, priority, slo_ms, base_stride, fps):
+        self.camera_id = camera_id
+        self.priority = priority
+        self.slo_ms = slo_ms            # 两次完整推理之间最长允许间隔 (毫秒)
+        self.base_stride = base_stride  # 配置的检测步长
+        self.fps = fps
+        self.cost_ms = None             # 普通推理单次耗时 (EMA)
+        self.sahi_ms_per_s = 0.0        # SAHI 每秒占用的推理时间 (EMA)
+        self.activity = 0.0             # 每次检测的活跃度 (目标数 + 报警加权，EMA)
+        self.decision = Decision(stride=base_stride)
+        self.relax_votes = 0
+        # 本统计周期的累计值
+        self.window_detects = 0
+        self.window_busy_ms = 0.0
+        self.window_sahi_ms = 0.0
+        self.last_detect = None
+        self.max_gap_ms = 0.0
+        self.slo_misses = 0
+        self.window_stats = {}          # 上一统计周期的实测值
+
+
+class InferenceScheduler:
+    """
+    多摄像头推理调度 (同一台机器上所有摄像头共用一个实例)
+    每路摄像头每次推理后 report() 回报耗时 / 目标数 / 报警数，调度器每 interval 秒重新分配一次推理预算：
+    - 预算 budget_ms：每秒可用于推理的毫秒数 (单核 1000 x 目标利用率)
+    - 需求：帧率 / 配置步长 x 单次推理耗时，加上 SAHI 的占用
+    - 权重：优先级 x (1 + 活跃度)，活跃度来自最近的目标数和报警数
+    总需求超出预算时按权重从低到高逐级降级：
+      1. 先关低权重摄像头的 SAHI
+      2. 还不够就按“先保延迟目标、再按权重分配剩余预算”的水位分配推理次数，换算成检测步长下限
+      3. 预算连所有摄像头的延迟目标都满足不了时，低权重的摄像头先放弃延迟目标 (level 3)
+    decision(camera_id) 给检测器读，metrics() 给界面 / 日志看调度结果。
+    """
+
+    def __init__(self, budget_ms=800.0, interval=2.0, max_stride=30, ema=0.3, alert_weight=5.0):
+        self.budget_ms = budget_ms
+        self.interval = interval
+        self.max_stride = max_stride
+        self.ema = ema
+        self.alert_weight = alert_weight
+        self._cameras = {}
+        self._lock = threading.Lock()
+        self._last_rebalance = time.monotonic()
+        self._summary = {}
+
+    def configure(self, budget_ms=None, interval=None):
+        with self._lock:
+            if budget_ms is not None:
+                self.budget_ms = budget_ms
+            if interval is not None:
+                self.interval = interval
+
+    def register(self, camera_id, priority=1.0, slo_ms=1000.0, base_stride=1, fps=30.0):
+        """登记 / 更新一路摄像头 (配置变化时重复调用即可，统计值保留)"""
+        with self._lock:
+            cam = self._cameras.get(camera_id)
+            if cam is None:
+                cam = self._cameras[camera_id] = _Camera(camera_id, priority, slo_ms, base_stride, fps)
+            cam.priority, cam.slo_ms = float(priority), float(slo_ms)
+            cam.base_stride, cam.fps = max(1, int(base_stride)), float(fps or 30.0)
+            self._rebalance_locked()
+
+    def unregister(self, camera_id):
+        with self._lock:
+            self._cameras.pop(camera_id, None)
+            self._rebalance_locked()
+
+    def decision(self, camera_id):
+        cam = self._cameras.get(camera_id)
+        return cam.decision if cam is not None else None
+
+    def report(self, camera_id, cost_ms, detected=True, sahi=False, objects=0, alerts=0, now=None):
+        """
+        每帧结束后回报
+        :param cost_ms: 本帧推理耗时 (没跑推理时为 0)
+        :param detected: 本帧是否跑了完整推理
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            cam = self._cameras.get(camera_id)
+            if cam is None:
+                return
+            if detected:
+                cam.window_detects += 1
+                if sahi:
+                    cam.window_sahi_ms += cost_ms
+                else:
+                    cam.window_busy_ms += cost_ms
+                    cam.cost_ms = cost_ms if cam.cost_ms is None else \
+                        (1 - self.ema) * cam.cost_ms + self.ema * cost_ms
+                activity = objects + self.alert_weight * alerts
+                cam.activity = (1 - self.ema) * cam.activity + self.ema * activity
+                if cam.last_detect is not None:
+                    gap = (now - cam.last_detect) * 1000
+                    cam.max_gap_ms = max(cam.max_gap_ms, gap)
+                    cam.slo_misses += gap > cam.slo_ms
+                cam.last_detect = now
+            if now - self._last_rebalance >= self.interval:
+                self._rebalance_locked(now)
+
+    # --- 分配 ---
+
+    def _rebalance_locked(self, now=None):
+        now = time.monotonic() if now is None else now
+        elapsed = max(now - self._last_rebalance, 1e-3)
+        self._last_rebalance = now
+        cams = list(self._cameras.values())
+        if not cams:
+            self._summary = {}
+            return
+
+        for cam in cams:
+            # SAHI 被关掉期间没有实测值，保留关掉前的占用估计 (否则下一轮又会被放开，来回抖动)
+            if cam.decision.allow_sahi:
+                sahi_rate = cam.window_sahi_ms / elapsed
+                cam.sahi_ms_per_s = (1 - self.ema) * cam.sahi_ms_per_s + self.ema * sahi_rate
+        mean_activity = sum(c.activity for c in cams) / len(cams)
+        weight = {c.camera_id: c.priority * (1 + c.activity / max(mean_activity, 1e-6)) for c in cams}
+        order = sorted(cams, key=lambda c: weight[c.camera_id])          # 权重从低到高
+        demand = {c.camera_id: c.fps / c.base_stride for c in cams}       # 想要的推理次数/秒
+        cost = {c.camera_id: c.cost_ms if c.cost_ms is not None else 0.0 for c in cams}
+
+        # 1. SAHI：从低权重开始关，直到装得下
+        sahi = {c.camera_id: c.sahi_ms_per_s > 0 for c in cams}
+        plain_need = sum(demand[k] * cost[k] for k in demand)
+        sahi_need = sum(c.sahi_ms_per_s for c in cams)
+        for cam in order:
+            if plain_need + sahi_need <= self.budget_ms:
+                break
+            if sahi[cam.camera_id]:
+                sahi[cam.camera_id] = False
+                sahi_need -= cam.sahi_ms_per_s
+
+        # 2. 推理次数水位分配
+        rate = dict(demand)
+        capacity = self.budget_ms - sahi_need
+        below_slo = set()
+        if plain_need > capacity:
+            rate = {k: 0.0 for k in demand}
+            left = capacity
+            # 2a. 按权重从高到低先保延迟目标 (每 slo_ms 至少一次推理)
+            for cam in reversed(order):
+                k = cam.camera_id
+                need = min(demand[k], 1000.0 / max(cam.slo_ms, 1.0))
+                if need * cost[k] <= left:
+                    rate[k] = need
+                    left -= need * cost[k]
+                else:
+                    rate[k] = left / cost[k] if cost[k] > 0 else need
+                    left = max(left - rate[k] * cost[k], 0.0)
+                    below_slo.add(k)
+            # 2b. 剩余预算按权重分，超过需求的部分回收再分 (water-filling)
+            active = [c.camera_id for c in cams if rate[c.camera_id] < demand[c.camera_id] and cost[c.camera_id] > 0]
+            while left > 1e-6 and active:
+                total_w = sum(weight[k] for k in active)
+                spent, still = 0.0, []
+                for k in active:
+                    extra_ms = left * weight[k] / total_w
+                    add = min(extra_ms / cost[k], demand[k] - rate[k])
+                    rate[k] += add
+                    spent += add * cost[k]
+                    if rate[k] < demand[k] - 1e-9:
+                        still.append(k)
+                left -= spent
+                if spent <= 1e-9:
+                    break
+                active = still
+
+        # 3. 换算成检测步长 (向上取整会空出一些预算，再按权重从高到低逐个把步长减一，装得下就减)
+        strides = {c.camera_id: min(max(c.base_stride, math.ceil(c.fps / max(rate[c.camera_id], 1e-6) - 1e-9)),
+                                    self.max_stride) for c in cams}
+        fps = {c.camera_id: c.fps for c in cams}
+        used = sum(fps[k] / strides[k] * cost[k] for k in strides)
+        improved = True
+        while improved:
+            improved = False
+            for cam in reversed(order):
+                k = cam.camera_id
+                if strides[k] <= cam.base_stride:
+                    continue
+                extra = (fps[k] / (strides[k] - 1) - fps[k] / strides[k]) * cost[k]
+                if used + extra <= capacity:
+                    strides[k] -= 1
+                    used += extra
+                    improved = True
+
+        # 4. 降级等级
+        overloaded = plain_need + sum(c.sahi_ms_per_s for c in cams) > self.budget_ms
+        for cam in cams:
+            k = cam.camera_id
+            stride = strides[k]
+            # 放宽 (步长变小) 要连续两轮都成立才生效，避免耗时抖动时步长来回跳
+            if stride < cam.decision.stride:
+                cam.relax_votes += 1
+                if cam.relax_votes < 2:
+                    stride = cam.decision.stride
+            else:
+                cam.relax_votes = 0
+            if k in below_slo:
+                level = 3
+            elif stride > cam.base_stride:
+                level = 2
+            elif overloaded and not sahi[k]:
+                level = 1
+            else:
+                level = 0
+            # SAHI 只在没降级的摄像头上保留 (过载时低权重摄像头先关)
+            allow_sahi = sahi[k] or not overloaded
+            decision = Decision(stride=stride, allow_sahi=allow_sahi, rate=round(cam.fps / stride, 2), level=level)
+            if decision.level != cam.decision.level or decision.stride != cam.decision.stride:
+                print(f"📋 调度 {k}: {LEVEL_NAMES[level]} (步长 {stride}, SAHI {'开' if allow_sahi else '关'})")
+            cam.decision = decision
+
+        self._summary = {
+            'budget_ms': self.budget_ms,
+            'demand_ms': round(plain_need + sum(c.sahi_ms_per_s for c in cams), 1),
+            'allocated_ms': round(sum(c.fps / c.decision.stride * cost[c.camera_id] for c in cams)
+                                  + sahi_need, 1),
+            'overloaded': overloaded,
+            'weights': {k: round(v, 3) for k, v in weight.items()},
+        }
+        for cam in cams:
+            cam.window_stats = {
+                'measured_rate': round(cam.window_detects / elapsed, 2),
+                'busy_ms_per_s': round((cam.window_busy_ms + cam.window_sahi_ms) / elapsed, 1),
+                'max_gap_ms': round(cam.max_gap_ms, 1),
+                'slo_misses': cam.slo_misses,
+            }
+            cam.window_detects, cam.window_busy_ms, cam.window_sahi_ms = 0, 0.0, 0.0
+            cam.max_gap_ms, cam.slo_misses = 0.0, 0
+
+    def metrics(self):
+        """调度状态：全局预算 / 需求，以及每路摄像头的分配结果和上一统计周期的实测值"""
+        with self._lock:
+            cameras = {}
+            for k, cam in self._cameras.items():
+                d = cam.decision
+                cameras[k] = dict(
+                    priority=cam.priority, slo_ms=cam.slo_ms, fps=cam.fps, base_stride=cam.base_stride,
+                    cost_ms=round(cam.cost_ms or 0.0, 2), activity=round(cam.activity, 2),
+                    stride=d.stride, rate=d.rate, allow_sahi=d.allow_sahi, level=d.level,
+                    level_name=LEVEL_NAMES[d.level], **cam.window_stats,
+                )
+            return dict(self._summary, cameras=cameras)
+
+
+inference_scheduler = InferenceScheduler()
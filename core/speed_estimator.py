@@ -1,18 +1,23 @@
 import cv2
 import numpy as np
 
+from core.calibration import compute_homography, scale_homography, build_row_lut
+from core.track_slots import grow_rows
+
 
 class SpeedEstimator:
-    def __init__(self, src_points=None, real_width=3.5, real_length=10):
+    def __init__(self, src_points=None, real_width=3.5, real_length=10, matrix=None, row_lut=None):
         """
         初始化测速模块 (基于透视变换 Homography)
         :param src_points: list, 视频中选取的4个点 [(x,y), ...], 围成一个矩形区域(如一条车道)
         :param real_width: float, 这块区域在现实世界中的宽度 (米), 默认车道宽 3.5米
         :param real_length: float, 这块区域在现实世界中的长度 (米), 默认看清距离 10米
+        :param matrix: 预先算好的 图像 -> 地面(米) 单应性矩阵 (来自标定)，传入后不再重新计算
+        :param row_lut: (H, 2) 每行的 米/像素 查找表，传入后测速只查表不做透视变换
         """
         # 如果没有传入点，提供一组默认的梯形点 (针对一般路口监控视角)
         if src_points is None:
-            # 注意：这里的点需要根据你的实际视频画面去微调！
+            # 注意：这里的点需要根据你的实际视频画面去微调！(或在监控页用“标定”工具点选)
             # 顺序：[左下, 右下, 右上, 左上]
             self.src_points = np.array([
                 [200, 700],  # 左下
@@ -23,25 +28,38 @@ class SpeedEstimator:
         else:
             self.src_points = np.array(src_points, dtype=np.float32)
 
-        # 目标点：把倾斜的视角映射成一个俯视的矩形 (Top-down view)
-        # 这里的像素比例尺不重要，重要的是长宽比要符合现实
-        self.dst_points = np.float32([
-            [0, 0],
-            [100, 0],
-            [100, 300],  # 假设长宽比是 1:3
-            [0, 300]
-        ])
-
-        # 计算单应性矩阵 (Homography Matrix) - 核心数学公式
-        # H 矩阵负责把 图像坐标 -> 物理坐标
-        self.matrix = cv2.getPerspectiveTransform(self.src_points, self.dst_points)
+        # 单应性矩阵 (Homography Matrix)：图像坐标 -> 地面坐标
+        # 目标矩形直接用真实宽、长 (米)，两个方向的比例尺都对 (不再假设 1:3 的长宽比)
+        if matrix is not None:
+            self.matrix = np.asarray(matrix, dtype=np.float64)
+        else:
+            self.matrix = compute_homography(self.src_points, real_width, real_length)
+        self.row_lut = None if row_lut is None else np.asarray(row_lut, dtype=np.float32)
 
         # 存储上一帧的位置 {track_id: (real_x, real_y, timestamp)}
         self.previous_positions = {}
 
-        # 比例尺: 像素距离 -> 现实距离 (米)
-        # 简单估算：映射后的 300 像素 = real_length (10米)
-        self.pixels_per_meter = 300 / real_length
+        # 批量测速用：按槽位 (TrackSlots) 存放的上一次坐标 (查表模式下为图像坐标，否则为地面坐标)
+        # 以及写入时的帧序号 (未传 frame_index 时为调用序号)，按两次观测之间实际隔了几帧换算速度
+        self._calls = 0
+        self._pos = np.zeros((0, 2), dtype=np.float32)
+        self._seen = np.zeros(0, dtype=np.int64)
+
+        # 比例尺: 地面坐标已经是米
+        self.pixels_per_meter = 1.0
+
+    @classmethod
+    def from_calibration(cls, calibration, frame_size):
+        """
+        用摄像头配置里的标定结果创建 (矩阵已预先算好，只按当前分辨率换算)
+        :param calibration: make_calibration() 生成的字典，为空时使用默认梯形点
+        :param frame_size: 当前画面 (宽, 高)
+        """
+        if not calibration or "matrix" not in calibration:
+            return cls()
+        matrix = scale_homography(calibration["matrix"], calibration.get("frame_size"), frame_size)
+        lut = build_row_lut(matrix, frame_size) if calibration.get("use_lut") else None
+        return cls(matrix=matrix, row_lut=lut)
 
     def transform_point(self, point):
         """
@@ -94,4 +112,58 @@ class SpeedEstimator:
         # 更新记录
         self.previous_positions[object_id] = current_map_pos
 
-        return int(speed)
\ No newline at end of file
+        return int(speed)
+
+    def estimate_speeds(self, slots, center_points, fps=30, frame_index=None, fresh=None):
+        """
+        批量测速 (向量化版 estimate_speed)
+        :param slots: (N,) 目标的槽位 (TrackSlots.update 的返回值)
+        :param center_points: (N, 2) 检测框中心点
+        :param fps: 视频帧率
+        :param frame_index: 当前帧序号；跳过了若干帧 (运动门控静止帧等) 没有测速时，
+            位移按实际间隔的帧数折算。不传时每次调用算一帧，且只和上一次调用比较
+        :param fresh: (N,) bool，槽位是本帧新分配的 (TrackSlots.fresh)，这些目标不和旧坐标比较
+        :return: (N,) 速度 (km/h, int)
+        """
+        slots = np.asarray(slots, dtype=np.int64)
+        self._calls += 1
+        now = self._calls if frame_index is None else int(frame_index)
+        n = len(slots)
+        if n == 0:
+            return np.zeros(0, dtype=int)
+        if slots.max() >= len(self._seen):
+            size = max(int(slots.max()) + 1, 2 * len(self._seen))
+            self._pos = grow_rows(self._pos, size)
+            self._seen = grow_rows(self._seen, size, -1)
+
+        pts = np.asarray(center_points, dtype=np.float32).reshape(-1, 2)
+        if self.row_lut is None:
+            # 一次透视变换所有点
+            current = cv2.perspectiveTransform(pts.reshape(-1, 1, 2), self.matrix).reshape(-1, 2)
+        else:
+            current = pts
+
+        last = self._seen[slots]
+        elapsed = now - last
+        if frame_index is None or fresh is None:
+            # 槽位被回收复用时，旧目标至少已经消失了好几帧，序号对不上，不会误算
+            found = elapsed == 1
+        else:
+            found = (last >= 0) & (elapsed > 0) & ~np.asarray(fresh, dtype=bool)
+        delta = current[found] - self._pos[slots[found]]
+        if self.row_lut is None:
+            distance_meters = np.linalg.norm(delta, axis=1) / self.pixels_per_meter
+        else:
+            # 查表：按当前所在行取 x/y 方向的 米/像素
+            rows = np.clip(current[found, 1].astype(np.intp), 0, len(self.row_lut) - 1)
+            delta *= self.row_lut[rows]
+            distance_meters = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+        speeds = np.zeros(n, dtype=np.float32)
+        speeds[found] = distance_meters / elapsed[found] * fps * 3.6
+
+        # 超过 200km/h 通常是 ID 跳变导致的，归零
+        speeds[speeds > 200] = 0
+
+        self._pos[slots] = current
+        self._seen[slots] = now
+        return speeds.astype(int)
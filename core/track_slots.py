@@ -0,0 +1,90 @@
+# core/track_slots.py
+import numpy as np
+
+
+def grow_rows(array, size, fill=0):
+    """把按槽位存放的状态数组 (第 0 维为槽位) 扩到 size 行，新行填 fill"""
+    if len(array) >= size:
+        return array
+    pad = np.full((size - len(array),) + array.shape[1:], fill, dtype=array.dtype)
+    return np.concatenate([array, pad])
+
+
+class TrackSlots:
+    """
+    追踪ID -> 稠密槽位 分配器
+    ByteTrack 的 tracker_id 只增不减，直接拿来当下标数组会无限变大。
+    这里给每个在场 ID 分配一个 [0, capacity) 的槽位，ID 消失 ttl 帧后槽位回收复用，
+    下游 (测速 / 计数线 / 停留) 的逐目标状态都可以放进按槽位索引的定长数组，O(1) 存取。
+
+    每次 update 之后：
+    - fresh (N,)：该目标的槽位是本帧新分配的，下游需要清空这一行的旧状态
+    - released (R,)：本帧回收的槽位 (对应 ID 已超时)，下游据此结束该目标的统计
+    槽位数不够时容量翻倍，下游用 grow_rows() 跟着扩容。
+    """
+
+    def __init__(self, capacity=256, ttl=90):
+        self.capacity = capacity
+        self.ttl = ttl  # ID 消失多少帧后回收槽位 (要不短于追踪器的丢失缓冲)
+        self.slot_ids = np.full(capacity, -1, dtype=np.int64)   # 槽位 -> 追踪ID，-1 为空闲
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        self._free = list(range(capacity - 1, -1, -1))          # 空闲槽位栈，小号先用
+        # 在场 ID (升序) 与对应槽位，searchsorted 批量查找
+        self._ids = np.empty(0, dtype=np.int64)
+        self._slots = np.empty(0, dtype=np.int64)
+        self._frame = 0
+        self.fresh = np.zeros(0, dtype=bool)
+        self.released = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def update(self, tracker_ids):
+        """
+        :param tracker_ids: (N,) 本帧的追踪ID (None 视为空)
+        :return: (N,) 槽位下标
+        """
+        self._frame += 1
+        ids = np.empty(0, dtype=np.int64) if tracker_ids is None else np.asarray(tracker_ids, dtype=np.int64)
+        slots = np.empty(len(ids), dtype=np.int64)
+
+        found = np.zeros(len(ids), dtype=bool)
+        if len(self._ids) and len(ids):
+            pos = np.clip(np.searchsorted(self._ids, ids), 0, len(self._ids) - 1)
+            found = self._ids[pos] == ids
+            slots[found] = self._slots[pos[found]]
+            self.last_seen[slots[found]] = self._frame
+
+        # 先回收超时的槽位，本帧新 ID 可以直接复用
+        expired = (self.slot_ids >= 0) & (self._frame - self.last_seen > self.ttl)
+        self.released = np.flatnonzero(expired)
+        if len(self.released):
+            self.slot_ids[self.released] = -1
+            self._free.extend(self.released[::-1].tolist())
+
+        self.fresh = ~found
+        if np.any(self.fresh):
+            new_ids, inverse = np.unique(ids[self.fresh], return_inverse=True)
+            if len(new_ids) > len(self._free):
+                self._grow(len(self) + len(new_ids))
+            new_slots = np.array([self._free.pop() for _ in range(len(new_ids))], dtype=np.int64)
+            self.slot_ids[new_slots] = new_ids
+            self.last_seen[new_slots] = self._frame
+            slots[self.fresh] = new_slots[inverse]
+
+        if len(self.released) or np.any(self.fresh):
+            live = np.flatnonzero(self.slot_ids >= 0)
+            order = np.argsort(self.slot_ids[live])
+            self._slots = live[order]
+            self._ids = self.slot_ids[self._slots]
+        return slots
+
+    def _grow(self, needed):
+        size = self.capacity
+        while size < needed:
+            size *= 2
+        self.slot_ids = grow_rows(self.slot_ids, size, -1)
+        self.last_seen = grow_rows(self.last_seen, size, 0)
+        self._free = list(range(size - 1, self.capacity - 1, -1)) + self._free
+        print(f"📈 追踪槽位扩容: {self.capacity} -> {size}")
+        self.capacity = size
@@ -0,0 +1,286 @@
+# core/trackers.py
+import numpy as np
+import supervision as sv
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+
+def box_iou(a, b):
+    """(N, 4) x (M, 4) xyxy -> (N, M) IoU"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def assign(cost, max_cost, greedy=False):
+    """
+    最小代价匹配，代价超过 max_cost 的配对丢弃
+    没装 scipy 或 greedy=True 时按代价从小到大贪心匹配 (更省 CPU，目标稀疏时结果基本一样)
+    :return: (rows, cols)
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if cost.size == 0:
+        return empty, empty
+    if greedy or linear_sum_assignment is None:
+        flat = np.argsort(cost, axis=None)
+        flat = flat[cost.flat[flat] <= max_cost]
+        rows, cols = [], []
+        used_r, used_c = set(), set()
+        for r, c in zip(*np.unravel_index(flat, cost.shape)):
+            if r in used_r or c in used_c:
+                continue
+            used_r.add(r)
+            used_c.add(c)
+            rows.append(r)
+            cols.append(c)
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+    rows, cols = linear_sum_assignment(cost)
+    keep = cost[rows, cols] <= max_cost
+    return rows[keep], cols[keep]
+
+
+class ByteTrackTracker:
+    """
+    sv.ByteTrack 的包装 (默认)
+    lost_track_buffer 按“秒”配置，sv.ByteTrack 内部会按 frame_rate 换算成更新次数
+    """
+    name = "bytetrack"
+
+    def __init__(self, frame_rate=30.0, lost_seconds=1.0, activation=0.25, match_thresh=0.8, min_hits=1):
+        self.frame_rate = frame_rate
+        self.lost_seconds = lost_seconds
+        self.activation = activation
+        self.match_thresh = match_thresh
+        self.min_hits = min_hits
+        self.reset()
+
+    def reset(self):
+        # max_time_lost = frame_rate / 30 * lost_track_buffer，所以 buffer 按 30 帧/秒 给
+        self._tracker = sv.ByteTrack(
+            track_activation_threshold=self.activation,
+            lost_track_buffer=max(1, int(round(self.lost_seconds * 30))),
+            minimum_matching_threshold=self.match_thresh,
+            frame_rate=max(1, int(round(self.frame_rate))),
+            minimum_consecutive_frames=self.min_hits,
+        )
+
+    def set_frame_rate(self, frame_rate):
+        """
+        检测步长在运行中变化时调整更新频率 (不重建，已有轨迹和 ID 保留)
+        丢失容忍的更新次数按新频率重算；卡尔曼速度以“每次更新”为单位，按新旧频率之比换算
+        """
+        ratio = self.frame_rate / frame_rate
+        self.frame_rate = frame_rate
+        self._tracker.max_time_lost = int(max(1, int(round(frame_rate))) / 30.0
+                                          * max(1, int(round(self.lost_seconds * 30))))
+        for track in self._tracker.tracked_tracks + self._tracker.lost_tracks:
+            if track.mean is not None:
+                track.mean[4:] *= ratio
+
+    def update_with_detections(self, detections):
+        return self._tracker.update_with_detections(detections)
+
+    def velocities(self, tracker_ids):
+        """
+        每次更新的框速度 (卡尔曼状态 [cx, cy, a, h, vx, vy, va, vh] 换算成 xyxy 四个坐标的速度)
+        :return: (found (N,), velocity (N, 4))
+        """
+        tracker_ids = np.asarray(tracker_ids, dtype=np.int64)
+        velocity = np.zeros((len(tracker_ids), 4), dtype=np.float32)
+        tracks = [t for t in self._tracker.tracked_tracks if t.is_activated and t.mean is not None]
+        if not tracks:
+            return np.zeros(len(tracker_ids), dtype=bool), velocity
+
+        ids = np.array([t.external_track_id for t in tracks], dtype=np.int64)
+        means = np.stack([t.mean for t in tracks])
+        order = np.argsort(ids)
+        pos = np.clip(np.searchsorted(ids[order], tracker_ids), 0, len(ids) - 1)
+        found = ids[order][pos] == tracker_ids
+
+        cx, cy, a, h, vx, vy, va, vh = means[order][pos[found]].T
+        vw = va * h + a * vh
+        velocity[found] = np.stack([vx - vw / 2, vy - vh / 2, vx + vw / 2, vy + vh / 2], axis=1)
+        return found, velocity
+
+
+class IoUTracker:
+    """
+    纯 IoU 追踪器 (低功耗模式)
+    没有卡尔曼滤波，只拿上一次的框和本帧检测框做贪心 IoU 匹配，
+    适合帧率高、目标运动慢的场景 (相邻两次更新的框重叠足够大)。
+    """
+    name = "iou"
+
+    def __init__(self, frame_rate=30.0, lost_seconds=1.0, activation=0.25, iou_threshold=0.3, min_hits=1):
+        self.frame_rate = frame_rate
+        self.lost_seconds = lost_seconds
+        self.max_age = max(1, int(np.ceil(lost_seconds * frame_rate)))  # 丢失多少次更新后删除
+        self.activation = activation
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.reset()
+
+    def reset(self):
+        self._next_id = 1
+        self._ids = np.empty(0, dtype=np.int64)
+        self._boxes = np.empty((0, 4), dtype=np.float32)
+        self._velocity = np.empty((0, 4), dtype=np.float32)
+        self._age = np.empty(0, dtype=np.int64)    # 距上次匹配过了几次更新
+        self._hits = np.empty(0, dtype=np.int64)
+
+    def set_frame_rate(self, frame_rate):
+        """检测步长在运行中变化时调整更新频率 (丢失容忍次数重算，每次更新的速度按新旧频率之比换算)"""
+        self._velocity *= self.frame_rate / frame_rate
+        self.frame_rate = frame_rate
+        self.max_age = max(1, int(np.ceil(self.lost_seconds * frame_rate)))
+
+    def _predicted_boxes(self):
+        return self._boxes
+
+    def _match(self, boxes):
+        iou = box_iou(self._predicted_boxes(), boxes)
+        return assign(1 - iou, 1 - self.iou_threshold, greedy=True)
+
+    def update_with_detections(self, detections):
+        boxes = detections.xyxy.astype(np.float32)
+        conf = detections.confidence if detections.confidence is not None else np.ones(len(detections))
+        self._age += 1
+
+        rows, cols = self._match(boxes)
+        if len(rows):
+            gap = self._age[rows][:, None]
+            velocity = (boxes[cols] - self._boxes[rows]) / gap
+            # 速度做一次指数平滑，检测框抖动时外推更稳
+            self._velocity[rows] = np.where(self._hits[rows][:, None] > 1,
+                                            0.5 * self._velocity[rows] + 0.5 * velocity, velocity)
+            self._boxes[rows] = boxes[cols]
+            self._age[rows] = 0
+            self._hits[rows] += 1
+
+        # 未匹配的高分检测框开新轨迹
+        unmatched = np.ones(len(boxes), dtype=bool)
+        unmatched[cols] = False
+        new = np.flatnonzero(unmatched & (conf >= self.activation))
+        new_ids = np.arange(self._next_id, self._next_id + len(new), dtype=np.int64)
+        self._next_id += len(new)
+        self._append(new_ids, boxes[new])
+
+        # 先记下匹配到的轨迹 ID / 命中次数，再删除丢失太久的轨迹
+        track_ids = np.concatenate([self._ids[rows], new_ids])
+        hits = np.concatenate([self._hits[rows], np.ones(len(new), dtype=np.int64)])
+        keep = self._age <= self.max_age
+        if not np.all(keep):
+            self._keep(keep)
+
+        det_idx = np.concatenate([cols, new])
+        confirmed = hits >= self.min_hits
+        result = detections[det_idx[confirmed]]
+        result.tracker_id = track_ids[confirmed]
+        return result
+
+    def _append(self, ids, boxes):
+        n = len(ids)
+        self._ids = np.concatenate([self._ids, ids])
+        self._boxes = np.concatenate([self._boxes, boxes])
+        self._velocity = np.concatenate([self._velocity, np.zeros((n, 4), dtype=np.float32)])
+        self._age = np.concatenate([self._age, np.zeros(n, dtype=np.int64)])
+        self._hits = np.concatenate([self._hits, np.ones(n, dtype=np.int64)])
+
+    def _keep(self, mask):
+        self._ids = self._ids[mask]
+        self._boxes = self._boxes[mask]
+        self._velocity = self._velocity[mask]
+        self._age = self._age[mask]
+        self._hits = self._hits[mask]
+
+    def velocities(self, tracker_ids):
+        tracker_ids = np.asarray(tracker_ids, dtype=np.int64)
+        velocity = np.zeros((len(tracker_ids), 4), dtype=np.float32)
+        if not len(self._ids):
+            return np.zeros(len(tracker_ids), dtype=bool), velocity
+        # 新轨迹按 ID 递增追加，_ids 始终是升序的
+        pos = np.clip(np.searchsorted(self._ids, tracker_ids), 0, len(self._ids) - 1)
+        found = self._ids[pos] == tracker_ids
+        velocity[found] = self._velocity[pos[found]]
+        return found, velocity
+
+
+class OCSortTracker(IoUTracker):
+    """
+    OC-SORT 风格的运动追踪器 (以观测为中心，不用卡尔曼)
+    - 预测：最后一次观测框 + 观测速度 x 丢失次数
+    - 关联代价：IoU + 运动方向一致性 (轨迹速度方向 vs 最后观测 -> 检测框的方向)，匈牙利匹配
+    - 找回：第一轮没匹配上的轨迹再用“最后一次观测框”和剩余检测框做一次 IoU 匹配，
+      遮挡后预测漂移的目标也能接回原 ID
+    - 速度始终由两次观测相减得到，丢失期间的外推误差不会累积进速度
+    """
+    name = "ocsort"
+
+    def __init__(self, frame_rate=30.0, lost_seconds=1.0, activation=0.25, iou_threshold=0.3, min_hits=1,
+                 inertia=0.2):
+        super().__init__(frame_rate, lost_seconds, activation, iou_threshold, min_hits)
+        self.inertia = inertia  # 方向一致性在代价里的权重
+
+    def _predicted_boxes(self):
+        return self._boxes + self._velocity * self._age[:, None]
+
+    def _match(self, boxes):
+        n_tracks, n_dets = len(self._ids), len(boxes)
+        empty = np.empty(0, dtype=np.int64)
+        if not n_tracks or not n_dets:
+            return empty, empty
+
+        iou = box_iou(self._predicted_boxes(), boxes)
+        cost = -iou
+        moving = self._hits > 1
+        if np.any(moving):
+            center = (self._boxes[:, :2] + self._boxes[:, 2:]) / 2
+            speed = (self._velocity[:, :2] + self._velocity[:, 2:]) / 2
+            direction = (boxes[None, :, :2] + boxes[None, :, 2:]) / 2 - center[:, None, :]      # (T, D, 2)
+            norm = np.linalg.norm(direction, axis=2) * np.linalg.norm(speed, axis=1)[:, None]
+            cosine = (direction * speed[:, None, :]).sum(axis=2) / np.maximum(norm, 1e-6)
+            cost -= self.inertia * np.where(moving[:, None], cosine, 0.0)
+        cost[iou < self.iou_threshold] = np.inf
+        rows, cols = assign(np.where(np.isinf(cost), 1e6, cost), 1e5)
+
+        # 第二轮：剩下的轨迹用最后一次观测框匹配
+        left_t = np.setdiff1d(np.arange(n_tracks), rows)
+        left_d = np.setdiff1d(np.arange(n_dets), cols)
+        if len(left_t) and len(left_d):
+            iou2 = box_iou(self._boxes[left_t], boxes[left_d])
+            r2, c2 = assign(1 - iou2, 1 - self.iou_threshold)
+            rows = np.concatenate([rows, left_t[r2]])
+            cols = np.concatenate([cols, left_d[c2]])
+        return rows, cols
+
+
+TRACKERS = {
+    ByteTrackTracker.name: ByteTrackTracker,
+    IoUTracker.name: IoUTracker,
+    OCSortTracker.name: OCSortTracker,
+}
+
+
+def build_tracker(kind="bytetrack", fps=30.0, stride=1, lost_seconds=1.0, **params):
+    """
+    按视频帧率和检测步长创建追踪器
+    追踪器每 stride 帧才更新一次，实际更新频率 = fps / stride，丢失时长等参数都按它换算
+    """
+    cls = TRACKERS.get(kind)
+    if cls is None:
+        print(f"⚠️ 未知追踪器 {kind}，使用 bytetrack")
+        cls = ByteTrackTracker
+    return cls(frame_rate=update_rate(fps, stride), lost_seconds=lost_seconds, **params)
+
+
+def update_rate(fps, stride):
+    """追踪器每秒更新次数 (步长变化时传给 tracker.set_frame_rate)"""
+    return max(float(fps) / max(int(stride), 1), 1.0)
@@ -0,0 +1,212 @@
+# core/zones.py
+import cv2
+import numpy as np
+
+from core.track_slots import grow_rows
+
+# 4 个角点 (与 sv.LineZone 默认的触发锚点一致)，用于判断目标是否完全越过计数线
+_CORNERS = ((0, 1), (2, 1), (0, 3), (2, 3))
+
+
+class ZoneEngine:
+    """
+    多计数线 + 多区域 (多边形) 统计引擎
+    所有线/多边形与所有目标在一次向量化运算中完成判断，逐类别计数。
+
+    配置格式 (坐标为相对画面宽高的 0~1 比例，与分辨率无关)：
+    {
+        "lines":    [{"name": "north_gate", "start": [0.1, 0.35], "end": [0.9, 0.35], "classes": [0, 2, 3]}],
+        "polygons": [{"name": "plaza", "points": [[0.2, 0.6], [0.5, 0.6], [0.5, 0.9], [0.2, 0.9]]}]
+    }
+    classes 缺省表示统计所有类别。
+
+    越线规则与 sv.LineZone 保持一致：目标框 4 个角点都在线的同一侧才算有效位置，
+    位置从右侧变到左侧记为 in，反之为 out；框的投影必须落在线段范围内。
+    """
+
+    def __init__(self, config, frame_size, num_classes):
+        w, h = frame_size
+        self.num_classes = num_classes
+
+        lines = config.get("lines", [])
+        polygons = config.get("polygons", [])
+        scale = np.array([w, h], dtype=np.float32)
+
+        # --- 计数线 (L 条) ---
+        self.line_names = [ln.get("name", f"line_{i}") for i, ln in enumerate(lines)]
+        self.line_a = np.array([ln["start"] for ln in lines], dtype=np.float32).reshape(-1, 2) * scale
+        self.line_b = np.array([ln["end"] for ln in lines], dtype=np.float32).reshape(-1, 2) * scale
+        self.line_d = self.line_b - self.line_a
+        self.line_len2 = np.maximum((self.line_d ** 2).sum(axis=1), 1e-6)
+        self.line_classes = self._class_mask([ln.get("classes") for ln in lines])
+
+        # --- 多边形 (Z 个)，顶点补齐到同样长度，补齐的边用 edge_valid 屏蔽 ---
+        self.polygon_names = [pg.get("name", f"zone_{i}") for i, pg in enumerate(polygons)]
+        max_v = max((len(pg["points"]) for pg in polygons), default=0)
+        verts = np.zeros((len(polygons), max_v, 2), dtype=np.float32)
+        valid = np.zeros((len(polygons), max_v), dtype=bool)
+        for i, pg in enumerate(polygons):
+            pts = np.array(pg["points"], dtype=np.float32) * scale
+            verts[i, :len(pts)] = pts
+            valid[i, :len(pts)] = True
+            # 补齐位置填首个顶点 (退化成长度为 0 的边，不会产生交点)
+            verts[i, len(pts):] = pts[0]
+        self.poly_verts = verts
+        self.poly_next = np.empty_like(verts)
+        for i, pg in enumerate(polygons):
+            n = len(pg["points"])
+            self.poly_next[i, :n] = np.roll(verts[i, :n], -1, axis=0)
+            self.poly_next[i, n:] = verts[i, n:]
+        self.poly_edge_valid = valid
+        self.poly_classes = self._class_mask([pg.get("classes") for pg in polygons])
+        self.poly_pixels = [(np.array(pg["points"], dtype=np.float32) * scale).astype(np.int32) for pg in polygons]
+
+        # --- 累计计数 ---
+        self.in_counts = np.zeros((len(lines), num_classes), dtype=np.int64)
+        self.out_counts = np.zeros((len(lines), num_classes), dtype=np.int64)
+
+        # --- 每个目标在每条线上的最近有效位置 (+1 左 / -1 右 / 0 未知)，按槽位 (TrackSlots) 存放 ---
+        # 目标消失后状态随槽位一起回收，新目标拿到槽位时由 fresh 清零
+        self._sides = np.zeros((0, len(lines)), dtype=np.int8)
+
+    @classmethod
+    def default_config(cls, frame_size, class_ids):
+        """未配置时的默认规则：画面 35% 高度处一条横线 (与旧版计数线相同)"""
+        w, _ = frame_size
+        margin = 50 / max(w, 1)
+        return {"lines": [{"name": "main", "start": [margin, 0.35], "end": [1 - margin, 0.35],
+                           "classes": [int(c) for c in class_ids]}],
+                "polygons": []}
+
+    def _class_mask(self, class_lists):
+        mask = np.ones((len(class_lists), self.num_classes), dtype=bool)
+        for i, classes in enumerate(class_lists):
+            if classes is not None:
+                mask[i] = False
+                ids = [c for c in classes if 0 <= c < self.num_classes]
+                mask[i, ids] = True
+        return mask
+
+    @property
+    def in_count(self):
+        return int(self.in_counts.sum())
+
+    @property
+    def out_count(self):
+        return int(self.out_counts.sum())
+
+    def update(self, xyxy, class_ids, slots, fresh=None):
+        """
+        评估一帧
+        :param xyxy: (N, 4) 目标框
+        :param class_ids: (N,) 类别
+        :param slots: (N,) 目标槽位 (TrackSlots.update 的返回值，None 时只做区域占用统计)
+        :param fresh: (N,) 槽位是否本帧新分配 (TrackSlots.fresh)，新分配的槽位清空旧的越线状态
+        :return: dict
+            line_in / line_out: (L, C) 本帧各线各类别的进/出数量
+            crossings: (K, 3) [线序号, 目标下标, 方向(+1 进 / -1 出)]
+            inside: (Z, N) 目标是否在各区域内
+            occupancy: (Z, C) 各区域各类别当前数量
+        """
+        n = len(xyxy)
+        n_lines, n_polys = len(self.line_names), len(self.polygon_names)
+        class_ids = np.asarray(class_ids, dtype=np.int64).reshape(-1)
+        valid_cls = (class_ids >= 0) & (class_ids < self.num_classes)
+        cls = np.where(valid_cls, class_ids, 0)
+        onehot = np.zeros((n, self.num_classes), dtype=np.int64)
+        onehot[np.arange(n)[valid_cls], cls[valid_cls]] = 1
+
+        result = {
+            'line_in': np.zeros((n_lines, self.num_classes), dtype=np.int64),
+            'line_out': np.zeros((n_lines, self.num_classes), dtype=np.int64),
+            'crossings': np.zeros((0, 3), dtype=np.int64),
+            'inside': np.zeros((n_polys, n), dtype=bool),
+            'occupancy': np.zeros((n_polys, self.num_classes), dtype=np.int64),
+        }
+
+        if n_lines and n and slots is not None:
+            slots = np.asarray(slots, dtype=np.int64)
+            if slots.max() >= len(self._sides):
+                self._sides = grow_rows(self._sides, max(int(slots.max()) + 1, 2 * len(self._sides)))
+            if fresh is not None:
+                self._sides[slots[fresh]] = 0
+            self._update_lines(np.asarray(xyxy, dtype=np.float32), cls, valid_cls, onehot, slots, result)
+        if n_polys and n:
+            self._update_polygons(np.asarray(xyxy, dtype=np.float32), cls, valid_cls, onehot, result)
+        return result
+
+    def _update_lines(self, xyxy, cls, valid_cls, onehot, slots, result):
+        # corners: (4, N, 2)
+        corners = np.stack([xyxy[:, [i, j]] for i, j in _CORNERS])
+        rel = corners[:, :, None, :] - self.line_a[None, None, :, :]          # (4, N, L, 2)
+        d = self.line_d[None, None, :, :]
+        cross = d[..., 0] * rel[..., 1] - d[..., 1] * rel[..., 0]             # (4, N, L)
+        t = (rel * d).sum(axis=-1) / self.line_len2                           # (4, N, L)
+
+        in_limits = np.all((t >= 0) & (t <= 1), axis=0)                       # (N, L)
+        left = np.all(cross < 0, axis=0)
+        right = np.all(cross >= 0, axis=0)
+        cur = np.where(left, 1, np.where(right, -1, 0)).astype(np.int8)
+        cur[~in_limits] = 0
+        # 该线不统计的类别直接置 0
+        cur[~(self.line_classes[:, cls].T & valid_cls[:, None])] = 0
+
+        # 取出这些目标上一次的状态
+        prev = self._sides[slots]
+
+        crossed = (cur != 0) & (prev != 0) & (cur != prev)                     # (N, L)
+        if np.any(crossed):
+            went_in = crossed & (cur > 0)
+            went_out = crossed & (cur < 0)
+            result['line_in'] = went_in.T.astype(np.int64) @ onehot
+            result['line_out'] = went_out.T.astype(np.int64) @ onehot
+            self.in_counts += result['line_in']
+            self.out_counts += result['line_out']
+            det_idx, line_idx = np.nonzero(crossed)
+            result['crossings'] = np.stack([line_idx, det_idx, cur[det_idx, line_idx].astype(np.int64)], axis=1)
+
+        # 写回状态：本帧无效位置 (压线/出界) 时保留旧状态
+        self._sides[slots] = np.where(cur != 0, cur, prev)
+
+    def _update_polygons(self, xyxy, cls, valid_cls, onehot, result):
+        # 锚点：框底边中点 (与 sv.PolygonZone 默认一致)
+        px = ((xyxy[:, 0] + xyxy[:, 2]) / 2)[None, None, :]                     # (1, 1, N)
+        py = xyxy[:, 3][None, None, :]
+        xi, yi = self.poly_verts[..., 0][..., None], self.poly_verts[..., 1][..., None]   # (Z, E, 1)
+        xj, yj = self.poly_next[..., 0][..., None], self.poly_next[..., 1][..., None]
+
+        straddle = (yi > py) != (yj > py)
+        dy = np.where(yj - yi == 0, 1e-6, yj - yi)
+        hit = straddle & (px < (xj - xi) * (py - yi) / dy + xi)
+        hit &= self.poly_edge_valid[..., None]
+        inside = (hit.sum(axis=1) % 2) == 1                                    # (Z, N)
+        inside &= self.poly_classes[:, cls] & valid_cls[None, :]
+
+        result['inside'] = inside
+        result['occupancy'] = inside.astype(np.int64) @ onehot
+
+    def summary(self, result):
+        """转成便于展示/存储的字典"""
+        return {
+            'lines': {name: {'in': int(self.in_counts[i].sum()), 'out': int(self.out_counts[i].sum())}
+                      for i, name in enumerate(self.line_names)},
+            'polygons': {name: int(result['occupancy'][i].sum())
+                         for i, name in enumerate(self.polygon_names)},
+        }
+
+    def annotate(self, frame, result=None):
+        """画计数线 (带进出数) 和区域 (带当前数量)"""
+        for i, name in enumerate(self.line_names):
+            a = tuple(int(v) for v in self.line_a[i])
+            b = tuple(int(v) for v in self.line_b[i])
+            cv2.line(frame, a, b, (0, 0, 255), 4)
+            text = f"{name} in:{int(self.in_counts[i].sum())} out:{int(self.out_counts[i].sum())}"
+            cv2.putText(frame, text, (a[0], max(a[1] - 10, 20)), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        for i, name in enumerate(self.polygon_names):
+            pts = self.poly_pixels[i]
+            cv2.polylines(frame, [pts], True, (255, 200, 0), 2)
+            count = int(result['occupancy'][i].sum()) if result is not None else 0
+            x, y = pts[:, 0].min(), pts[:, 1].min()
+            cv2.putText(frame, f"{name}: {count}", (int(x), int(y) + 25), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.7, (255, 200, 0), 2)
+        return frame
@@ -0,0 +1,87 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """
+    SQLite 连接池
+    - 读：每个线程一个长连接 (thread-local)，并发读互不阻塞
+    - 写：全局唯一写连接，通过锁串行化 (SQLite 本身只允许单写者)
+    - 所有连接统一 WAL + 调优过的 PRAGMA；长连接下 sqlite3 的语句缓存可以复用预编译语句
+    """
+
+    # 所有连接共用的 PRAGMA
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",   # WAL 下 NORMAL 已能保证一致性，少一次 fsync
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path, cache_size_kb=16384, mmap_size=64 * 1024 * 1024, cached_statements=256):
+        self.db_path = db_path
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._writer_conn = None
+        self._all_conns = []
+        self._conns_lock = threading.Lock()
+
+    def _connect(self, read_only=False):
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=self.cached_statements
+        )
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        # 负数表示按 KB 计
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")
+            conn.row_factory = sqlite3.Row
+        with self._conns_lock:
+            self._all_conns.append(conn)
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """当前线程专属的只读连接 (行以 sqlite3.Row 返回)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect(read_only=True)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """
+        串行化的写连接：
+            with pool.writer() as conn:
+                conn.execute(...)
+        正常退出自动提交，异常时回滚
+        """
+        with self._write_lock:
+            if self._writer_conn is None:
+                self._writer_conn = self._connect()
+            conn = self._writer_conn
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def close_all(self):
+        """关闭池里的全部连接 (程序退出时调用)"""
+        with self._write_lock, self._conns_lock:
+            for conn in self._all_conns:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._all_conns.clear()
+            self._writer_conn = None
+            self._local = threading.local()
@@ -6,6 +6,11 @@ from datetime import datetime
 from typing import List, Tuple, Optional
 # 引入刚才定义的模型
 from database.models import User, Event
+from database.connection_pool import ConnectionPool
+from database.write_queue import WriteBehindQueue
+from database.stats_store import TrafficStatsStore
+from database.trajectory_store import TrajectoryStore
+from database.od_store import ODStore
 
 class DBManager:
     _instance = None
@@ -17,49 +22,73 @@ class DBManager:
                 if not cls._instance:
                     cls._instance = super().__new__(cls)
                     cls._instance.db_path = db_path
+                    # 连接池：每线程一个读连接 + 串行化的写连接 (均为 WAL 模式)
+                    cls._instance.pool = ConnectionPool(db_path)
                     cls._instance._init_db()
+                    # 报警事件/截图的异步写回队列 (复用连接池的写连接)
+                    cls._instance.writer = WriteBehindQueue(cls._instance.pool)
+                    # 流量时序统计 (秒级聚合 + 后台逐级汇总)
+                    cls._instance.stats = TrafficStatsStore(cls._instance.pool, cls._instance.writer)
+                    # 目标轨迹 (按段增量编码存 BLOB)
+                    cls._instance.tracks = TrajectoryStore(cls._instance.pool, cls._instance.writer)
+                    # 闸口事件 + OD 矩阵缓存
+                    cls._instance.od = ODStore(cls._instance.pool, cls._instance.writer)
         return cls._instance
 
-    def _get_conn(self):
-        """获取数据库连接 (check_same_thread=False 允许跨线程使用)"""
-        return sqlite3.connect(self.db_path, check_same_thread=False)
-
     def _init_db(self):
         """初始化数据库表结构"""
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        
-        # 创建用户表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                role TEXT DEFAULT 'user',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # 创建事件表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                event_type TEXT NOT NULL,
-                camera_id TEXT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                snapshot_path TEXT,
-                video_path TEXT,
-                description TEXT
-            )
-        ''')
-        
-        # 初始化默认管理员
-        cursor.execute("SELECT count(*) FROM users")
-        if cursor.fetchone()[0] == 0:
-            self._create_admin(cursor)
-            
-        conn.commit()
-        conn.close()
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+
+            # 创建用户表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    role TEXT DEFAULT 'user',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # 创建事件表
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_type TEXT NOT NULL,
+                    camera_id TEXT NOT NULL,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    snapshot_path TEXT,
+                    video_path TEXT,
+                    description TEXT
+                )
+            ''')
+
+            # 事件表索引：时间倒序分页 + 按摄像头/类型过滤 + 按录像路径删除
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_ts ON events (timestamp, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_camera ON events (camera_id, timestamp, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_type ON events (event_type, timestamp, id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_video ON events (video_path)")
+
+            # 区域访问记录 (进入/离开/停留时长，时间为 Unix 秒)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS zone_visits (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    camera_id TEXT NOT NULL,
+                    zone TEXT NOT NULL,
+                    track_id INTEGER,
+                    class_id INTEGER,
+                    enter_ts REAL NOT NULL,
+                    exit_ts REAL NOT NULL,
+                    dwell REAL NOT NULL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_visits_zone ON zone_visits (camera_id, zone, exit_ts)")
+
+            # 初始化默认管理员
+            cursor.execute("SELECT count(*) FROM users")
+            if cursor.fetchone()[0] == 0:
+                self._create_admin(cursor)
 
     def _create_admin(self, cursor):
         """创建默认管理员账号"""
@@ -79,91 +108,178 @@ class DBManager:
 
     def login(self, username, password) -> Tuple[bool, str]:
         """验证登录，返回 (是否成功, 角色)"""
-        conn = self._get_conn()
-        cursor = conn.cursor()
         pwd_hash = self._hash_password(password)
-        
-        cursor.execute(
-            "SELECT role FROM users WHERE username=? AND password_hash=?", 
+        res = self.pool.reader().execute(
+            "SELECT role FROM users WHERE username=? AND password_hash=?",
             (username, pwd_hash)
-        )
-        res = cursor.fetchone()
-        conn.close()
-        
+        ).fetchone()
+
         if res:
             return True, res[0]
         return False, ""
 
     def add_user(self, username, password, role="user") -> bool:
         """注册新用户"""
-        conn = self._get_conn()
-        cursor = conn.cursor()
         try:
             pwd_hash = self._hash_password(password)
-            cursor.execute(
-                "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-                (username, pwd_hash, role)
-            )
-            conn.commit()
+            with self.pool.writer() as conn:
+                conn.execute(
+                    "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                    (username, pwd_hash, role)
+                )
             return True
         except sqlite3.IntegrityError:
             return False
-        finally:
-            conn.close()
 
     # --- 事件相关功能 ---
 
     def insert_event(self, event: Event) -> int:
-        """插入一条报警记录"""
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        
+        """插入一条报警记录 (同步)"""
         if not event.timestamp:
             event.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-        cursor.execute('''
-            INSERT INTO events (event_type, camera_id, timestamp, description, snapshot_path, video_path)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (event.event_type, event.camera_id, event.timestamp, event.description, event.snapshot_path, event.video_path))
-        
-        new_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self.pool.writer() as conn:
+            cursor = conn.execute('''
+                INSERT INTO events (event_type, camera_id, timestamp, description, snapshot_path, video_path)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (event.event_type, event.camera_id, event.timestamp, event.description, event.snapshot_path, event.video_path))
+            new_id = cursor.lastrowid
         return new_id
 
+    def insert_event_async(self, event: Event, on_done=None) -> bool:
+        """异步插入报警记录 (入队即返回)，写入后回调 on_done(new_id)"""
+        return self.writer.put_event(event, on_done)
+
+    def save_snapshot_async(self, path: str, frame) -> bool:
+        """异步保存报警截图，避免在 GUI 线程里做 cv2.imwrite"""
+        return self.writer.put_snapshot(path, frame)
+
+    def insert_zone_visits_async(self, camera_id: str, visits, time_offset: float = 0.0) -> bool:
+        """
+        异步写入区域访问记录 (DwellTracker.update 的返回值)
+        :param time_offset: 加到进入/离开时间上的偏移，把视频时间换算成 Unix 时间
+        """
+        if not visits:
+            return True
+        rows = [(camera_id, zone, tid, cid, enter + time_offset, leave + time_offset, dwell)
+                for zone, tid, cid, enter, leave, dwell in visits]
+        return self.writer.put_rows(
+            "INSERT INTO zone_visits (camera_id, zone, track_id, class_id, enter_ts, exit_ts, dwell) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def query_zone_visits(self, camera_id, zone=None, start_ts=None, end_ts=None, limit=None) -> List[tuple]:
+        """按离开时间查询区域访问记录，返回 [(zone, track_id, class_id, enter_ts, exit_ts, dwell), ...]"""
+        sql = "SELECT zone, track_id, class_id, enter_ts, exit_ts, dwell FROM zone_visits WHERE camera_id = ?"
+        params = [camera_id]
+        if zone:
+            sql += " AND zone = ?"
+            params.append(zone)
+        if start_ts is not None:
+            sql += " AND exit_ts >= ?"
+            params.append(start_ts)
+        if end_ts is not None:
+            sql += " AND exit_ts < ?"
+            params.append(end_ts)
+        sql += " ORDER BY exit_ts DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [tuple(row) for row in self.pool.reader().execute(sql, params).fetchall()]
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待写队列清空"""
+        return self.writer.flush(timeout)
+
+    def close(self):
+        """程序退出前调用：把队列里剩余的事件/截图/统计/轨迹全部落盘，再关闭连接池"""
+        self.stats.stop()
+        self.tracks.flush()
+        self.writer.close()
+        self.pool.close_all()
+
+    def queue_metrics(self) -> dict:
+        """写队列指标 (queue_depth / max_depth / events_written ...)"""
+        return self.writer.metrics()
+
+    @staticmethod
+    def _row_to_event(row) -> Event:
+        return Event(
+            id=row['id'],
+            event_type=row['event_type'],
+            camera_id=row['camera_id'],
+            timestamp=row['timestamp'],
+            description=row['description'],
+            snapshot_path=row['snapshot_path'],
+            video_path=row['video_path']
+        )
+
     def get_all_events(self) -> List[Event]:
-        """获取所有历史记录"""
-        conn = self._get_conn()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM events ORDER BY timestamp DESC")
-        rows = cursor.fetchall()
-        
-        events = []
-        for row in rows:
-            events.append(Event(
-                id=row['id'],
-                event_type=row['event_type'],
-                camera_id=row['camera_id'],
-                timestamp=row['timestamp'],
-                description=row['description'],
-                snapshot_path=row['snapshot_path'],
-                video_path=row['video_path']
-            ))
-        conn.close()
-        return events
+        """获取所有历史记录 (数据量大时请改用 query_events 分页)"""
+        rows = self.pool.reader().execute("SELECT * FROM events ORDER BY timestamp DESC, id DESC").fetchall()
+        return [self._row_to_event(row) for row in rows]
+
+    def query_events(self, limit=50, before=None, after=None, start=None, end=None,
+                     camera_id=None, event_type=None, text=None) -> Tuple[List[Event], Optional[tuple]]:
+        """
+        分页查询历史记录 (按时间倒序，Keyset 分页)
+        :param limit: 每页条数 (None 表示不限)
+        :param before: 游标 (timestamp, id)，传入上一页返回的 next_cursor
+        :param after: 只取比该 (timestamp, id) 更新的记录 (用于增量刷新)
+        :param start: 起始时间 (含)，格式 "YYYY-MM-DD HH:MM:SS"
+        :param end: 结束时间 (含)
+        :param camera_id: 摄像头过滤
+        :param event_type: 事件类型过滤
+        :param text: 描述关键字 (模糊匹配)
+        :return: (本页事件, next_cursor)，没有下一页时 next_cursor 为 None
+        """
+        where, params = [], []
+        if before is not None:
+            # 行值比较，能直接走 (timestamp, id) 索引
+            where.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        if after is not None:
+            where.append("(timestamp, id) > (?, ?)")
+            params.extend(after)
+        if start:
+            where.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            where.append("timestamp <= ?")
+            params.append(end)
+        if camera_id:
+            where.append("camera_id = ?")
+            params.append(camera_id)
+        if event_type:
+            where.append("event_type = ?")
+            params.append(event_type)
+        if text:
+            # 关键字里的 % _ 按字面匹配，不当通配符
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("description LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+
+        sql = "SELECT * FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        rows = self.pool.reader().execute(sql, params).fetchall()
+        events = [self._row_to_event(row) for row in rows]
+
+        next_cursor = None
+        if limit is not None and len(events) == limit:
+            next_cursor = (events[-1].timestamp, events[-1].id)
+        return events, next_cursor
 
     def delete_event(self, video_path):
         """根据视频路径删除数据库中的记录"""
-        # 🟢 [关键] 使用你类里定义好的 _get_conn() 方法获取连接
-        conn = self._get_conn()
-
         try:
-            cursor = conn.cursor()
-            # 根据唯一的文件路径来定位并删除
-            cursor.execute("DELETE FROM events WHERE video_path = ?", (video_path,))
-            conn.commit()
+            with self.pool.writer() as conn:
+                # 根据唯一的文件路径来定位并删除
+                cursor = conn.execute("DELETE FROM events WHERE video_path = ?", (video_path,))
 
             # cursor.rowcount 表示受影响的行数
             if cursor.rowcount > 0:
@@ -176,6 +292,3 @@ class DBManager:
         except Exception as e:
             print(f"❌ 删除数据库记录失败: {e}")
             return False
-        finally:
-            # 🟢 [关键] 必须关闭连接，释放资源
-            conn.close()
@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+
+from core.od_matrix import od_from_events, count_trips
+
+CROSSING_SQL = '''
+    INSERT INTO zone_crossings (camera_id, epoch, track_id, class_id, gate, direction, ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+TRIP_UPSERT_SQL = '''
+    INSERT INTO od_matrix (camera_id, bucket, origin, destination, class_id, trips)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (camera_id, bucket, origin, destination, class_id) DO UPDATE SET
+        trips = trips + excluded.trips
+'''
+
+
+class ODStore:
+    """
+    闸口事件 + OD 矩阵缓存
+    - zone_crossings：原始越线/进入区域事件 (每帧只有零星几条，直接走写队列)
+    - od_matrix：按 (摄像头, 小时桶, 起点, 终点, 类别) 汇总好的出行数，看板直接读这张表
+      实时出行结束时增量累加；规则调整或补数据时用 recompute() 从原始事件重算
+    - 追踪器重建后 ID 会重新编号，闸口事件带上追踪器代数 epoch，重算时按 (epoch, track_id) 划分出行
+    """
+
+    def __init__(self, pool, writer, bucket_seconds=3600, gap_timeout=30.0):
+        self.pool = pool
+        self.writer = writer
+        self.bucket_seconds = bucket_seconds
+        self.gap_timeout = gap_timeout
+        self._init_tables()
+
+    def _init_tables(self):
+        with self.pool.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS zone_crossings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    camera_id TEXT NOT NULL,
+                    epoch INTEGER NOT NULL DEFAULT 0,
+                    track_id INTEGER NOT NULL,
+                    class_id INTEGER,
+                    gate TEXT NOT NULL,
+                    direction INTEGER,
+                    ts REAL NOT NULL
+                )
+            ''')
+            # 旧库没有 epoch 列，补上 (旧数据的 epoch 为 0)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(zone_crossings)")}
+            if 'epoch' not in columns:
+                conn.execute("ALTER TABLE zone_crossings ADD COLUMN epoch INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_crossings_ts ON zone_crossings (camera_id, ts)")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS od_matrix (
+                    camera_id TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    origin TEXT NOT NULL,
+                    destination TEXT NOT NULL,
+                    class_id INTEGER NOT NULL,
+                    trips INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (camera_id, bucket, origin, destination, class_id)
+                ) WITHOUT ROWID
+            ''')
+
+    # --- 写入 ---
+
+    def record_crossings(self, camera_id, gate_events, ts=None, epoch=0):
+        """写入本帧的闸口事件 [(闸口名, 追踪ID, 类别, 方向), ...]，epoch 为追踪器代数"""
+        if not gate_events:
+            return
+        ts = ts if ts is not None else time.time()
+        self.writer.put_rows(CROSSING_SQL, [(camera_id, epoch, tid, cid, gate, direction, ts)
+                                            for gate, tid, cid, direction in gate_events])
+
+    def add_trips(self, camera_id, trips):
+        """累加实时结束的出行 [(起点, 终点, 类别, 起点时间), ...] (ODTracker.update 的返回值)"""
+        if not trips:
+            return
+        rows = {}
+        for origin, dest, cid, start in trips:
+            key = (int(start // self.bucket_seconds) * self.bucket_seconds, origin, dest, int(cid))
+            rows[key] = rows.get(key, 0) + 1
+        self.writer.put_rows(TRIP_UPSERT_SQL, [(camera_id,) + key + (n,) for key, n in rows.items()])
+
+    def recompute(self, camera_id, start_ts, end_ts):
+        """
+        用原始事件重算 [start_ts, end_ts) 内各小时桶的 OD 矩阵并覆盖缓存
+        起止时间会对齐到整桶；为了拿到跨桶的完整出行，会多读前后 gap_timeout 秒的事件
+        """
+        b = self.bucket_seconds
+        start = int(start_ts // b) * b
+        end = int(-(-end_ts // b)) * b
+
+        rows = self.pool.reader().execute(
+            "SELECT epoch, track_id, class_id, gate, ts FROM zone_crossings "
+            "WHERE camera_id = ? AND ts >= ? AND ts < ?",
+            (camera_id, start - self.gap_timeout, end + self.gap_timeout)
+        ).fetchall()
+
+        out = []
+        if rows:
+            # (epoch, track_id) 编成一个整数 ID，不同代的同号目标不会被拼成一次出行
+            keys = np.array([(r['epoch'], r['track_id']) for r in rows], dtype=np.int64)
+            _, track_ids = np.unique(keys, axis=0, return_inverse=True)
+            track_ids = track_ids.reshape(-1)
+            class_ids = np.array([r['class_id'] if r['class_id'] is not None else -1 for r in rows], dtype=np.int64)
+            ts = np.array([r['ts'] for r in rows], dtype=np.float64)
+            gate_names, gates = np.unique([r['gate'] for r in rows], return_inverse=True)
+
+            origins, dests, classes, starts = od_from_events(track_ids, gates, class_ids, ts, self.gap_timeout)
+            keep = (starts >= start) & (starts < end)
+            keys, counts = count_trips(origins[keep], dests[keep], classes[keep], starts[keep], b)
+            out = [(camera_id, int(k[0]), str(gate_names[k[1]]), str(gate_names[k[2]]), int(k[3]), int(n))
+                   for k, n in zip(keys, counts)]
+
+        with self.pool.writer() as conn:
+            conn.execute("DELETE FROM od_matrix WHERE camera_id = ? AND bucket >= ? AND bucket < ?",
+                         (camera_id, start, end))
+            conn.executemany(TRIP_UPSERT_SQL, out)
+        return len(out)
+
+    # --- 查询 ---
+
+    def matrix(self, camera_id, start_ts, end_ts, class_id=None):
+        """
+        读取缓存的 OD 矩阵 (多个小时桶相加)
+        :return: (闸口名列表, (G, G) 出行数矩阵，行 = 起点，列 = 终点)
+        """
+        sql = '''
+            SELECT origin, destination, SUM(trips) AS trips FROM od_matrix
+            WHERE camera_id = ? AND bucket >= ? AND bucket < ?
+        '''
+        params = [camera_id, int(start_ts), int(end_ts)]
+        if class_id is not None:
+            sql += " AND class_id = ?"
+            params.append(class_id)
+        sql += " GROUP BY origin, destination"
+        rows = self.pool.reader().execute(sql, params).fetchall()
+
+        gates = sorted({r['origin'] for r in rows} | {r['destination'] for r in rows})
+        index = {g: i for i, g in enumerate(gates)}
+        matrix = np.zeros((len(gates), len(gates)), dtype=np.int64)
+        for r in rows:
+            matrix[index[r['origin']], index[r['destination']]] += r['trips']
+        return gates, matrix
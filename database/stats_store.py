@@ -0,0 +1,281 @@
+import threading
+import time
+
+# 统计粒度 (秒)：1s 原始桶 -> 1min -> 1h -> 1day
+RESOLUTIONS = (1, 60, 3600, 86400)
+
+# 各粒度的保留时长 (秒)，None 表示永久保留
+DEFAULT_RETENTION = {
+    1: 2 * 3600,          # 秒级数据留 2 小时
+    60: 7 * 86400,        # 分钟级留 7 天
+    3600: 180 * 86400,    # 小时级留半年
+    86400: None,          # 天级永久
+}
+
+# class_id = -1 的行是该摄像头所有类别的合计，samples 以它为准
+ALL_CLASSES = -1
+
+UPSERT_SQL = '''
+    INSERT INTO traffic_stats (resolution, bucket, camera_id, class_id,
+                               in_count, out_count, present_sum, present_max, samples)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (resolution, bucket, camera_id, class_id) DO UPDATE SET
+        in_count = in_count + excluded.in_count,
+        out_count = out_count + excluded.out_count,
+        present_sum = present_sum + excluded.present_sum,
+        present_max = MAX(present_max, excluded.present_max),
+        samples = samples + excluded.samples
+'''
+
+ROLLUP_SQL = '''
+    INSERT INTO traffic_stats (resolution, bucket, camera_id, class_id,
+                               in_count, out_count, present_sum, present_max, samples)
+    SELECT ?, (bucket / ?) * ?, camera_id, class_id,
+           SUM(in_count), SUM(out_count), SUM(present_sum), MAX(present_max), SUM(samples)
+    FROM traffic_stats
+    WHERE resolution = ? AND bucket >= ? AND bucket < ?
+    GROUP BY (bucket / ?), camera_id, class_id
+    ON CONFLICT (resolution, bucket, camera_id, class_id) DO UPDATE SET
+        in_count = in_count + excluded.in_count,
+        out_count = out_count + excluded.out_count,
+        present_sum = present_sum + excluded.present_sum,
+        present_max = MAX(present_max, excluded.present_max),
+        samples = samples + excluded.samples
+'''
+
+
+class TrafficStatsStore:
+    """
+    交通流量时序统计 (存在同一个 SQLite 库里)
+    - 每帧的进/出计数、在场数量先在内存里按 1 秒聚合，每秒只写一批行
+    - 后台压缩线程把 1s 桶逐级汇总为 1min / 1h / 1day，并按保留策略清理旧数据
+    - 一行 = (粒度, 桶起始时间, 摄像头, 类别) 的 进/出/在场总和/在场峰值/帧数
+    """
+
+    def __init__(self, pool, writer, retention=None, compact_interval=30, compact_lag=5):
+        self.pool = pool
+        self.writer = writer
+        self.retention = dict(DEFAULT_RETENTION)
+        if retention:
+            self.retention.update(retention)
+        self.compact_interval = compact_interval
+        self.compact_lag = compact_lag  # 给仍在内存里聚合的桶留出的延迟 (秒)
+
+        # {camera_id: [bucket, frames, {class_id: [in, out, present_sum, present_max]}]}
+        self._pending = {}
+        self._unflushed = None  # 已交给写队列、还不确定落盘的最早的桶
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._init_tables()
+
+    def _init_tables(self):
+        with self.pool.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS traffic_stats (
+                    resolution INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    camera_id TEXT NOT NULL,
+                    class_id INTEGER NOT NULL,
+                    in_count INTEGER NOT NULL DEFAULT 0,
+                    out_count INTEGER NOT NULL DEFAULT 0,
+                    present_sum INTEGER NOT NULL DEFAULT 0,
+                    present_max INTEGER NOT NULL DEFAULT 0,
+                    samples INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (resolution, bucket, camera_id, class_id)
+                ) WITHOUT ROWID
+            ''')
+            # 每个汇总粒度已经处理到的时间点，保证每个源桶只被汇总一次
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS traffic_rollup_state (
+                    resolution INTEGER PRIMARY KEY,
+                    watermark INTEGER NOT NULL
+                )
+            ''')
+
+    # --- 写入 ---
+
+    def record(self, camera_id, in_per_class=None, out_per_class=None, present_per_class=None, ts=None):
+        """
+        记录一帧的统计 (每帧调用，只做内存累加)
+        :param in_per_class: {class_id: 本帧进入数}
+        :param out_per_class: {class_id: 本帧离开数}
+        :param present_per_class: {class_id: 本帧在场数}
+        """
+        bucket = int(ts if ts is not None else time.time())
+        in_per_class = in_per_class or {}
+        out_per_class = out_per_class or {}
+        present_per_class = present_per_class or {}
+
+        rows = None
+        with self._lock:
+            state = self._pending.get(camera_id)
+            if state is not None and state[0] != bucket:
+                rows = self._drain(camera_id, state)
+                self._mark_unflushed(state[0])
+                state = None
+            if state is None:
+                state = [bucket, 0, {}]
+                self._pending[camera_id] = state
+
+            state[1] += 1
+            counters = state[2]
+            total = counters.setdefault(ALL_CLASSES, [0, 0, 0, 0])
+            present_total = 0
+            for class_id in set(in_per_class) | set(out_per_class) | set(present_per_class):
+                c = counters.setdefault(int(class_id), [0, 0, 0, 0])
+                n_in = int(in_per_class.get(class_id, 0))
+                n_out = int(out_per_class.get(class_id, 0))
+                n_present = int(present_per_class.get(class_id, 0))
+                c[0] += n_in
+                c[1] += n_out
+                c[2] += n_present
+                c[3] = max(c[3], n_present)
+                total[0] += n_in
+                total[1] += n_out
+                present_total += n_present
+            total[2] += present_total
+            total[3] = max(total[3], present_total)
+
+        if rows:
+            self.writer.put_rows(UPSERT_SQL, rows)
+
+    def _mark_unflushed(self, bucket):
+        if self._unflushed is None or bucket < self._unflushed:
+            self._unflushed = bucket
+
+    @staticmethod
+    def _drain(camera_id, state):
+        bucket, frames, counters = state
+        return [(1, bucket, camera_id, class_id, c[0], c[1], c[2], c[3], frames)
+                for class_id, c in counters.items()]
+
+    def flush(self):
+        """把内存中尚未结束的桶也写出去 (退出时调用)"""
+        with self._lock:
+            rows = []
+            for camera_id, state in self._pending.items():
+                rows.extend(self._drain(camera_id, state))
+                self._mark_unflushed(state[0])
+            self._pending.clear()
+        if rows:
+            self.writer.put_rows(UPSERT_SQL, rows)
+
+    # --- 后台压缩 ---
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.compact_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"❌ 流量统计压缩失败: {e}")
+
+    def compact(self, now=None):
+        """逐级汇总 + 按保留策略清理，可手动调用"""
+        now = int(now if now is not None else time.time()) - self.compact_lag
+        limit = self._settle(now)
+
+        with self.pool.writer() as conn:
+            watermarks = dict(conn.execute("SELECT resolution, watermark FROM traffic_rollup_state").fetchall())
+
+            for src, dst in zip(RESOLUTIONS, RESOLUTIONS[1:]):
+                # 还在内存里 / 写队列里的秒级桶之后的数据先不汇总
+                cutoff = (min(now, limit) // dst) * dst
+                start = watermarks.get(dst, 0)
+                if cutoff <= start:
+                    continue
+                conn.execute(ROLLUP_SQL, (dst, dst, dst, src, start, cutoff, dst))
+                conn.execute(
+                    "INSERT OR REPLACE INTO traffic_rollup_state (resolution, watermark) VALUES (?, ?)",
+                    (dst, cutoff)
+                )
+                watermarks[dst] = cutoff
+
+            for i, res in enumerate(RESOLUTIONS):
+                keep = self.retention.get(res)
+                if keep is None:
+                    continue
+                expire_before = now - keep
+                # 还没汇总到上一级的数据不能删
+                if i + 1 < len(RESOLUTIONS):
+                    expire_before = min(expire_before, watermarks.get(RESOLUTIONS[i + 1], 0))
+                conn.execute(
+                    "DELETE FROM traffic_stats WHERE resolution = ? AND bucket < ?", (res, expire_before)
+                )
+
+    def _settle(self, now):
+        """
+        汇总前把早于 now 的秒级桶落盘 (摄像头停止上报后，它最后一个桶只会留在内存里)
+        :return: 本次汇总最多能处理到的时间点 (仍未落盘的最早的桶)
+        """
+        rows = []
+        with self._lock:
+            for camera_id in [k for k, state in self._pending.items() if state[0] < now]:
+                state = self._pending.pop(camera_id)
+                rows.extend(self._drain(camera_id, state))
+                self._mark_unflushed(state[0])
+            unflushed, self._unflushed = self._unflushed, None
+        if rows:
+            self.writer.put_rows(UPSERT_SQL, rows)
+        if unflushed is not None and not self.writer.flush():
+            with self._lock:
+                self._mark_unflushed(unflushed)  # 写队列没清空，下次再汇总这些桶
+        with self._lock:
+            buckets = [state[0] for state in self._pending.values()]
+            if self._unflushed is not None:
+                buckets.append(self._unflushed)
+        return min(buckets, default=now)
+
+    # --- 查询 ---
+
+    def pick_resolution(self, start_ts, now=None):
+        """选择仍然覆盖 start_ts 的最细粒度"""
+        now = now if now is not None else time.time()
+        for res in RESOLUTIONS:
+            keep = self.retention.get(res)
+            if keep is None or start_ts >= now - keep:
+                return res
+        return RESOLUTIONS[-1]
+
+    def query_flow(self, camera_id, start_ts, end_ts, resolution=None, class_id=ALL_CLASSES):
+        """
+        查询历史流量
+        :return: [{'bucket', 'in_count', 'out_count', 'avg_present', 'max_present'}, ...]
+                 avg_present = 该类在场总和 / 摄像头总帧数 (以 ALL_CLASSES 行的 samples 为准)
+        """
+        if resolution is None:
+            resolution = self.pick_resolution(start_ts)
+
+        rows = self.pool.reader().execute('''
+            SELECT s.bucket, s.in_count, s.out_count, s.present_sum, s.present_max, t.samples
+            FROM traffic_stats s
+            JOIN traffic_stats t
+              ON t.resolution = s.resolution AND t.bucket = s.bucket
+             AND t.camera_id = s.camera_id AND t.class_id = ?
+            WHERE s.resolution = ? AND s.bucket >= ? AND s.bucket < ?
+              AND s.camera_id = ? AND s.class_id = ?
+            ORDER BY s.bucket
+        ''', (ALL_CLASSES, resolution, int(start_ts), int(end_ts), camera_id, class_id)).fetchall()
+
+        return [{
+            'bucket': row['bucket'],
+            'in_count': row['in_count'],
+            'out_count': row['out_count'],
+            'avg_present': row['present_sum'] / row['samples'] if row['samples'] else 0.0,
+            'max_present': row['present_max'],
+        } for row in rows]
@@ -0,0 +1,188 @@
+import threading
+import time
+
+import numpy as np
+
+INSERT_SQL = '''
+    INSERT INTO trajectories (camera_id, epoch, track_id, class_id, t_start, t_end, n_points, x0, y0, deltas)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+class TrajectoryStore:
+    """
+    目标轨迹存储 (与报警事件同一个 SQLite 库)
+    - 每帧的 (ID, 类别, 坐标) 以整帧数组的形式追加到内存缓冲，不按目标拆分
+    - 每 segment_seconds 秒把缓冲按 (摄像头, ID, 时间) 排序后切成轨迹段，一段一行：
+      起点 (t_start, x0, y0) + 后续点相对前一点的增量 [dt 毫秒, dx, dy]，int16 数组存成 BLOB
+      (相邻帧的增量很小，每个点只占 6 字节)
+    - 增量超出 int16 范围 (ID 跳变 / 长时间丢失) 时从该点断开，另起一段
+    - 追踪器重建后 ID 从 1 重新编号，每段带上追踪器代数 epoch (SmartDetector.track_epoch)，
+      同一目标 = (摄像头, epoch, track_id)
+    """
+
+    def __init__(self, pool, writer, segment_seconds=10.0):
+        self.pool = pool
+        self.writer = writer
+        self.segment_seconds = segment_seconds
+
+        # {camera_id: [段开始时间, [ts数组], [id数组], [类别数组], [坐标数组], epoch]}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._init_tables()
+
+    def _init_tables(self):
+        with self.pool.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS trajectories (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    camera_id TEXT NOT NULL,
+                    epoch INTEGER NOT NULL DEFAULT 0,
+                    track_id INTEGER NOT NULL,
+                    class_id INTEGER,
+                    t_start REAL NOT NULL,
+                    t_end REAL NOT NULL,
+                    n_points INTEGER NOT NULL,
+                    x0 INTEGER NOT NULL,
+                    y0 INTEGER NOT NULL,
+                    deltas BLOB
+                )
+            ''')
+            # 旧库没有 epoch 列，补上 (旧数据的 epoch 为 0)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(trajectories)")}
+            if 'epoch' not in columns:
+                conn.execute("ALTER TABLE trajectories ADD COLUMN epoch INTEGER NOT NULL DEFAULT 0")
+            conn.execute("DROP INDEX IF EXISTS idx_traj_track")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_traj_time ON trajectories (camera_id, t_start)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_traj_epoch_track "
+                         "ON trajectories (camera_id, epoch, track_id, t_start)")
+
+    # --- 写入 ---
+
+    def record(self, camera_id, tracker_ids, class_ids, points, ts=None, epoch=0):
+        """
+        记录一帧 (每帧调用，只做内存追加)
+        :param tracker_ids: (N,) 追踪ID
+        :param epoch: 追踪器代数 (变化时先把上一代的缓冲写出去)
+        :param class_ids: (N,) 类别
+        :param points: (N, 2) 目标锚点像素坐标 (一般取框底边中点)
+        """
+        if tracker_ids is None or len(tracker_ids) == 0:
+            return
+        ts = ts if ts is not None else time.time()
+        n = len(tracker_ids)
+
+        rows = None
+        with self._lock:
+            state = self._pending.get(camera_id)
+            if state is not None and (ts - state[0] >= self.segment_seconds or state[5] != epoch):
+                rows = self._encode(camera_id, state)
+                state = None
+            if state is None:
+                state = [ts, [], [], [], [], epoch]
+                self._pending[camera_id] = state
+            state[1].append(np.full(n, ts, dtype=np.float64))
+            state[2].append(np.asarray(tracker_ids, dtype=np.int64))
+            state[3].append(np.asarray(class_ids, dtype=np.int64))
+            state[4].append(np.rint(points).astype(np.int32))
+
+        if rows:
+            self.writer.put_rows(INSERT_SQL, rows)
+
+    def flush(self):
+        """把缓冲里的轨迹全部写出 (退出时调用)"""
+        with self._lock:
+            rows = []
+            for camera_id, state in self._pending.items():
+                rows.extend(self._encode(camera_id, state))
+            self._pending.clear()
+        if rows:
+            self.writer.put_rows(INSERT_SQL, rows)
+
+    @staticmethod
+    def _encode(camera_id, state):
+        epoch = state[5]
+        ts = np.concatenate(state[1])
+        ids = np.concatenate(state[2])
+        cls = np.concatenate(state[3])
+        xy = np.concatenate(state[4])
+
+        order = np.lexsort((ts, ids))
+        ts, ids, cls, xy = ts[order], ids[order], cls[order], xy[order]
+        t_ms = np.rint(ts * 1000).astype(np.int64)
+
+        # 段边界：换了 ID，或与前一点的增量放不进 int16
+        d_t = np.diff(t_ms)
+        d_xy = np.diff(xy, axis=0)
+        overflow = (d_t > _INT16_MAX) | np.any(np.abs(d_xy) > _INT16_MAX, axis=1)
+        breaks = np.flatnonzero((ids[1:] != ids[:-1]) | overflow) + 1
+        starts = np.concatenate([[0], breaks])
+        ends = np.concatenate([breaks, [len(ids)]])
+
+        deltas = np.empty((len(ids), 3), dtype=np.int16)
+        deltas[1:, 0] = np.clip(d_t, 0, _INT16_MAX)
+        deltas[1:, 1:] = np.clip(d_xy, -_INT16_MAX, _INT16_MAX)
+
+        rows = []
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            seg_cls = cls[s:e]
+            class_id = int(np.bincount(seg_cls[seg_cls >= 0]).argmax()) if np.any(seg_cls >= 0) else None
+            rows.append((camera_id, epoch, int(ids[s]), class_id, float(ts[s]), float(ts[e - 1]), e - s,
+                         int(xy[s, 0]), int(xy[s, 1]), deltas[s + 1:e].tobytes()))
+        return rows
+
+    # --- 查询 ---
+
+    @staticmethod
+    def _decode(row):
+        n = row['n_points']
+        deltas = np.frombuffer(row['deltas'], dtype=np.int16).reshape(n - 1, 3).astype(np.int64)
+        t = np.empty(n, dtype=np.float64)
+        xy = np.empty((n, 2), dtype=np.int64)
+        t[0], xy[0] = 0.0, (row['x0'], row['y0'])
+        t[1:] = np.cumsum(deltas[:, 0]) / 1000.0
+        xy[1:] = np.cumsum(deltas[:, 1:], axis=0) + xy[0]
+        return t + row['t_start'], xy
+
+    def query(self, camera_id, start_ts, end_ts, track_id=None, class_id=None, epoch=None):
+        """
+        查询与 [start_ts, end_ts] 有交集的轨迹，同一目标 (epoch, track_id) 的多段会拼接起来
+        :param epoch: 只查某一代追踪器的轨迹 (按 track_id 查时一般要一起给)
+        :return: [{'epoch', 'track_id', 'class_id', 't': (K,) Unix 秒, 'xy': (K, 2)}, ...]
+        """
+        # 段最长 segment_seconds，用 t_start 的下界把扫描限制在索引范围内
+        sql = '''
+            SELECT epoch, track_id, class_id, t_start, t_end, n_points, x0, y0, deltas
+            FROM trajectories
+            WHERE camera_id = ? AND t_start >= ? AND t_start <= ? AND t_end >= ?
+        '''
+        params = [camera_id, start_ts - self.segment_seconds, end_ts, start_ts]
+        if epoch is not None:
+            sql += " AND epoch = ?"
+            params.append(epoch)
+        if track_id is not None:
+            sql += " AND track_id = ?"
+            params.append(track_id)
+        if class_id is not None:
+            sql += " AND class_id = ?"
+            params.append(class_id)
+        sql += " ORDER BY epoch, track_id, t_start"
+
+        tracks = {}
+        for row in self.pool.reader().execute(sql, params):
+            t, xy = self._decode(row)
+            keep = (t >= start_ts) & (t <= end_ts)
+            if not np.any(keep):
+                continue
+            key = (row['epoch'], row['track_id'])
+            item = tracks.setdefault(key, {'epoch': row['epoch'], 'track_id': row['track_id'],
+                                           'class_id': row['class_id'], 't': [], 'xy': []})
+            item['t'].append(t[keep])
+            item['xy'].append(xy[keep])
+
+        for item in tracks.values():
+            item['t'] = np.concatenate(item['t'])
+            item['xy'] = np.concatenate(item['xy'])
+        return list(tracks.values())
@@ -0,0 +1,267 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class WriteBehindQueue:
+    """
+    异步写回队列 (Write-Behind)
+    功能：报警事件与截图先入队，由后台线程统一落盘
+    - 复用连接池的写连接 (WAL 模式)，事件按批次在一个事务里提交
+    - 截图 (cv2.imwrite) 也在后台线程完成，不阻塞采集线程和 GUI 线程
+    - 支持退出前 flush，并提供队列深度等运行指标
+    """
+
+    def __init__(self, pool, batch_size=64, flush_interval=0.5, max_queue=10000):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._stopping = threading.Event()  # 队列满、停止信号放不进去时由它通知写线程退出
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # 运行指标
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'events_written': 0,
+            'rows_written': 0,
+            'snapshots_written': 0,
+            'dropped': 0,
+            'lost': 0,          # 重试后仍写入失败的事件 / 行数
+            'errors': 0,
+            'batches': 0,
+            'max_depth': 0,
+            'last_batch_ms': 0.0,
+        }
+
+    # --- 生产者接口 ---
+
+    def put_event(self, event, on_done=None):
+        """
+        事件入队
+        :param event: database.models.Event
+        :param on_done: 可选回调 on_done(new_id)，在写线程提交后调用
+        """
+        return self._put(('event', event, on_done), block=True)
+
+    def put_rows(self, sql, rows):
+        """批量执行 executemany(sql, rows)：同一批取出的所有 rows 任务在一个事务中提交 (和事件分开提交)"""
+        return self._put(('rows', sql, rows), block=True)
+
+    def put_snapshot(self, path, frame):
+        """截图入队 (队列满时直接丢弃，截图不值得阻塞画面)"""
+        return self._put(('snapshot', path, frame), block=False)
+
+    def _put(self, item, block):
+        if self._closed:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put(item, block=block, timeout=1.0 if block else None)
+        except queue.Full:
+            self._bump('dropped')
+            print(f"⚠️ 写队列已满，丢弃一条 {item[0]}")
+            return False
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            if depth > self._stats['max_depth']:
+                self._stats['max_depth'] = depth
+        return True
+
+    def flush(self, timeout=5.0):
+        """阻塞等待此前入队的所有数据落盘，返回是否在超时前完成"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(('flush', done, None), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """退出时调用：先 flush 再停止写线程"""
+        if self._closed:
+            return
+        ok = self.flush(timeout)
+        self._closed = True
+        if self._thread is not None:
+            try:
+                self._queue.put(('stop', None, None), timeout=timeout)
+            except queue.Full:
+                self._stopping.set()
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                self._stopping.set()
+                print(f"⚠️ 写线程未能在 {timeout} 秒内退出，队列中还有 {self._queue.qsize()} 条未写入")
+        if not ok:
+            print("⚠️ 写队列未能在超时前清空，部分数据可能丢失")
+
+    def metrics(self):
+        """队列指标快照 (queue_depth 为当前积压条数)"""
+        with self._stats_lock:
+            data = dict(self._stats)
+        data['queue_depth'] = self._queue.qsize()
+        return data
+
+    # --- 写线程 ---
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if not self._write_batch(batch) or self._stopping.is_set():
+                return
+
+    def _write_batch(self, batch):
+        """处理一批数据，返回 False 表示收到停止信号"""
+        t0 = time.time()
+        events, row_jobs, waiters, keep_running = [], [], [], True
+
+        for kind, payload, extra in batch:
+            if kind == 'event':
+                events.append((payload, extra))
+            elif kind == 'rows':
+                row_jobs.append((payload, extra))
+            elif kind == 'snapshot':
+                self._write_snapshot(payload, extra)
+            elif kind == 'flush':
+                waiters.append(payload)
+            elif kind == 'stop':
+                keep_running = False
+
+        if events:
+            self._write_events(events)
+        if row_jobs:
+            self._write_rows(row_jobs)
+
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['last_batch_ms'] = (time.time() - t0) * 1000
+
+        # 写完这一批之后再唤醒 flush 的调用方
+        for done in waiters:
+            done.set()
+        return keep_running
+
+    @staticmethod
+    def _insert_event(conn, event):
+        if not event.timestamp:
+            event.timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor = conn.execute('''
+            INSERT INTO events (event_type, camera_id, timestamp, description, snapshot_path, video_path)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (event.event_type, event.camera_id, event.timestamp, event.description,
+              event.snapshot_path, event.video_path))
+        event.id = cursor.lastrowid
+
+    def _write_events(self, events):
+        try:
+            with self.pool.writer() as conn:
+                for event, _ in events:
+                    self._insert_event(conn, event)
+            written = events
+        except Exception as e:
+            self._bump('errors')
+            print(f"❌ 批量写入事件失败 ({len(events)} 条)，逐条重试: {e}")
+            written = self._retry_events(events)
+        self._bump('events_written', len(written))
+        callbacks = [(on_done, event.id) for event, on_done in written if on_done]
+
+        for on_done, new_id in callbacks:
+            try:
+                on_done(new_id)
+            except Exception as e:
+                print(f"❌ 事件写入回调出错: {e}")
+
+    def _retry_events(self, events):
+        """整批失败后每条事件单独一个事务重试一次 (一条坏数据不连累整批)，返回写入成功的部分"""
+        written = []
+        for event, on_done in events:
+            event.id = None
+            try:
+                with self.pool.writer() as conn:
+                    self._insert_event(conn, event)
+                written.append((event, on_done))
+            except Exception as e:
+                print(f"❌ 事件写入失败 ({event.event_type} {event.camera_id}): {e}")
+        lost = len(events) - len(written)
+        if lost:
+            total = self._bump('lost', lost)
+            print(f"⚠️ 本批丢失 {lost} 条事件 (累计 {total} 条)")
+        return written
+
+    def _write_rows(self, row_jobs):
+        try:
+            with self.pool.writer() as conn:
+                for sql, rows in row_jobs:
+                    conn.executemany(sql, rows)
+            self._bump('rows_written', sum(len(rows) for _, rows in row_jobs))
+        except Exception as e:
+            self._bump('errors')
+            print(f"❌ 批量写入统计数据失败，逐行重试: {e}")
+            self._retry_rows(row_jobs)
+
+    def _retry_rows(self, row_jobs):
+        """逐行重试 (每行单独执行，整体一个事务)，记录丢失的行数"""
+        written = lost = 0
+        try:
+            with self.pool.writer() as conn:
+                for sql, rows in row_jobs:
+                    for row in rows:
+                        try:
+                            conn.execute(sql, row)
+                            written += 1
+                        except Exception as e:
+                            lost += 1
+                            if lost == 1:
+                                print(f"❌ 统计数据写入失败: {e}")
+        except Exception as e:
+            # 连事务都提交不了 (例如磁盘满)，这一批全部丢失
+            print(f"❌ 统计数据重试提交失败: {e}")
+            written, lost = 0, sum(len(rows) for _, rows in row_jobs)
+        self._bump('rows_written', written)
+        if lost:
+            total = self._bump('lost', lost)
+            print(f"⚠️ 本批丢失 {lost} 行统计数据 (累计 {total} 条)")
+
+    def _write_snapshot(self, path, frame):
+        try:
+            import cv2
+            if cv2.imwrite(path, frame):
+                self._bump('snapshots_written')
+            else:
+                self._bump('errors')
+                print(f"❌ 截图保存失败: {path}")
+        except Exception as e:
+            self._bump('errors')
+            print(f"❌ 截图保存失败: {e}")
+
+    def _bump(self, key, n=1):
+        """计数加 n，返回加完之后的值"""
+        with self._stats_lock:
+            self._stats[key] += n
+            return self._stats[key]
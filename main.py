@@ -4,6 +4,8 @@ import traceback  # 用于打印报错信息
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from PyQt5.QtCore import Qt  # 修复高分屏缩放属性的引用
 
+from configs.system_config import sys_config
+
 # --- 引入界面 ---
 from ui.login_window import LoginWindow
 from ui.main_window import MainWindow
@@ -61,6 +63,12 @@ def main():
         print("正在初始化数据库...")
         db = DBManager()
         print("✅ 数据库连接正常")
+        # 退出前把写队列里未落盘的事件/截图刷进去
+        app.aboutToQuit.connect(db.close)
+
+        # 监视 config.json，手工改文件也能热加载到运行中的监控页面
+        sys_config.start_watching()
+        app.aboutToQuit.connect(sys_config.stop_watching)
 
         # 3. 启动登录窗口
         login_ui = LoginWindow()
@@ -0,0 +1,56 @@
+# tests/test_alerts.py
+from core.alerts import Alert, AlertEngine
+
+
+def speeding(track_id, epoch=0, camera_id="CAM_01"):
+    return Alert("speeding", camera_id, track_id=track_id, value=80, epoch=epoch)
+
+
+def test_cooldown_suppresses_same_target():
+    engine = AlertEngine(cooldown={"speeding": 30.0}, rate=100, burst=100)
+    passed, _, _ = engine.submit([speeding(1)], now=0.0, aggregate=False)
+    assert len(passed) == 1
+    assert engine.submit([speeding(1)], now=10.0, aggregate=False)[0] == []
+    assert engine.submit([speeding(2)], now=10.0, aggregate=False)[0] != []
+    assert engine.submit([speeding(1)], now=31.0, aggregate=False)[0] != []
+    assert engine.metrics()['deduplicated'] == 1
+
+
+def test_new_tracker_epoch_is_a_new_target():
+    engine = AlertEngine(rate=100, burst=100)
+    engine.submit([speeding(1, epoch=100)], now=0.0, aggregate=False)
+    # 追踪器重建后 ID 从 1 重新编号，是另一辆车
+    assert len(engine.submit([speeding(1, epoch=200)], now=1.0, aggregate=False)[0]) == 1
+
+
+def test_token_bucket_limits_bursts_per_camera():
+    engine = AlertEngine(rate=1.0, burst=2)
+    passed, _, _ = engine.submit([speeding(i) for i in range(5)], now=0.0, aggregate=False)
+    assert len(passed) == 2
+    assert engine.metrics()['rate_limited'] == 3
+    # 另一路摄像头有自己的令牌桶
+    assert len(engine.submit([speeding(9, camera_id="CAM_02")], now=0.0, aggregate=False)[0]) == 1
+    # 1 秒后补回 1 个令牌
+    assert len(engine.submit([speeding(10), speeding(11)], now=1.0, aggregate=False)[0]) == 1
+
+
+def test_alerts_merge_into_open_incident_until_closed():
+    engine = AlertEngine(rate=100, burst=100)
+    _, incident, is_new = engine.submit([speeding(1)], now=0.0)
+    assert is_new
+    _, merged, is_new = engine.submit([speeding(2), Alert("congestion", "CAM_01", zone="全画面", value=30)],
+                                      now=50.0)
+    assert merged is incident and not is_new
+    assert incident.total == 3 and incident.counts == {"speeding": 2, "congestion": 1}
+
+    engine.close_incident(incident)
+    _, fresh, is_new = engine.submit([speeding(3)], now=51.0)
+    assert is_new and fresh is not incident
+
+
+def test_incident_keeps_first_details_and_counts_the_rest():
+    engine = AlertEngine(rate=100, burst=100)
+    _, incident, _ = engine.submit([speeding(i) for i in range(25)], now=0.0)
+    assert len(incident.alerts) == incident.max_alerts
+    assert incident.total == 25
+    assert "共 25 条" in incident.describe()
@@ -0,0 +1,41 @@
+# tests/test_batch_job.py
+import pytest
+
+from core.batch_job import CheckpointMismatch, append_checkpoint, open_checkpoint
+
+PARAMS = {'model': '/models/a.pt', 'speed_limit': 60}
+
+
+def result(key, frames=10):
+    return {'key': key, 'video': 'a.mp4', 'index': 0, 'frames': frames}
+
+
+def test_resume_reads_appended_chunks(tmp_path):
+    path = str(tmp_path / "ckpt.jsonl")
+    assert open_checkpoint(path, PARAMS) == {}
+    append_checkpoint(path, result("a#0-10"))
+    append_checkpoint(path, result("a#10-20", frames=7))
+    done = open_checkpoint(path, PARAMS)
+    assert set(done) == {"a#0-10", "a#10-20"}
+    assert done["a#10-20"]['frames'] == 7
+
+
+def test_changed_params_refuse_to_resume(tmp_path):
+    path = str(tmp_path / "ckpt.jsonl")
+    open_checkpoint(path, PARAMS)
+    append_checkpoint(path, result("a#0-10"))
+    with pytest.raises(CheckpointMismatch):
+        open_checkpoint(path, dict(PARAMS, speed_limit=80))
+    with pytest.raises(CheckpointMismatch):
+        open_checkpoint(path, dict(PARAMS, model='/models/b.pt'))
+
+
+def test_truncated_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "ckpt.jsonl")
+    open_checkpoint(path, PARAMS)
+    append_checkpoint(path, result("a#0-10"))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "a#10-')   # 写到一半被杀掉
+    assert set(open_checkpoint(path, PARAMS)) == {"a#0-10"}
+    append_checkpoint(path, result("a#10-20"))
+    assert set(open_checkpoint(path, PARAMS)) == {"a#0-10", "a#10-20"}
@@ -0,0 +1,83 @@
+# tests/test_camera_profiles.py
+import json
+
+import pytest
+
+from configs.camera_profiles import CameraProfileStore
+from configs.system_config import ConfigError, SystemConfig
+
+
+def make_store(tmp_path, profiles, settings=None):
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(settings or {}), encoding="utf-8")
+    profiles_path = tmp_path / "cameras.json"
+    profiles_path.write_text(json.dumps(profiles), encoding="utf-8")
+    config = SystemConfig(path=str(config_path))
+    return CameraProfileStore(path=str(profiles_path), config=config), config
+
+
+def test_inheritance_order(tmp_path):
+    store, _ = make_store(tmp_path, {
+        "default": {"speed_limit": 50, "sahi_every": 5},
+        "cameras": {
+            "CAM_01": {"speed_limit": 40, "tracker": "iou"},
+            "CAM_02": {"inherits": "CAM_01", "tracker": "ocsort"},
+        },
+    }, settings={"speed_limit": 70, "alarm_threshold": 33, "rtsp_url": "global.mp4"})
+
+    cam1, cam2 = store.get("CAM_01"), store.get("CAM_02")
+    # 全局 -> default -> inherits -> 本摄像头，后面的覆盖前面的
+    assert cam1.alarm_threshold == cam2.alarm_threshold == 33
+    assert cam1.source == "global.mp4"
+    assert (cam1.speed_limit, cam1.tracker, cam1.sahi_every) == (40, "iou", 5)
+    assert (cam2.speed_limit, cam2.tracker) == (40, "ocsort")
+    assert store.get("CAM_09").speed_limit == 50
+
+
+def test_global_change_propagates_to_profiles(tmp_path):
+    store, config = make_store(tmp_path, {"cameras": {"CAM_01": {"speed_limit": 40}}})
+    changes = []
+    store.subscribe(changes.append)
+    config.update({"alarm_threshold": 55, "speed_limit": 90})
+    assert store.get("CAM_01").alarm_threshold == 55
+    assert store.get("CAM_01").speed_limit == 40      # 本摄像头的覆盖项优先
+    assert changes and "CAM_01" in changes[-1]
+
+
+def test_inheritance_cycle_falls_back_to_default(tmp_path):
+    store, _ = make_store(tmp_path, {
+        "default": {"speed_limit": 45},
+        "cameras": {
+            "CAM_01": {"inherits": "CAM_02", "speed_limit": 10},
+            "CAM_02": {"inherits": "CAM_01", "speed_limit": 20},
+            "CAM_03": {"inherits": "CAM_404"},
+        },
+    })
+    assert store.get("CAM_01").speed_limit == 45
+    assert store.get("CAM_02").speed_limit == 45
+    assert store.get("CAM_03").speed_limit == 45
+    assert store.get("CAM_01").camera_id == "CAM_01"
+
+
+def test_legacy_global_zones_are_used_when_profile_has_none(tmp_path):
+    legacy = {"lines": [{"name": "old", "start": [0, 0.5], "end": [1, 0.5]}]}
+    own = {"lines": [{"name": "new", "start": [0, 0.3], "end": [1, 0.3]}]}
+    store, _ = make_store(tmp_path, {
+        "cameras": {"CAM_01": {}, "CAM_02": {"zones": own}},
+    }, settings={"zones": {"CAM_01": legacy, "CAM_02": legacy, "CAM_05": legacy}})
+    assert store.get("CAM_01").zones == legacy
+    assert store.get("CAM_02").zones == own
+    assert store.get("CAM_05").zones == legacy        # 没有 profile 的摄像头也能读到旧配置
+
+
+def test_invalid_overrides_keep_inherited_values(tmp_path):
+    store, _ = make_store(tmp_path, {
+        "default": {"sahi_every": 0, "imgsz_min": 960},
+        "cameras": {"CAM_01": {"speed_limit": "fast", "imgsz_min": 1024, "imgsz_max": 640}},
+    })
+    cam = store.get("CAM_01")
+    assert cam.sahi_every == 10                       # 超出 CameraProfile 自己的范围
+    assert cam.speed_limit == 60
+    assert (cam.imgsz_min, cam.imgsz_max) == (960, 1280)
+    with pytest.raises(ConfigError):
+        store.set_camera("CAM_01", imgsz_max=800)      # 继承的 imgsz_min 是 960
@@ -0,0 +1,45 @@
+# tests/test_congestion.py
+from core.congestion import CongestionDetector
+
+
+def feed(detector, count, start, end):
+    """按 1 秒一帧喂 [start, end) 秒，返回期间的事件"""
+    events = []
+    for ts in range(start, end):
+        events += [dict(ev, ts=ts) for ev in detector.update([count], float(ts))]
+    return events
+
+
+def test_starts_only_after_min_duration():
+    detector = CongestionDetector(["all"], [10], window=1, min_duration=3.0)
+    assert feed(detector, 12, 0, 3) == []          # 0, 1, 2 秒：还差一点
+    events = feed(detector, 12, 3, 4)
+    assert [(e['state'], e['ts']) for e in events] == [('start', 3)]
+    assert detector.summary()['all']['congested']
+
+
+def test_short_spike_does_not_trigger():
+    detector = CongestionDetector(["all"], [10], window=1, min_duration=3.0)
+    feed(detector, 12, 0, 2)
+    feed(detector, 5, 2, 3)                         # 中途回落，计时重来
+    assert feed(detector, 12, 3, 5) == []
+    assert not detector.congested[0]
+
+
+def test_hysteresis_holds_until_below_release_level():
+    detector = CongestionDetector(["all"], [10], window=1, release_ratio=0.8, min_duration=2.0)
+    assert [e['ts'] for e in feed(detector, 12, 0, 3)] == [2]
+    # 9 辆低于进入阈值但不低于解除阈值 (8)，保持拥堵
+    assert feed(detector, 9, 3, 20) == []
+    events = feed(detector, 5, 20, 23)
+    assert [(e['state'], e['ts']) for e in events] == [('end', 22)]
+    assert events[0]['duration'] == 22 - 2
+
+
+def test_window_average_smooths_counts():
+    detector = CongestionDetector(["all", "zone"], [10, None], window=4, min_duration=0.0)
+    for ts, count in enumerate([20, 0, 0, 0]):
+        events = detector.update([count, 50], float(ts))
+    assert detector.level.tolist() == [5.0, 50.0]
+    assert not detector.congested.any()             # 阈值 None 的通道只统计密度
+    assert events == []
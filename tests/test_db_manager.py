@@ -0,0 +1,28 @@
+# tests/test_db_manager.py
+import pytest
+
+from database.db_manager import DBManager
+from database.models import Event
+
+
+@pytest.fixture
+def db(tmp_path):
+    DBManager._instance = None
+    db = DBManager(str(tmp_path / "test.db"))
+    yield db
+    db.writer.close()
+    DBManager._instance = None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("100%", ["限速 100% 超出"]),
+    ("a_b", ["区域 a_b 拥堵"]),
+    ("\\", ["路径 C:\\cam"]),
+    ("%", ["限速 100% 超出"]),
+])
+def test_query_events_text_is_literal(db, text, expected):
+    for description in ["限速 100% 超出", "限速 1000 超出", "区域 a_b 拥堵", "区域 axb 拥堵", "路径 C:\\cam"]:
+        db.writer.put_event(Event(event_type="Alert", camera_id="CAM_01", description=description))
+    assert db.writer.flush()
+    events, _ = db.query_events(text=text)
+    assert [e.description for e in events] == expected
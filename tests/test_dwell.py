@@ -0,0 +1,51 @@
+# tests/test_dwell.py
+import numpy as np
+
+from core.dwell import DwellTracker
+
+EMPTY = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+         np.zeros((1, 0), dtype=bool))
+
+
+def seen(tracker, ts, inside=True, slot=0, tid=7, cls=1, fresh=False, released=None):
+    return tracker.update(np.array([slot]), np.array([tid]), np.array([cls]), np.array([[inside]]), ts,
+                          fresh=np.array([fresh]), released=released)
+
+
+def test_visit_closes_when_slot_is_released():
+    tracker = DwellTracker(["dock"], num_classes=3, lost_timeout=100.0)
+    seen(tracker, 0.0, fresh=True)
+    assert tracker.last_entries == [("dock", 7, 1)]
+    seen(tracker, 2.0)
+    assert tracker.update(*EMPTY, 3.0) == []                  # 遮挡中，还没超时
+    visits = tracker.update(*EMPTY, 4.0, released=np.array([0]))
+    # 按最后出现时间结束
+    assert visits == [("dock", 7, 1, 0.0, 2.0, 2.0)]
+    assert tracker.hist[0, 1].sum() == 1
+    assert tracker.summary(4.0)["dock"]["inside"] == 0
+
+
+def test_visit_closes_when_target_leaves_zone():
+    tracker = DwellTracker(["dock"], num_classes=3)
+    seen(tracker, 1.0, fresh=True)
+    visits = seen(tracker, 7.0, inside=False)
+    assert visits == [("dock", 7, 1, 1.0, 7.0, 6.0)]
+    # 6 秒落在 [5, 10) 这一档
+    assert tracker.hist[0, 1, 1] == 1
+
+
+def test_reassigned_slot_closes_previous_owner():
+    tracker = DwellTracker(["dock"], num_classes=3)
+    seen(tracker, 0.0, fresh=True)
+    seen(tracker, 1.0)
+    visits = seen(tracker, 1.5, tid=9, fresh=True)
+    assert visits == [("dock", 7, 1, 0.0, 1.0, 1.0)]
+    assert tracker.last_entries == [("dock", 9, 1)]
+
+
+def test_lost_timeout_closes_visit_without_release():
+    tracker = DwellTracker(["dock"], num_classes=3, lost_timeout=2.0)
+    seen(tracker, 0.0, fresh=True)
+    assert tracker.update(*EMPTY, 1.0) == []
+    assert tracker.update(*EMPTY, 3.0) == [("dock", 7, 1, 0.0, 0.0, 0.0)]
+    assert tracker.flush() == []
@@ -0,0 +1,35 @@
+# tests/test_od_matrix.py
+import pytest
+
+from core.od_matrix import ODTracker
+from database.connection_pool import ConnectionPool
+from database.od_store import ODStore
+from database.write_queue import WriteBehindQueue
+
+
+def test_new_epoch_ends_trips_of_previous_tracker():
+    od = ODTracker(gap_timeout=30)
+    assert od.update([("A", 1, 2, 1)], ts=100, epoch=1) == []
+    # 追踪器重建，ID 1 是另一辆车；上一代的出行 A->A 立即结束，不会被接成 A->B
+    assert od.update([("B", 1, 2, 1)], ts=105, epoch=2) == [("A", "A", 2, 100)]
+    assert od.update([("C", 1, 2, 1)], ts=110, epoch=2) == []
+    assert od.flush() == [("B", "C", 2, 105)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "test.db"))
+    writer = WriteBehindQueue(pool, flush_interval=0.05)
+    yield ODStore(pool, writer)
+    writer.close()
+
+
+def test_recompute_splits_trips_by_epoch(store):
+    store.record_crossings("CAM_01", [("A", 1, 2, 1)], ts=3600 + 10, epoch=1)
+    store.record_crossings("CAM_01", [("B", 1, 2, 1)], ts=3600 + 15, epoch=2)
+    store.record_crossings("CAM_01", [("C", 1, 2, 1)], ts=3600 + 20, epoch=2)
+    assert store.writer.flush()
+    store.recompute("CAM_01", 3600, 7200)
+    with store.pool.reader() as conn:
+        rows = conn.execute("SELECT origin, destination, trips FROM od_matrix ORDER BY origin").fetchall()
+    assert [tuple(r) for r in rows] == [("A", "A", 1), ("B", "C", 1)]
@@ -0,0 +1,39 @@
+# tests/test_precision.py
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import supervision as sv
+
+torch = pytest.importorskip("torch")
+
+from core.precision import InferencePrecision  # noqa: E402
+
+
+def detections(conf):
+    return sv.Detections(xyxy=np.array([[10, 10, 50, 50]], dtype=np.float32),
+                         confidence=np.array([conf]), class_id=np.array([2]))
+
+
+@pytest.mark.parametrize("passes", [True, False])
+def test_verify_keeps_predictor_and_compile_state(passes):
+    precision = InferencePrecision("fp32", "cpu")
+    precision.precision = "fp16"
+    precision._compiled = True
+    predictor = object()
+    yolo = SimpleNamespace(model=torch.nn.Linear(2, 2).half(), predictor=predictor)
+    calls = []
+
+    def infer(frame):
+        calls.append((precision.precision, yolo.predictor, yolo.model.weight.dtype))
+        return detections(0.9 if passes or precision.precision == "fp16" else 0.5)
+
+    report = precision.verify(yolo, infer, np.zeros((64, 64, 3), np.uint8))
+    assert calls == [("fp16", predictor, torch.float16), ("fp32", None, torch.float32)]
+    if passes:
+        assert report['agreement'] == 1.0
+        assert precision.precision == "fp16" and precision._compiled
+        assert yolo.predictor is predictor and yolo.model.weight.dtype == torch.float16
+    else:
+        # 回退 fp32 才重新 apply
+        assert precision.precision == "fp32" and yolo.predictor is None and not precision._compiled
@@ -0,0 +1,26 @@
+# tests/test_reid.py
+import numpy as np
+
+from core.reid import TrackEmbeddings
+
+
+class NullService:
+    def publish(self, *args):
+        pass
+
+    def match(self, *args):
+        return None
+
+
+def test_every_slot_is_sampled_with_detect_stride():
+    emb = TrackEmbeddings("CAM_01", service=NullService(), sample_every=4, min_samples=99)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    slots = np.arange(4)
+    xyxy = np.array([[10 + 60 * i, 20, 60 + 60 * i, 120] for i in range(4)], dtype=np.float32)
+    tids, cls = slots + 1, np.full(4, 2)
+    fresh = np.ones(4, dtype=bool)
+    for i in range(16):  # 步长 2：隔一帧检测一次，共 8 个检测帧
+        emb.update(frame, xyxy, slots, tids, cls, fresh, np.empty(0, dtype=np.int64), ts=i, detected=i % 2 == 0)
+        fresh = np.zeros(4, dtype=bool)
+    assert emb._count[slots].tolist() == [2, 2, 2, 2]
@@ -0,0 +1,70 @@
+# tests/test_scheduler.py
+import time
+
+from core.frame_skipper import AdaptiveStride
+from core.scheduler import InferenceScheduler
+
+
+def feed(scheduler, costs, seconds=2.0, fps=25, objects=None, sahi_ms=None, now=None):
+    """模拟每路摄像头按帧率逐帧推理并回报，返回结束时刻"""
+    objects, sahi_ms = objects or {}, sahi_ms or {}
+    now = time.monotonic() if now is None else now
+    steps = int(seconds * fps)
+    for i in range(steps):
+        now += 1.0 / fps
+        for cam, cost in costs.items():
+            scheduler.report(cam, cost, detected=True, objects=objects.get(cam, 0), now=now)
+            if cam in sahi_ms and i % 10 == 0:
+                scheduler.report(cam, sahi_ms[cam], detected=True, sahi=True, now=now)
+    return now
+
+
+def test_within_budget_keeps_configured_stride():
+    scheduler = InferenceScheduler(budget_ms=1000, interval=1.0)
+    scheduler.register("A", fps=25)
+    scheduler.register("B", fps=25, base_stride=2)
+    feed(scheduler, {"A": 10, "B": 10})
+    assert scheduler.decision("A").stride == 1 and scheduler.decision("A").level == 0
+    assert scheduler.decision("B").stride == 2
+    assert not scheduler.metrics()['overloaded']
+
+
+def test_overload_degrades_low_priority_first():
+    scheduler = InferenceScheduler(budget_ms=400, interval=1.0)
+    scheduler.register("high", priority=4.0, slo_ms=500, fps=25)
+    scheduler.register("low", priority=1.0, slo_ms=500, fps=25)
+    feed(scheduler, {"high": 20, "low": 20})  # 需求 2 x 25 x 20 = 1000 ms/s，预算 400
+    high, low = scheduler.decision("high"), scheduler.decision("low")
+    assert high.stride < low.stride
+    assert low.level == 2
+    # 两路都保住延迟目标 (每 500 ms 至少一次)，且分配总量不超预算
+    assert 25 / low.stride >= 2 and 25 / high.stride >= 2
+    metrics = scheduler.metrics()
+    assert metrics['overloaded'] and metrics['allocated_ms'] <= 400
+    assert metrics['cameras']['low']['level_name'] == "降低步长"
+
+
+def test_activity_shifts_budget_between_equal_priorities():
+    scheduler = InferenceScheduler(budget_ms=400, interval=1.0)
+    scheduler.register("busy", fps=25)
+    scheduler.register("idle", fps=25)
+    feed(scheduler, {"busy": 20, "idle": 20}, objects={"busy": 20})
+    assert scheduler.decision("busy").stride < scheduler.decision("idle").stride
+
+
+def test_sahi_is_dropped_before_stride():
+    scheduler = InferenceScheduler(budget_ms=600, interval=1.0)
+    scheduler.register("A", priority=2.0, fps=25)
+    scheduler.register("B", priority=1.0, fps=25)
+    # 普通推理 2 x 25 x 10 = 500 ms/s，加上 B 的 SAHI 超出预算，关掉 SAHI 就够
+    now = feed(scheduler, {"A": 10, "B": 10}, sahi_ms={"B": 300})
+    feed(scheduler, {"A": 10, "B": 10}, sahi_ms={"B": 300}, now=now)
+    b = scheduler.decision("B")
+    assert not b.allow_sahi and b.stride == 1 and b.level == 1
+
+
+def test_stride_floor_applies_to_countdown():
+    stride = AdaptiveStride(stride=1)
+    stride.set_floor(3)
+    assert [stride.should_detect() for _ in range(6)] == [True, False, False] * 2
+    assert stride.effective == 3
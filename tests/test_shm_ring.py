@@ -0,0 +1,183 @@
+# tests/test_shm_ring.py
+import multiprocessing as mp
+
+import numpy as np
+import pytest
+
+from utils.shm_ring import FrameRing, StaleHandleError
+from utils.video_saver import VideoSaver
+
+SHAPE = (6, 8, 3)
+
+
+def make_frame(value):
+    return np.full(SHAPE, value % 256, dtype=np.uint8)
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing(4, SHAPE)
+    yield ring
+    ring.close()
+
+
+def test_wraparound_reuses_released_slots(ring):
+    seen = []
+    for i in range(4 * 5):
+        handle = ring.put(make_frame(i), "CAM_01", timestamp=i * 0.04, frame_index=i)
+        assert handle is not None
+        assert (ring.view(handle) == i % 256).all()
+        assert handle.frame_index == i and handle.camera_id == "CAM_01"
+        seen.append((handle.slot, handle.seq))
+        ring.release(handle)
+
+    # 槽位按顺序轮转，每转一圈写入代数 +1
+    assert [slot for slot, _ in seen] == [i % 4 for i in range(20)]
+    assert [seq for _, seq in seen] == [i // 4 + 1 for i in range(20)]
+    assert ring.stats() == (0, 4)
+
+
+def test_old_handle_is_stale_after_wraparound(ring):
+    first = ring.put(make_frame(1))
+    ring.release(first)
+    for i in range(4):
+        ring.release(ring.put(make_frame(i)))
+    with pytest.raises(StaleHandleError):
+        ring.view(first)
+    with pytest.raises(StaleHandleError):
+        ring.retain(first)
+    ring.release(first)  # 过期句柄的 release 不影响新帧
+    assert ring.stats() == (0, 4)
+
+
+def test_slow_reader_keeps_its_frame_and_writer_drops(ring):
+    held = ring.put(make_frame(7), refs=2)      # 两个下游，其中一个处理得慢
+    ring.release(held)                          # 快的那个用完了
+    handles = [ring.put(make_frame(i)) for i in range(3)]
+    assert all(h is not None for h in handles)
+
+    # 慢的读者还没释放：槽位全部占满，写入方丢帧而不是覆盖
+    assert ring.put(make_frame(99)) is None
+    assert ring.dropped == 1
+    assert (ring.view(held) == 7).all()
+
+    for h in handles:
+        ring.release(h)
+    # 其他槽位空出来以后，慢读者的帧仍然不会被覆盖
+    for i in range(6):
+        h = ring.put(make_frame(100 + i))
+        assert h.slot != held.slot
+        ring.release(h)
+    assert (ring.view(held) == 7).all()
+
+    ring.release(held)
+    assert ring.stats() == (0, 4)
+
+
+def test_reserve_rejects_oversized_frame(ring):
+    with pytest.raises(ValueError):
+        ring.reserve((12, 16, 3))
+
+
+def test_saver_releases_evicted_handles(ring, tmp_path):
+    saver = VideoSaver(save_dir=str(tmp_path), max_cache_frames=2, ring=ring)
+    handles = [ring.put(make_frame(i)) for i in range(3)]
+    for h in handles:
+        saver.update_frame(h)
+    assert ring.stats() == (2, 4)
+    with pytest.raises(StaleHandleError):
+        ring.retain(handles[0])
+    saver.clear()
+    assert ring.stats() == (0, 4)
+
+
+def _child_sum(ring, handle, results):
+    frame = ring.view(handle)
+    results.put(int(frame.sum()))
+    del frame
+    ring.release(handle)
+    ring.close()
+
+
+def test_handle_crosses_process_boundary():
+    ctx = mp.get_context('spawn')
+    ring = FrameRing(2, SHAPE, ctx=ctx)
+    try:
+        handle = ring.put(make_frame(3), refs=1)
+        results = ctx.Queue()
+        p = ctx.Process(target=_child_sum, args=(ring, handle, results))
+        p.start()
+        assert results.get(timeout=30) == 3 * int(np.prod(SHAPE))
+        p.join(30)
+        assert ring.stats() == (0, 2)
+    finally:
+        ring.close()
+
+
+def test_read_frame_decodes_into_slot(ring, tmp_path):
+    import cv2
+    from core.pipeline import read_frame
+
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (SHAPE[1], SHAPE[0]))
+    for i in range(6):
+        writer.write(make_frame(40 * i))
+    writer.release()
+
+    cap = cv2.VideoCapture(path)
+    handles = []
+    for i in range(6):
+        ok, handle, frame = read_frame(cap, ring, "CAM_01", i)
+        assert ok
+        if handle is None:              # 4 个槽位都被占着
+            assert i >= 4 and ring.dropped == i - 3
+            continue
+        assert np.shares_memory(frame, ring.view(handle))
+        handles.append(handle)
+    cap.release()
+    assert [h.frame_index for h in handles] == [0, 1, 2, 3]
+    for h in handles:
+        ring.release(h)
+
+
+def test_saver_keeps_recording_on_its_own_ring_after_swap(tmp_path):
+    import threading
+    import time
+
+    old = FrameRing(4, SHAPE)
+    new = FrameRing(4, SHAPE)
+    saver = VideoSaver(save_dir=str(tmp_path), max_cache_frames=2, ring=old)
+    for i in range(2):
+        saver.update_frame(old.put(make_frame(i)))
+
+    done = threading.Event()
+    result = {}
+    saver.start_recording(duration=0.5,
+                          on_finish=lambda path: (result.setdefault('path', path), done.set()),
+                          on_error=lambda reason: (result.setdefault('error', reason), done.set()))
+    time.sleep(0.1)
+    # 录像途中换源：旧缓冲关闭，新缓冲的句柄不能被当成旧缓冲的句柄去取帧 / 归还
+    saver.set_ring(new)
+    old.close()
+    saver.update_frame(new.put(make_frame(9)))
+    assert done.wait(5)
+    assert 'path' in result and 'error' not in result
+    assert new.stats() == (1, 4)
+    saver.clear()
+    assert new.stats() == (0, 4)
+    new.close()
+
+
+def test_saver_snapshot_is_returned_to_the_ring_it_came_from(ring, tmp_path):
+    other = FrameRing(4, SHAPE)
+    saver = VideoSaver(save_dir=str(tmp_path), max_cache_frames=2, ring=ring)
+    saver.update_frame(ring.put(make_frame(1)))
+    taken_from, items = saver._snapshot()
+    saver.set_ring(other)
+    saver.update_frame(other.put(make_frame(2)))
+    assert ring.stats() == (1, 4)               # 录像线程还拿着旧缓冲的帧
+    saver._done(taken_from, items)
+    assert ring.stats() == (0, 4)
+    assert other.stats() == (1, 4)
+    saver.clear()
+    other.close()
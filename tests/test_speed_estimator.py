@@ -0,0 +1,33 @@
+# tests/test_speed_estimator.py
+import numpy as np
+
+from core.speed_estimator import SpeedEstimator
+
+
+def make_estimator():
+    return SpeedEstimator(matrix=np.eye(3, dtype=np.float32))
+
+
+def test_gap_between_observations_is_spread_over_elapsed_frames():
+    est = make_estimator()
+    slots = np.array([0])
+    # 1 m/帧, 10 FPS = 36 km/h；第 2 ~ 5 帧被门控跳过，第 6 帧一次走了 5 米
+    est.estimate_speeds(slots, [[0, 0]], fps=10, frame_index=1, fresh=[True])
+    speeds = est.estimate_speeds(slots, [[0, 5]], fps=10, frame_index=6, fresh=[False])
+    assert speeds.tolist() == [36]
+
+
+def test_fresh_slot_does_not_inherit_old_position():
+    est = make_estimator()
+    slots = np.array([0])
+    est.estimate_speeds(slots, [[0, 0]], fps=10, frame_index=1, fresh=[True])
+    speeds = est.estimate_speeds(slots, [[0, 3]], fps=10, frame_index=3, fresh=[True])  # 槽位被新目标复用
+    assert speeds.tolist() == [0]
+
+
+def test_without_frame_index_only_consecutive_calls_count():
+    est = make_estimator()
+    est.estimate_speeds([0, 1], [[0, 0], [0, 0]], fps=10)
+    est.estimate_speeds([1], [[0, 1]], fps=10)
+    speeds = est.estimate_speeds([0, 1], [[0, 1], [0, 2]], fps=10)
+    assert speeds.tolist() == [0, 36]
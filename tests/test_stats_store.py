@@ -0,0 +1,62 @@
+# tests/test_stats_store.py
+import pytest
+
+from database.connection_pool import ConnectionPool
+from database.stats_store import TrafficStatsStore, UPSERT_SQL
+from database.write_queue import WriteBehindQueue
+
+
+@pytest.fixture
+def pool(tmp_path):
+    return ConnectionPool(str(tmp_path / "test.db"))
+
+
+def minute_rows(pool):
+    with pool.reader() as conn:
+        return conn.execute(
+            "SELECT bucket, in_count FROM traffic_stats WHERE resolution = 60 AND class_id = -1 ORDER BY bucket"
+        ).fetchall()
+
+
+def test_compact_drains_idle_camera_before_rollup(pool):
+    writer = WriteBehindQueue(pool, flush_interval=0.05)
+    store = TrafficStatsStore(pool, writer, compact_lag=5)
+    store.record("CAM_01", in_per_class={2: 3}, ts=130)  # 之后这路摄像头不再上报
+    store.compact(now=300)
+    assert [tuple(r) for r in minute_rows(pool)] == [(120, 3)]
+    writer.close()
+
+
+class StuckWriter:
+    """写队列卡住：put_rows 成功入队，但 flush 一直超时"""
+
+    def __init__(self, writer):
+        self.writer, self.rows = writer, []
+
+    def put_rows(self, sql, rows):
+        self.rows.extend(rows)
+        return True
+
+    def flush(self, timeout=5.0):
+        return False
+
+    def release(self):
+        self.writer.put_rows(UPSERT_SQL, self.rows)
+        self.rows = []
+        return self.writer.flush()
+
+
+def test_watermark_waits_for_unflushed_buckets(pool):
+    writer = WriteBehindQueue(pool, flush_interval=0.05)
+    stuck = StuckWriter(writer)
+    store = TrafficStatsStore(pool, stuck, compact_lag=5)
+    store.record("CAM_01", in_per_class={2: 1}, ts=130)
+    store.record("CAM_01", in_per_class={2: 1}, ts=200)  # 130 的桶交给写队列，但还没落盘
+    store.compact(now=300)
+    assert minute_rows(pool) == []
+
+    assert stuck.release()
+    store.writer = writer
+    store.compact(now=300)
+    assert [tuple(r) for r in minute_rows(pool)] == [(120, 1), (180, 1)]
+    writer.close()
@@ -0,0 +1,28 @@
+# tests/test_system_config.py
+import json
+
+import pytest
+
+from configs.system_config import ConfigError, Settings, SystemConfig
+
+
+@pytest.fixture
+def config(tmp_path):
+    return SystemConfig(path=str(tmp_path / "config.json"))
+
+
+def test_update_rejects_min_above_max(config):
+    with pytest.raises(ConfigError):
+        config.update({"imgsz_min": 1024, "imgsz_max": 640})
+    with pytest.raises(ConfigError):
+        config.update({"imgsz_min": config.settings.imgsz_max + 32})
+    assert config.settings.imgsz_min == Settings().imgsz_min
+
+
+def test_load_falls_back_to_defaults_for_misordered_pair(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"imgsz_min": 1024, "imgsz_max": 640, "speed_limit": 80}), encoding="utf-8")
+    settings = SystemConfig(path=str(path)).settings
+    assert (settings.imgsz_min, settings.imgsz_max) == (Settings().imgsz_min, Settings().imgsz_max)
+    assert settings.speed_limit == 80
+
@@ -0,0 +1,54 @@
+# tests/test_track_slots.py
+import numpy as np
+
+from core.track_slots import TrackSlots, grow_rows
+
+
+def test_known_ids_keep_their_slot():
+    slots = TrackSlots(capacity=4, ttl=2)
+    first = slots.update([7, 3])
+    assert slots.fresh.tolist() == [True, True]
+    again = slots.update([3, 7])
+    assert slots.fresh.tolist() == [False, False]
+    assert again.tolist() == first[::-1].tolist()
+
+
+def test_expired_slot_is_released_and_reused():
+    slots = TrackSlots(capacity=2, ttl=2)
+    a, b = slots.update([1, 2]).tolist()
+    slots.update([2])
+    slots.update([2])
+    assert len(slots.released) == 0          # ID 1 才消失 2 帧，还没超过 ttl
+    reused = slots.update([2, 9])
+    assert slots.released.tolist() == [a]
+    assert reused.tolist() == [b, a]         # 新 ID 直接用上刚回收的槽位
+    assert slots.fresh.tolist() == [False, True]
+    assert len(slots) == 2
+
+
+def test_returning_id_within_ttl_is_not_fresh():
+    slots = TrackSlots(capacity=4, ttl=3)
+    slot = slots.update([5])[0]
+    slots.update([])
+    slots.update(None)
+    assert slots.update([5]).tolist() == [slot]
+    assert not slots.fresh[0]
+
+
+def test_grows_when_slots_run_out():
+    slots = TrackSlots(capacity=2, ttl=10)
+    assigned = slots.update([1, 2, 3, 4, 5])
+    assert slots.capacity >= 5
+    assert len(set(assigned.tolist())) == 5
+    assert slots.fresh.all()
+    # 扩容后已有 ID 的槽位不变
+    assert slots.update([5, 1]).tolist() == [assigned[4], assigned[0]]
+
+
+def test_grow_rows_pads_with_fill():
+    state = np.arange(6, dtype=np.float32).reshape(3, 2)
+    grown = grow_rows(state, 5, fill=-1)
+    assert grown.shape == (5, 2)
+    assert grown[:3].tolist() == state.tolist()
+    assert (grown[3:] == -1).all()
+    assert grow_rows(state, 2) is state
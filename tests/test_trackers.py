@@ -0,0 +1,42 @@
+# tests/test_trackers.py
+import numpy as np
+import supervision as sv
+
+from core.trackers import build_tracker, update_rate
+
+
+def box(x):
+    return sv.Detections(xyxy=np.array([[x, 100, x + 40, 140]], dtype=np.float32),
+                         confidence=np.array([0.9]), class_id=np.array([2]))
+
+
+def test_iou_tracker_retune_keeps_ids_and_rescales():
+    tracker = build_tracker("iou", fps=30, stride=1, lost_seconds=1.0)
+    for i in range(3):
+        ids = tracker.update_with_detections(box(10 + 2 * i)).tracker_id
+    assert tracker.max_age == 30
+    _, before = tracker.velocities(ids)
+
+    tracker.set_frame_rate(update_rate(30, 3))  # 步长 1 -> 3，每次更新隔 3 帧
+    assert tracker.max_age == 10
+    _, after = tracker.velocities(ids)
+    assert np.allclose(after, before * 3)
+    # 下一次检测隔了 3 帧 (位移 6 像素)，仍然是同一个 ID
+    assert tracker.update_with_detections(box(20)).tracker_id.tolist() == ids.tolist()
+
+
+def test_lost_buffer_follows_new_rate():
+    tracker = build_tracker("ocsort", fps=30, stride=1, lost_seconds=1.0)
+    tracker.update_with_detections(box(10))
+    tracker.set_frame_rate(update_rate(30, 3))
+    empty = sv.Detections.empty()
+    for _ in range(11):  # 11 次更新 = 1.1 秒
+        tracker.update_with_detections(empty)
+    assert len(tracker._ids) == 0
+
+
+def test_bytetrack_retune_updates_lost_buffer():
+    tracker = build_tracker("bytetrack", fps=30, stride=1, lost_seconds=1.0)
+    assert tracker._tracker.max_time_lost == 30
+    tracker.set_frame_rate(update_rate(30, 3))
+    assert tracker._tracker.max_time_lost == 10
@@ -0,0 +1,52 @@
+# tests/test_trajectory_store.py
+import sqlite3
+
+import numpy as np
+import pytest
+
+from database.connection_pool import ConnectionPool
+from database.trajectory_store import TrajectoryStore
+from database.write_queue import WriteBehindQueue
+
+
+@pytest.fixture
+def store(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "test.db"))
+    writer = WriteBehindQueue(pool, flush_interval=0.05)
+    yield TrajectoryStore(pool, writer)
+    writer.close()
+
+
+def test_same_track_id_in_new_epoch_is_a_new_track(store):
+    # 追踪器重建后 ID 1 指的是另一个目标，同一段时间内也不能拼到一起
+    for i in range(5):
+        store.record("CAM_01", [1], [2], [[10 + i, 20]], ts=100 + i * 0.1, epoch=7)
+    for i in range(5):
+        store.record("CAM_01", [1], [3], [[500 + i, 300]], ts=100.5 + i * 0.1, epoch=8)
+    store.flush()
+    assert store.writer.flush()
+
+    tracks = store.query("CAM_01", 0, 200)
+    assert [(t['epoch'], t['track_id'], t['class_id'], len(t['t'])) for t in tracks] == [(7, 1, 2, 5), (8, 1, 3, 5)]
+    assert tracks[1]['xy'][0].tolist() == [500, 300]
+    assert [t['epoch'] for t in store.query("CAM_01", 0, 200, track_id=1, epoch=8)] == [8]
+
+
+def test_old_table_gets_epoch_column(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE trajectories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, camera_id TEXT NOT NULL, track_id INTEGER NOT NULL,
+            class_id INTEGER, t_start REAL NOT NULL, t_end REAL NOT NULL, n_points INTEGER NOT NULL,
+            x0 INTEGER NOT NULL, y0 INTEGER NOT NULL, deltas BLOB
+        )
+    ''')
+    conn.execute("INSERT INTO trajectories (camera_id, track_id, class_id, t_start, t_end, n_points, x0, y0, deltas) "
+                 "VALUES ('CAM_01', 4, 2, 100, 100, 1, 5, 6, ?)", (np.zeros(0, np.int16).tobytes(),))
+    conn.commit()
+    conn.close()
+
+    pool = ConnectionPool(path)
+    store = TrajectoryStore(pool, WriteBehindQueue(pool))
+    assert [(t['epoch'], t['track_id']) for t in store.query("CAM_01", 0, 200)] == [(0, 4)]
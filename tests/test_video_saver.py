@@ -0,0 +1,44 @@
+# tests/test_video_saver.py
+import threading
+
+import numpy as np
+
+from utils.video_saver import VideoSaver
+
+
+def record(saver, **kwargs):
+    done = threading.Event()
+    result = {}
+
+    def finish(path):
+        result['path'] = path
+        done.set()
+
+    def error(reason):
+        result['error'] = reason
+        done.set()
+
+    saver.start_recording(on_finish=finish, on_error=error, **kwargs)
+    assert done.wait(5)
+    return result
+
+
+def test_empty_buffer_reports_error(tmp_path):
+    saver = VideoSaver(save_dir=str(tmp_path), max_cache_frames=5)
+    result = record(saver, duration=0)
+    assert 'error' in result and 'path' not in result
+    assert not saver.is_recording
+
+
+def test_busy_saver_reports_error(tmp_path):
+    saver = VideoSaver(save_dir=str(tmp_path), max_cache_frames=5)
+    saver.is_recording = True
+    assert 'error' in record(saver, duration=0)
+
+
+def test_finished_recording_reports_path(tmp_path):
+    saver = VideoSaver(save_dir=str(tmp_path), max_cache_frames=5)
+    for i in range(3):
+        saver.update_frame(np.full((32, 32, 3), i, dtype=np.uint8))
+    result = record(saver, duration=0)
+    assert result.get('path', '').endswith('.mp4')
@@ -0,0 +1,66 @@
+# tests/test_write_queue.py
+import threading
+import time
+
+import pytest
+
+from database.connection_pool import ConnectionPool
+from database.models import Event
+from database.write_queue import WriteBehindQueue
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "test.db"))
+    with pool.writer() as conn:
+        conn.execute('''
+            CREATE TABLE events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, event_type TEXT NOT NULL, camera_id TEXT NOT NULL,
+                timestamp TIMESTAMP, snapshot_path TEXT, video_path TEXT, description TEXT
+            )
+        ''')
+        conn.execute("CREATE TABLE stats (k INTEGER PRIMARY KEY, v INTEGER)")
+    return pool
+
+
+def count(pool, table):
+    with pool.reader() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_failed_event_batch_is_retried_row_by_row(pool):
+    wq = WriteBehindQueue(pool, flush_interval=0.05)
+    ids = []
+    wq.put_event(Event(event_type="Speeding", camera_id="CAM_01"), on_done=ids.append)
+    wq.put_event(Event(event_type=None, camera_id="CAM_01"))  # NOT NULL 约束失败，连累整批
+    wq.put_event(Event(event_type="Congestion", camera_id="CAM_01"), on_done=ids.append)
+    assert wq.flush()
+    assert count(pool, "events") == 2
+    assert len(ids) == 2 and None not in ids
+    metrics = wq.metrics()
+    assert metrics['lost'] == 1 and metrics['events_written'] == 2
+    wq.close()
+
+
+def test_failed_rows_are_retried_and_counted(pool):
+    wq = WriteBehindQueue(pool, flush_interval=0.05)
+    wq.put_rows("INSERT INTO stats (k, v) VALUES (?, ?)", [(1, 1), (1, 2), (2, 2)])  # 主键重复
+    assert wq.flush()
+    assert count(pool, "stats") == 2
+    assert wq.metrics()['lost'] == 1
+    wq.close()
+
+
+def test_close_does_not_hang_on_full_queue(pool):
+    wq = WriteBehindQueue(pool, flush_interval=0.05, max_queue=2)
+    gate = threading.Event()
+    wq.put_event(Event(event_type="A", camera_id="CAM_01"), on_done=lambda _: gate.wait(5))
+    time.sleep(0.2)  # 写线程卡在回调里
+    wq.put_event(Event(event_type="B", camera_id="CAM_01"))
+    wq.put_event(Event(event_type="C", camera_id="CAM_01"))
+    t0 = time.time()
+    wq.close(timeout=0.3)
+    assert time.time() - t0 < 2.0
+    gate.set()
+    wq._thread.join(2.0)
+    assert not wq._thread.is_alive()
@@ -0,0 +1,65 @@
+# tests/test_zones.py
+import numpy as np
+
+from core.zones import ZoneEngine
+
+FRAME = (100, 100)
+CONFIG = {
+    "lines": [
+        {"name": "all", "start": [0.0, 0.5], "end": [1.0, 0.5]},
+        {"name": "cars", "start": [0.0, 0.5], "end": [1.0, 0.5], "classes": [1]},
+    ],
+    "polygons": [{"name": "left", "points": [[0.0, 0.0], [0.5, 0.0], [0.5, 1.0], [0.0, 1.0]]}],
+}
+
+
+def box(x, y):
+    return [x, y, x + 10, y + 10]
+
+
+def step(engine, boxes, classes, slots, fresh=None):
+    return engine.update(np.array(boxes, dtype=np.float32), np.array(classes), np.array(slots),
+                         None if fresh is None else np.array(fresh))
+
+
+def test_crossing_counts_in_and_out_per_class():
+    engine = ZoneEngine(CONFIG, FRAME, num_classes=3)
+    # 目标 0 (类别 1) 从线下方往上走，目标 1 (类别 2) 从上往下走
+    step(engine, [box(20, 70), box(70, 20)], [1, 2], [0, 1], fresh=[True, True])
+    result = step(engine, [box(20, 60), box(70, 30)], [1, 2], [0, 1])
+    assert result['crossings'].shape == (0, 3)
+    result = step(engine, [box(20, 30), box(70, 70)], [1, 2], [0, 1])
+
+    assert result['line_in'][0].tolist() == [0, 1, 0]
+    assert result['line_out'][0].tolist() == [0, 0, 1]
+    # 第二条线只统计类别 1
+    assert result['line_in'][1].tolist() == [0, 1, 0]
+    assert result['line_out'][1].tolist() == [0, 0, 0]
+    assert sorted(map(tuple, result['crossings'].tolist())) == [(0, 0, 1), (0, 1, -1), (1, 0, 1)]
+    assert (engine.in_count, engine.out_count) == (2, 1)
+
+
+def test_box_on_the_line_keeps_previous_side():
+    engine = ZoneEngine(CONFIG, FRAME, num_classes=3)
+    step(engine, [box(20, 70)], [1], [0], fresh=[True])
+    step(engine, [box(20, 45)], [1], [0])    # 压线：不算有效位置
+    result = step(engine, [box(20, 70)], [1], [0])
+    assert engine.in_count == 0 and engine.out_count == 0
+    assert result['crossings'].shape == (0, 3)
+
+
+def test_fresh_slot_forgets_previous_owner():
+    engine = ZoneEngine(CONFIG, FRAME, num_classes=3)
+    step(engine, [box(20, 70)], [1], [0], fresh=[True])
+    # 槽位 0 回收后分给了线上方的新目标，不能算成越线
+    step(engine, [box(20, 30)], [1], [0], fresh=[True])
+    assert engine.in_count == 0
+
+
+def test_polygon_occupancy_by_class():
+    engine = ZoneEngine(CONFIG, FRAME, num_classes=3)
+    result = step(engine, [box(10, 10), box(20, 60), box(70, 60), box(30, 30)], [0, 2, 2, -1], [0, 1, 2, 3],
+                  fresh=[True] * 4)
+    assert result['inside'][0].tolist() == [True, True, False, False]   # 类别 -1 不计入
+    assert result['occupancy'][0].tolist() == [1, 0, 1]
+    assert engine.summary(result)['polygons'] == {"left": 2}
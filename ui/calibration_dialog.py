@@ -0,0 +1,139 @@
+# ui/calibration_dialog.py
+import cv2
+import numpy as np
+from PyQt5.QtWidgets import (QDialog, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
+                             QFormLayout, QDoubleSpinBox, QCheckBox, QMessageBox)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+
+from core.calibration import make_calibration, scale_points
+from configs.system_config import ConfigError
+from configs.camera_profiles import camera_profiles
+
+POINT_NAMES = ["左下", "右下", "右上", "左上"]
+
+
+class CalibrationDialog(QDialog):
+    """
+    测速标定：在当前画面上依次点出路面上一个矩形的 4 个角 (左下, 右下, 右上, 左上)，
+    填入它的真实宽度/长度 (米)，保存后单应性矩阵写进该摄像头的配置，运行时直接加载。
+    """
+
+    def __init__(self, frame, camera_id, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"📐 测速标定 - {camera_id}")
+        self.frame = frame
+        self.camera_id = camera_id
+        self.frame_size = (frame.shape[1], frame.shape[0])
+
+        calibration = camera_profiles.get(camera_id).calibration
+        # 上次标定时的画面分辨率可能和现在不同 (换了码流)，点按比例换算到当前画面
+        saved = scale_points(calibration.get("src_points", []), calibration.get("frame_size"), self.frame_size)
+        self.points = [tuple(p) for p in saved.round(1).tolist()][:4]
+        self.init_ui(calibration)
+        self.redraw()
+
+    def init_ui(self, calibration):
+        layout = QVBoxLayout(self)
+
+        self.image_label = QLabel()
+        self.image_label.setAlignment(Qt.AlignCenter)
+        self.image_label.setCursor(Qt.CrossCursor)
+        self.image_label.mousePressEvent = self.on_image_clicked
+        layout.addWidget(self.image_label)
+
+        self.hint_label = QLabel()
+        layout.addWidget(self.hint_label)
+
+        form = QFormLayout()
+        self.spin_width = QDoubleSpinBox()
+        self.spin_width.setRange(0.5, 100.0)
+        self.spin_width.setSuffix(" 米")
+        self.spin_width.setValue(calibration.get("real_width", 3.5))
+        form.addRow(QLabel("区域宽度 (左下→右下):"), self.spin_width)
+
+        self.spin_length = QDoubleSpinBox()
+        self.spin_length.setRange(0.5, 500.0)
+        self.spin_length.setSuffix(" 米")
+        self.spin_length.setValue(calibration.get("real_length", 10.0))
+        form.addRow(QLabel("区域长度 (左下→左上):"), self.spin_length)
+
+        self.chk_lut = QCheckBox("按行查表测速 (不做逐帧透视变换)")
+        self.chk_lut.setChecked(calibration.get("use_lut", False))
+        form.addRow(QLabel("测速方式:"), self.chk_lut)
+        layout.addLayout(form)
+
+        btn_layout = QHBoxLayout()
+        btn_reset = QPushButton("↺ 重新选点")
+        btn_reset.clicked.connect(self.reset_points)
+        self.btn_save = QPushButton("💾 保存标定")
+        self.btn_save.clicked.connect(self.save)
+        btn_cancel = QPushButton("取消")
+        btn_cancel.clicked.connect(self.reject)
+        btn_layout.addWidget(btn_reset)
+        btn_layout.addStretch()
+        btn_layout.addWidget(self.btn_save)
+        btn_layout.addWidget(btn_cancel)
+        layout.addLayout(btn_layout)
+
+    # --- 选点 ---
+
+    def on_image_clicked(self, event):
+        if len(self.points) >= 4 or event.button() != Qt.LeftButton:
+            return
+        pixmap = self.image_label.pixmap()
+        if pixmap is None:
+            return
+        # 标签里的图片居中且按比例缩放，点击位置换算回原图像素
+        offset_x = (self.image_label.width() - pixmap.width()) / 2
+        offset_y = (self.image_label.height() - pixmap.height()) / 2
+        scale = self.frame_size[0] / pixmap.width()
+        x = (event.pos().x() - offset_x) * scale
+        y = (event.pos().y() - offset_y) * scale
+        if 0 <= x < self.frame_size[0] and 0 <= y < self.frame_size[1]:
+            self.points.append((x, y))
+            self.redraw()
+
+    def reset_points(self):
+        self.points = []
+        self.redraw()
+
+    def redraw(self):
+        img = self.frame.copy()
+        pts = np.round(self.points).astype(np.int32).reshape(-1, 2)
+        if len(pts) > 1:
+            cv2.polylines(img, [pts], len(pts) == 4, (0, 255, 255), 2)
+        for name, (x, y) in zip(POINT_NAMES, pts.tolist()):
+            cv2.circle(img, (x, y), 6, (0, 0, 255), -1)
+            cv2.putText(img, name, (x + 8, y - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+        h, w = img.shape[:2]
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        q_img = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(q_img)
+        if w > 1280:
+            pixmap = pixmap.scaledToWidth(1280, Qt.SmoothTransformation)
+        self.image_label.setPixmap(pixmap)
+
+        if len(self.points) < 4:
+            self.hint_label.setText(f"请点击路面矩形的【{POINT_NAMES[len(self.points)]}】角 ({len(self.points)}/4)")
+        else:
+            self.hint_label.setText("✅ 4 个点已选好，填写真实尺寸后保存")
+        self.btn_save.setEnabled(len(self.points) == 4)
+
+    # --- 保存 ---
+
+    def save(self):
+        try:
+            calibration = make_calibration(self.points, self.spin_width.value(), self.spin_length.value(),
+                                           self.frame_size, use_lut=self.chk_lut.isChecked())
+        except ValueError as e:
+            QMessageBox.warning(self, "标定失败", f"{e}，请重新选点")
+            return
+        try:
+            camera_profiles.set_camera(self.camera_id, calibration=calibration)
+        except (ConfigError, OSError) as e:
+            QMessageBox.critical(self, "保存失败", str(e))
+            return
+        print(f"📐 [{self.camera_id}] 测速标定已保存")
+        self.accept()
@@ -0,0 +1,98 @@
+# ui/event_list_model.py
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class EventListModel(QAbstractListModel):
+    """
+    历史事件列表模型 (按需分页加载)
+    - 视图滚到底部时 Qt 自动调用 canFetchMore / fetchMore，再从数据库取下一页
+    - 新事件通过 fetch_newer() 增量插入到顶部，不重建整个列表
+    """
+    VideoPathRole = Qt.UserRole
+    EventRole = Qt.UserRole + 1
+
+    def __init__(self, db, page_size=100, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.page_size = page_size
+        self.filters = {}
+        self._events = []
+        self._next_cursor = None
+        self._exhausted = False
+
+    # --- Qt 模型接口 ---
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._events)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._events):
+            return None
+        event = self._events[index.row()]
+        if role == Qt.DisplayRole:
+            return f"[{event.timestamp}] {event.event_type} - {event.description}"
+        if role == self.VideoPathRole:
+            return event.video_path
+        if role == self.EventRole:
+            return event
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        events, self._next_cursor = self.db.query_events(
+            limit=self.page_size, before=self._next_cursor, **self.filters
+        )
+        if self._next_cursor is None:
+            self._exhausted = True
+        if not events:
+            return
+
+        first = len(self._events)
+        self.beginInsertRows(QModelIndex(), first, first + len(events) - 1)
+        self._events.extend(events)
+        self.endInsertRows()
+
+    # --- 业务接口 ---
+
+    def reload(self, **filters):
+        """按新的过滤条件重置 (清空后由视图重新触发 fetchMore)"""
+        self.beginResetModel()
+        self.filters = {k: v for k, v in filters.items() if v}
+        self._events = []
+        self._next_cursor = None
+        self._exhausted = False
+        self.endResetModel()
+
+    def fetch_newer(self):
+        """只查询比当前第一行更新的记录并插到顶部，耗时与历史总量无关"""
+        if not self._events:
+            # 列表为空时没有锚点，直接取第一页
+            self._exhausted = False
+            self.fetchMore()
+            return 0
+
+        head = self._events[0]
+        events, _ = self.db.query_events(
+            limit=None, after=(head.timestamp, head.id), **self.filters
+        )
+        if not events:
+            return 0
+
+        self.beginInsertRows(QModelIndex(), 0, len(events) - 1)
+        self._events[0:0] = events
+        self.endInsertRows()
+        return len(events)
+
+    def remove_row(self, row):
+        if 0 <= row < len(self._events):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._events[row]
+            self.endRemoveRows()
@@ -2,18 +2,22 @@
 import os
 import cv2
 import time
-from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QListWidget,
-                             QListWidgetItem, QLabel, QPushButton, QSlider,
-                             QGroupBox, QMessageBox)
+from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QListView,
+                             QLabel, QPushButton, QSlider,
+                             QGroupBox, QMessageBox, QLineEdit)
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QImage, QPixmap
 from database.db_manager import DBManager
+from ui.event_list_model import EventListModel
 
 
 class HistoryPage(QWidget):
+    PAGE_SIZE = 100  # 每次从数据库取的条数
+
     def __init__(self):
         super().__init__()
         self.db = DBManager()
+        self.search_text = ""
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
         self.cap = None
@@ -31,17 +35,31 @@ class HistoryPage(QWidget):
         title_label.setStyleSheet("color: white; font-size: 16px; font-weight: bold; margin-bottom: 5px;")
         left_layout.addWidget(title_label)
 
-        self.file_list = QListWidget()
+        self.input_search = QLineEdit()
+        self.input_search.setPlaceholderText("🔍 按描述搜索，回车确认")
+        self.input_search.setStyleSheet("background-color: #2d3436; color: white; padding: 5px; border: 1px solid #636e72;")
+        self.input_search.returnPressed.connect(self.on_search)
+        left_layout.addWidget(self.input_search)
+
+        self.empty_label = QLabel("暂无历史记录")
+        self.empty_label.setStyleSheet("color: #888; padding: 5px;")
+        left_layout.addWidget(self.empty_label)
+
+        # 模型按需分页：视图滚到底部时自动 fetchMore
+        self.event_model = EventListModel(self.db, page_size=self.PAGE_SIZE, parent=self)
+        self.file_list = QListView()
+        self.file_list.setModel(self.event_model)
+        self.file_list.setUniformItemSizes(True)  # 行高一致，滚动时不必逐行测量
         self.file_list.setStyleSheet("""
-            QListWidget { 
+            QListView { 
                 background-color: #2d3436; color: white; border: 1px solid #636e72; font-size: 14px;
             }
-            QListWidget::item { padding: 5px; }
-            QListWidget::item:selected { 
+            QListView::item { padding: 5px; }
+            QListView::item:selected { 
                 background-color: #00b894; color: black; border-radius: 3px;
             }
         """)
-        self.file_list.itemClicked.connect(self.play_selected_video)
+        self.file_list.clicked.connect(self.play_selected_video)
         left_layout.addWidget(self.file_list)
 
         # --- 右侧：播放器 ---
@@ -107,21 +125,25 @@ class HistoryPage(QWidget):
 
     def load_history_data(self):
         print("🔄 刷新历史列表...")
-        self.file_list.clear()
-        events = self.db.get_all_events()
+        self.event_model.reload(text=self.search_text)
+        if self.event_model.canFetchMore():
+            self.event_model.fetchMore()
+        self.update_empty_hint()
 
-        if not events:
-            self.file_list.addItem("暂无历史记录")
-            return
+    def on_new_record(self):
+        """监控页写入新事件后调用：只把新增的行插到顶部"""
+        self.event_model.fetch_newer()
+        self.update_empty_hint()
 
-        for event in events:
-            display_text = f"[{event.timestamp}] {event.event_type} - {event.description}"
-            item = QListWidgetItem(display_text)
-            item.setData(Qt.UserRole, event.video_path)
-            self.file_list.addItem(item)
+    def update_empty_hint(self):
+        self.empty_label.setVisible(self.event_model.rowCount() == 0)
+
+    def on_search(self):
+        self.search_text = self.input_search.text().strip()
+        self.load_history_data()
 
-    def play_selected_video(self, item):
-        video_path = item.data(Qt.UserRole)
+    def play_selected_video(self, index):
+        video_path = index.data(EventListModel.VideoPathRole)
 
         # 先停止当前播放，防止冲突
         self.timer.stop()
@@ -157,12 +179,12 @@ class HistoryPage(QWidget):
 
     # 🔴🔴🔴 [核心修复] 强力删除逻辑：防闪退 + 强制清列表
     def delete_current_video(self):
-        current_item = self.file_list.currentItem()
-        if not current_item:
+        current_index = self.file_list.currentIndex()
+        if not current_index.isValid():
             QMessageBox.warning(self, "提示", "请先选择一条记录！")
             return
 
-        video_path = current_item.data(Qt.UserRole)
+        video_path = current_index.data(EventListModel.VideoPathRole)
 
         # 1. 弹出确认框
         reply = QMessageBox.question(self, '确认删除',
@@ -202,8 +224,8 @@ class HistoryPage(QWidget):
 
         # 🟢 6. [强制执行] 不管上面成不成功，直接从列表里把这一行删掉！
         # 这就是解决“坏记录删不掉”的关键
-        row = self.file_list.row(current_item)
-        self.file_list.takeItem(row)
+        self.event_model.remove_row(current_index.row())
+        self.update_empty_hint()
 
         QMessageBox.information(self, "成功", "记录已清理。")
 
@@ -122,7 +122,7 @@ class MainWindow(QMainWindow):
         # 🟢🟢🟢 [最关键的一步] 信号连接 🟢🟢🟢
         # 确保这行代码存在！它负责让监控页通知历史页刷新
         try:
-            self.page_monitor.new_record_signal.connect(self.page_history.load_history_data)
+            self.page_monitor.new_record_signal.connect(self.page_history.on_new_record)
             print("✅ 信号连接成功：监控页 -> 历史页")
         except Exception as e:
             print(f"❌ 信号连接失败: {e}")
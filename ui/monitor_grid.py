@@ -1,5 +1,6 @@
 # ui/monitor_grid.py
 import cv2
+import numpy as np
 import time
 import os
 import traceback
@@ -9,19 +10,32 @@ from PyQt5.QtWidgets import (QWidget, QLabel, QPushButton, QVBoxLayout,
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap, QCursor
 from core.detector import SmartDetector
+from core.congestion import CongestionDetector
+from core.alerts import Alert, AlertEngine
+from core.od_matrix import ODTracker
+from core.reid import reid_service
+from core.scheduler import inference_scheduler
+from core.pipeline import read_frame
+from utils.shm_ring import FrameRing
+from configs.system_config import sys_config
+from configs.camera_profiles import camera_profiles
+from ui.calibration_dialog import CalibrationDialog
 
 try:
     from utils.video_saver import VideoSaver
     from database.db_manager import DBManager
     from database.models import Event
-    from configs.system_config import sys_config
 except ImportError as e:
     print(f"❌ 导入模块失败: {e}")
-    sys_config = type('Config', (), {'get': lambda self, k, d: d, 'set': lambda self, k, v: None})()
 
 
 class MonitorPage(QWidget):
     new_record_signal = pyqtSignal()
+    # 配置变更可能来自文件监视线程，经信号切回 GUI 线程再应用
+    config_changed_signal = pyqtSignal(object, object)
+    profile_changed_signal = pyqtSignal(object)
+    # 录像线程结束 (成功或失败) 后切回 GUI 线程收尾：(报警上下文, 录像路径或 None)
+    record_finished_signal = pyqtSignal(object, object)
 
     def __init__(self):
         super().__init__()
@@ -135,8 +149,12 @@ class MonitorPage(QWidget):
         self.btn_start = QPushButton("▶ 启动分析引擎");
         self.btn_start.setFixedHeight(55);
         self.btn_start.clicked.connect(self.toggle_video)
+        self.btn_calibrate = QPushButton("📐 测速标定");
+        self.btn_calibrate.setFixedHeight(55);
+        self.btn_calibrate.clicked.connect(self.open_calibration)
         self.right_panel.addWidget(self.btn_open);
         self.right_panel.addWidget(self.btn_start)
+        self.right_panel.addWidget(self.btn_calibrate)
         main_layout.addLayout(self.right_panel, stretch=1)
 
     def create_stat_row(self, title_text, value_text, color):
@@ -171,6 +189,9 @@ class MonitorPage(QWidget):
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
         self.cap = None
+        self.ring = None        # 共享内存帧缓冲，按视频源分辨率创建 (采集 -> 检测 -> 录像 之间只传句柄)
+        self.congestion = None  # 依赖区域配置和帧率，第一帧时创建
+        self.od_tracker = ODTracker()
         self.is_running = False
 
         self.zoom_level = 1.0;
@@ -183,19 +204,122 @@ class MonitorPage(QWidget):
         # 🟢 [关键修复] 补上这一行！之前报错就是因为缺了这个
         self.frame_counter = 0
 
+        # 配置快照：每帧直接读属性，修改时由 apply_settings / apply_profile 推送新快照
+        # 全局项 (报警限流、拥堵窗口等) 读 settings，本路摄像头的阈值/跳帧/区域读 profile
+        self.camera_id = "CAM_01"
+        self.settings = cfg = sys_config.settings
+        self.profile = profile = camera_profiles.get(self.camera_id)
+        self.config_changed_signal.connect(self.apply_settings)
+        self.profile_changed_signal.connect(self.apply_profile)
+        self.record_finished_signal.connect(self.on_record_finished)
+        self._unsubscribe_config = sys_config.subscribe(self.config_changed_signal.emit)
+        self._unsubscribe_profile = camera_profiles.subscribe(self.profile_changed_signal.emit)
+
         try:
-            self.detector = SmartDetector(model_path='weights/yolov8m_cbam.pt')
+            self.detector = SmartDetector(
+                model_path='weights/yolov8m_cbam.pt',
+                detect_stride=profile.detect_stride,
+                adaptive_stride=profile.adaptive_stride,
+                max_stride=profile.max_stride,
+                motion_gate=profile.motion_gate,
+                motion_min_area=profile.motion_min_area,
+                motion_force_every=profile.motion_force_every,
+                camera_id=self.camera_id,
+                zones=profile.zones or None,
+                calibration=profile.calibration or None,
+                tracker=profile.tracker,
+                track_lost_seconds=profile.track_lost_seconds,
+                reid=profile.reid,
+                imgsz=profile.imgsz,
+                adaptive_imgsz=profile.adaptive_imgsz,
+                imgsz_range=(profile.imgsz_min, profile.imgsz_max),
+                precision=cfg.precision,
+                channels_last=cfg.channels_last,
+                compile_model=cfg.compile_model,
+                scheduler=inference_scheduler,
+            )
             self.saver = VideoSaver(save_dir="records", max_cache_frames=150)
             self.db = DBManager()
+            self.db.stats.start()
+            # 报警去重/限流/合并：同一辆车冷却期内只报一次，连续报警合并为一个事件
+            self.alert_engine = AlertEngine(rate=cfg.alert_rate, burst=cfg.alert_burst)
+            reid_service.configure(cfg.reid_threshold, cfg.reid_max_travel, cfg.reid_windows)
+            # 同一进程的所有摄像头共用一个调度器，按优先级 / 活跃度 / 延迟目标 / 推理耗时分配推理预算
+            inference_scheduler.configure(budget_ms=cfg.inference_budget_ms)
+            self.register_schedule()
         except Exception as e:
             print(f"❌ 初始化失败: {e}")
 
         # 自动加载默认视频源
-        default_source = sys_config.get("rtsp_url")
+        default_source = profile.source
         if default_source and default_source != "0" and default_source.strip() != "":
             self.load_video_source(default_source)
 
 
+    def apply_settings(self, settings, changed):
+        """全局配置变更回调 (GUI 线程)：只重建受影响的部分"""
+        self.settings = settings
+        if changed & {"congestion_window", "congestion_min_duration"}:
+            self.congestion = None
+        if changed & {"alert_rate", "alert_burst"}:
+            self.alert_engine = AlertEngine(rate=settings.alert_rate, burst=settings.alert_burst)
+        if changed & {"reid_threshold", "reid_max_travel", "reid_windows"}:
+            reid_service.configure(settings.reid_threshold, settings.reid_max_travel, settings.reid_windows)
+        if changed & {"precision", "channels_last", "compile_model"}:
+            self.detector.set_precision(settings.precision, settings.channels_last, settings.compile_model)
+        if "inference_budget_ms" in changed:
+            inference_scheduler.configure(budget_ms=settings.inference_budget_ms)
+
+    def apply_profile(self, camera_ids):
+        """摄像头配置变更回调 (GUI 线程)"""
+        if self.camera_id not in camera_ids:
+            return
+        old, new = self.profile, camera_profiles.get(self.camera_id)
+        self.profile = new
+        changed = {f for f in vars(new) if getattr(old, f) != getattr(new, f)}
+        if changed & {"detect_stride", "adaptive_stride", "max_stride",
+                      "motion_gate", "motion_min_area", "motion_force_every"}:
+            self.detector.configure_sampling(
+                new.detect_stride, new.adaptive_stride, new.max_stride,
+                new.motion_gate, new.motion_min_area, new.motion_force_every,
+            )
+        if "zones" in changed:
+            self.detector.set_zones(new.zones or None)
+            self.congestion = None
+        elif "alarm_threshold" in changed and self.congestion is not None:
+            self.congestion.set_thresholds(self.congestion_thresholds(self.congestion.names[1:]))
+        if "calibration" in changed:
+            self.detector.set_calibration(new.calibration or None)
+        if changed & {"tracker", "track_lost_seconds"}:
+            self.detector.set_tracker(new.tracker, new.track_lost_seconds)
+            # 新追踪器的 ID 从 1 重新编号，进行中的出行到此结束
+            self.db.od.add_trips(self.camera_id, self.od_tracker.flush())
+            # reset_state 把帧计数清零，video_ts 会从 0 重新开始，拥堵窗口要跟着重建
+            self.congestion = None
+        if "reid" in changed:
+            self.detector.set_reid(new.reid)
+        if changed & {"imgsz", "adaptive_imgsz", "imgsz_min", "imgsz_max"}:
+            self.detector.set_resolution(new.imgsz, new.adaptive_imgsz, (new.imgsz_min, new.imgsz_max))
+        if changed & {"priority", "latency_slo_ms", "detect_stride"}:
+            self.register_schedule()
+
+    def register_schedule(self):
+        """向调度器登记本路摄像头 (优先级 / 延迟目标 / 配置步长 / 视频源帧率变化时重新登记)"""
+        profile = self.profile
+        inference_scheduler.register(
+            self.camera_id, priority=profile.priority, slo_ms=profile.latency_slo_ms,
+            base_stride=profile.detect_stride, fps=self.detector.fps,
+        )
+
+    def open_calibration(self):
+        """在当前画面上标定测速区域 (保存后经 apply_profile 生效)"""
+        # 直接从视频源取一帧原始画面 (显示的画面已经叠加了检测框)
+        ret, frame = self.cap.read() if self.cap and self.cap.isOpened() else (False, None)
+        if not ret:
+            QMessageBox.information(self, "提示", "请先导入视频源，再进行标定")
+            return
+        CalibrationDialog(frame, self.camera_id, self).exec_()
+
     def open_file(self):
         path, _ = QFileDialog.getOpenFileName(self, "选择视频", "./data", "Videos (*.mp4 *.avi)")
         if path:
@@ -206,6 +330,9 @@ class MonitorPage(QWidget):
     # 🟢 [提取] 独立的视频加载函数
     def load_video_source(self, path):
         if self.cap: self.cap.release()
+        self.congestion = None
+        if self.od_tracker is not None and hasattr(self, 'db'):
+            self.db.od.add_trips(self.camera_id, self.od_tracker.flush())
 
         # 尝试打开
         if path.isdigit():
@@ -226,10 +353,33 @@ class MonitorPage(QWidget):
             self.slider_video.setEnabled(False)  # 直播流不可拖动
 
         if self.cap.isOpened():
+            self._open_ring()
+            # 测速 / 追踪参数按视频源的实际帧率换算
+            if hasattr(self, 'detector'):
+                self.detector.set_stream_fps(self.cap.get(cv2.CAP_PROP_FPS))
+                self.register_schedule()
             self.video_label.setText(f"✅ Ready: {os.path.basename(path)}")
         else:
             self.video_label.setText("❌ Failed to open source")
 
+    def _open_ring(self):
+        """按视频源分辨率重建共享内存帧缓冲 (槽位 = 录像预录帧数 + 余量)；建不出来时退回普通 numpy 帧"""
+        w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 1920
+        h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 1080
+        saver = getattr(self, 'saver', None)
+        if saver is not None:
+            saver.set_ring(None)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        try:
+            slots = (saver.max_cache_frames if saver is not None else 150) + 8
+            self.ring = FrameRing(slots, (h, w, 3))
+        except OSError as e:
+            print(f"⚠️ 共享内存帧缓冲创建失败，使用普通帧: {e}")
+        if saver is not None:
+            saver.set_ring(self.ring)
+
     def toggle_video(self):
         if not self.cap: return
         if self.is_running:
@@ -260,7 +410,11 @@ class MonitorPage(QWidget):
             if not self.cap or not self.cap.isOpened(): return
             if self.is_slider_pressed: return
 
-            ret, frame = self.cap.read()
+            # 直接解码进共享内存槽位，这份引用交给录像缓存 (检测在录像缓存持有期间原地读写这一帧)
+            if self.ring is not None:
+                ret, handle, frame = read_frame(self.cap, self.ring, self.camera_id, self.frame_counter)
+            else:
+                (ret, frame), handle = self.cap.read(), None
             if not ret:
                 self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                 return
@@ -276,27 +430,38 @@ class MonitorPage(QWidget):
                 sec = curr_pos / fps
                 self.lbl_time_curr.setText(f"{int(sec // 60):02d}:{int(sec % 60):02d}")
 
-            self.saver.update_frame(frame)
+            if self.ring is None:
+                self.saver.update_frame(frame)
+            elif handle is not None:
+                self.saver.update_frame(handle)
 
-            # 获取设置
-            use_sahi_btn = sys_config.get("use_sahi", False)
-            speed_limit = sys_config.get("speed_limit", 60)
+            # 获取本路摄像头的设置 (快照，不做字典查找)
+            profile = self.profile
+            use_sahi_btn = profile.use_sahi
+            speed_limit = profile.speed_limit
 
             # 🟢 [修改] 增加跳帧逻辑：每 10 帧才允许跑一次 SAHI
             # 如果电脑配置低，把这个数字改大（比如 30）
+            # 推理预算不够时调度器会先关掉低权重摄像头的 SAHI
             real_use_sahi = False
-            if use_sahi_btn:
-                if self.frame_counter % 10 == 0:
+            schedule = self.detector.schedule
+            if use_sahi_btn and (schedule is None or schedule.allow_sahi):
+                if self.frame_counter % profile.sahi_every == 0:
                     real_use_sahi = True
                     print(f"⚡ 第 {self.frame_counter} 帧：尝试高精度检测...")  # 打印日志看看卡不卡
 
             # 计时，看看检测花了多久
             t1 = time.time()
-            processed_frame, stats = self.detector.process_frame(
-                frame,
-                use_sahi_override=real_use_sahi,
-                speed_limit=speed_limit
-            )
+            if handle is not None:
+                processed_frame, stats = self.detector.process_handle(
+                    self.ring, handle, use_sahi_override=real_use_sahi, speed_limit=speed_limit
+                )
+            else:
+                processed_frame, stats = self.detector.process_frame(
+                    frame,
+                    use_sahi_override=real_use_sahi,
+                    speed_limit=speed_limit
+                )
             t2 = time.time()
             if real_use_sahi and (t2 - t1) > 0.5:
                 print(f"⚠️ SAHI 检测耗时: {t2 - t1:.2f}秒 (如果这个时间太长，界面就会卡)")
@@ -306,10 +471,51 @@ class MonitorPage(QWidget):
             curr = stats.get('current_people', 0)
             self.lbl_curr.setText(str(curr))
 
-            limit = sys_config.get("alarm_threshold", 10)
+            # 计数写入时序统计 (内存按秒聚合，不阻塞画面)
+            self.db.stats.record(
+                self.camera_id,
+                in_per_class=stats.get('in_per_class'),
+                out_per_class=stats.get('out_per_class'),
+                present_per_class=stats.get('present_per_class'),
+            )
+
+            # 轨迹 (框底边中点)，内存缓冲后按段写库
+            detections = stats.get('detections')
+            if detections is not None and len(detections) > 0:
+                xyxy = detections.xyxy
+                self.db.tracks.record(
+                    self.camera_id, detections.tracker_id, detections.class_id,
+                    np.stack([(xyxy[:, 0] + xyxy[:, 2]) / 2, xyxy[:, 3]], axis=1),
+                    epoch=stats.get('track_epoch', 0),
+                )
+
+            # 闸口事件 + OD 出行 (出行结束后才累加进 OD 缓存)
+            now = time.time()
+            gate_events = stats.get('gate_events', [])
+            epoch = stats.get('track_epoch', 0)
+            self.db.od.record_crossings(self.camera_id, gate_events, now, epoch=epoch)
+            trips = self.od_tracker.update(gate_events, now, epoch=epoch)
+            if trips:
+                self.db.od.add_trips(self.camera_id, trips)
+
+            # 区域停留记录 (视频时间换算为当前时间)
+            visits = stats.get('zone_visits')
+            if visits:
+                self.record_zone_visits(visits, time.time() - stats.get('video_ts', 0.0), epoch=epoch)
+
+            # 拥堵：按窗口平均密度判定，只在进入拥堵的那一刻报警
             alerts = stats.get('alerts', [])
-            if curr > limit: alerts.append(f"拥堵: {curr}辆")
-            if len(alerts) > 0: self.trigger_alert(alerts, processed_frame)
+            occupancy = stats.get('zones', {}).get('polygons', {})
+            if self.congestion is None:
+                self.congestion = self.build_congestion(list(occupancy))
+            for ev in self.congestion.update([curr] + list(occupancy.values()), stats.get('video_ts', 0.0)):
+                if ev['state'] == 'start':
+                    alerts.append(Alert("congestion", self.camera_id, zone=ev['zone'], value=ev['level']))
+                else:
+                    print(f"✅ 拥堵解除: {ev['zone']} (持续 {ev['duration']:.0f} 秒)")
+            if alerts:
+                _, incident, is_new = self.alert_engine.submit(alerts)
+                if is_new: self.trigger_alert(incident, processed_frame)
 
             self.display_image(processed_frame)
 
@@ -324,35 +530,81 @@ class MonitorPage(QWidget):
             except:
                 pass
 
-    def trigger_alert(self, alert_msgs, current_frame):
-        if self.saver.is_recording: return
-        print(f"🚨 {alert_msgs}")
+    def congestion_thresholds(self, zone_names):
+        """全画面用 alarm_threshold，各区域用区域配置里的 congestion_threshold (未配置则不判拥堵)"""
+        polygons = self.profile.zones.get("polygons", [])
+        per_zone = {pg.get("name"): pg.get("congestion_threshold") for pg in polygons}
+        return [self.profile.alarm_threshold] + [per_zone.get(name) for name in zone_names]
+
+    def build_congestion(self, zone_names):
+        fps = (self.cap.get(cv2.CAP_PROP_FPS) if self.cap else 0) or 30
+        return CongestionDetector(
+            ["全画面"] + zone_names,
+            self.congestion_thresholds(zone_names),
+            window=fps * self.settings.congestion_window,
+            min_duration=self.settings.congestion_min_duration,
+        )
+
+    def record_zone_visits(self, visits, time_offset, epoch=0):
+        self.db.insert_zone_visits_async(self.camera_id, visits, time_offset=time_offset)
+
+        # 停留过久 (如装卸区占道) 单独记一条事件
+        dwell_limit = self.settings.dwell_alert_seconds
+        if not dwell_limit:
+            return
+        alerts = [Alert("dwell", self.camera_id, track_id=tid, value=dwell, zone=zone, class_id=cid, epoch=epoch)
+                  for zone, tid, cid, _, _, dwell in visits if dwell >= dwell_limit]
+        passed, _, _ = self.alert_engine.submit(alerts, aggregate=False)
+        for alert in passed:
+            self.db.insert_event_async(
+                Event(event_type="Dwell", camera_id=self.camera_id, description=alert.message),
+                on_done=lambda _id: self.new_record_signal.emit()
+            )
 
+    def trigger_alert(self, incident, current_frame):
+        """新的报警事件：截图 + 录像，录像结束后把期间合并进来的所有报警写成一条记录"""
+        print(f"🚨 {incident.describe()}")
+
+        # 截图交给后台写线程，GUI 线程不做磁盘 IO (current_frame 是共享内存视图，槽位随时会被复用，先拷贝)
         snapshot_name = f"snap_{int(time.time())}.jpg"
         snapshot_path = os.path.join(os.path.abspath("snapshots"), snapshot_name)
-        cv2.imwrite(snapshot_path, current_frame)
-
-        def on_record_finished(saved_video_path):
-            try:
-                if not self.isVisible() and not self.video_label: return
-            except RuntimeError:
-                return
-
+        self.db.save_snapshot_async(snapshot_path, current_frame.copy())
+
+        # 录像回调在录像线程里触发，只发信号，关闭事件 / 写库都回到 GUI 线程做 (AlertEngine 不是线程安全的)
+        context = {'incident': incident, 'snapshot_path': snapshot_path}
+        self.saver.start_recording(
+            duration=10,
+            on_finish=lambda path: self.record_finished_signal.emit(context, path),
+            on_error=lambda reason: self.record_finished_signal.emit(context, None),
+        )
+
+    def on_record_finished(self, context, saved_video_path):
+        """录像结束 (GUI 线程)：关闭报警事件，把期间合并进来的所有报警写成一条记录；录像失败时也要关闭"""
+        if context.get('done'):
+            return
+        context['done'] = True
+        incident = context['incident']
+        self.alert_engine.close_incident(incident)
+        if saved_video_path:
             print(f"💾 [回调] 录像文件已就绪: {saved_video_path}")
-            try:
-                new_event = Event(
-                    event_type="Traffic Alert",
-                    camera_id="CAM_01",
-                    description=str(alert_msgs),
-                    video_path=saved_video_path
-                )
-                self.db.insert_event(new_event)
-                print("✅ 事件已存入数据库")
-                self.new_record_signal.emit()
-            except Exception as e:
-                print(f"❌ 数据库存储失败: {e}")
+        else:
+            print("⚠️ 录像失败，事件不附带录像")
+
+        def on_event_saved(new_id):
+            print(f"✅ 事件已存入数据库 (id={new_id})")
+            self.new_record_signal.emit()
 
-        self.saver.start_recording(duration=10, on_finish=on_record_finished)
+        try:
+            new_event = Event(
+                event_type="Traffic Alert",
+                camera_id=self.camera_id,
+                description=incident.describe(),
+                snapshot_path=context['snapshot_path'],
+                video_path=saved_video_path or ""
+            )
+            self.db.insert_event_async(new_event, on_done=on_event_saved)
+        except Exception as e:
+            print(f"❌ 数据库存储失败: {e}")
 
     def display_image(self, img):
         if img is None: return
@@ -395,4 +647,11 @@ class MonitorPage(QWidget):
         if self.zoom_level == 1.0: self.offset_x, self.offset_y = 0, 0
 
     def closeEvent(self, event):
-        if self.cap: self.cap.release()
\ No newline at end of file
+        if self.cap: self.cap.release()
+        if self.ring is not None:
+            self.saver.set_ring(None)
+            self.ring.close()
+            self.ring = None
+        inference_scheduler.unregister(self.camera_id)
+        self._unsubscribe_config()
+        self._unsubscribe_profile()
\ No newline at end of file
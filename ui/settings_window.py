@@ -1,10 +1,10 @@
 # ui/settings_window.py
 import sys
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QLineEdit, QCheckBox, QSpinBox, QPushButton,
+                             QLineEdit, QCheckBox, QSpinBox, QPushButton, QComboBox,
                              QFormLayout, QGroupBox, QMessageBox)
 from PyQt5.QtCore import Qt
-from configs.system_config import sys_config
+from configs.system_config import sys_config, ConfigError, CHOICES
 
 
 class SettingsWindow(QWidget):
@@ -64,6 +64,21 @@ class SettingsWindow(QWidget):
         self.chk_sahi.setStyleSheet("color: #ddd; font-size: 14px;")
         algo_layout.addRow(QLabel("精度模式:"), self.chk_sahi)
 
+        self.combo_tracker = QComboBox()
+        self.combo_tracker.addItems(CHOICES["tracker"])
+        self.combo_tracker.setFixedWidth(150)
+        self.combo_tracker.setStyleSheet("background-color: #333; color: white; padding: 5px;")
+        self.combo_tracker.setToolTip("bytetrack: 默认 / iou: 低功耗 / ocsort: 遮挡多的场景")
+        algo_layout.addRow(QLabel("🎯 目标追踪器:"), self.combo_tracker)
+
+        self.combo_precision = QComboBox()
+        self.combo_precision.addItems(CHOICES["precision"])
+        self.combo_precision.setFixedWidth(150)
+        self.combo_precision.setStyleSheet("background-color: #333; color: white; padding: 5px;")
+        self.combo_precision.setToolTip("fp16: 仅 GPU / bf16: 新款 GPU 或支持 bf16 的 CPU / auto: GPU 用 fp16\n"
+                                        "设备不支持时自动回退 fp32")
+        algo_layout.addRow(QLabel("🧮 推理精度:"), self.combo_precision)
+
         algo_group.setLayout(algo_layout)
         layout.addWidget(algo_group)
 
@@ -108,19 +123,29 @@ class SettingsWindow(QWidget):
         self.setLayout(layout)
 
     def load_settings(self):
-        self.spin_threshold.setValue(int(sys_config.get("alarm_threshold", 20)))
-        self.spin_speed.setValue(int(sys_config.get("speed_limit", 60)))
-        self.chk_sahi.setChecked(bool(sys_config.get("use_sahi", False)))
-        self.input_rtsp.setText(str(sys_config.get("rtsp_url", "0")))
-        self.chk_record.setChecked(bool(sys_config.get("auto_record", False)))
+        cfg = sys_config.settings
+        self.spin_threshold.setValue(cfg.alarm_threshold)
+        self.spin_speed.setValue(cfg.speed_limit)
+        self.chk_sahi.setChecked(cfg.use_sahi)
+        self.combo_tracker.setCurrentText(cfg.tracker)
+        self.combo_precision.setCurrentText(cfg.precision)
+        self.input_rtsp.setText(cfg.rtsp_url)
+        self.chk_record.setChecked(cfg.auto_record)
 
     def save_settings(self):
         try:
-            sys_config.set("alarm_threshold", self.spin_threshold.value())
-            sys_config.set("speed_limit", self.spin_speed.value())
-            sys_config.set("use_sahi", self.chk_sahi.isChecked())
-            sys_config.set("rtsp_url", self.input_rtsp.text().strip())
-            sys_config.set("auto_record", self.chk_record.isChecked())
+            # 一次校验、一次写盘，监控页面通过变更通知拿到新参数
+            sys_config.update({
+                "alarm_threshold": self.spin_threshold.value(),
+                "speed_limit": self.spin_speed.value(),
+                "use_sahi": self.chk_sahi.isChecked(),
+                "tracker": self.combo_tracker.currentText(),
+                "precision": self.combo_precision.currentText(),
+                "rtsp_url": self.input_rtsp.text().strip(),
+                "auto_record": self.chk_record.isChecked(),
+            })
             QMessageBox.information(self, "成功", "✅ 配置已更新！\n监控页面将立即使用新参数。")
+        except ConfigError as e:
+            QMessageBox.warning(self, "参数错误", str(e))
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"保存失败: {str(e)}")
\ No newline at end of file
+            QMessageBox.critical(self, "错误", f"保存失败: {str(e)}")
@@ -0,0 +1,190 @@
+# utils/shm_ring.py
+"""
+共享内存帧环形缓冲 (跨进程传帧不拷贝)
+采集 / 推理 / 录像分别跑在不同进程里时，用队列传 numpy 帧每帧要 pickle 好几 MB。
+这里把帧放进一块 multiprocessing.shared_memory，进程之间只传很小的 FrameHandle。
+
+内存布局：[槽位元数据 (n_slots 条结构化记录)] [n_slots 个定长帧槽位]
+- 每个槽位有引用计数：写入方 reserve/put 时给出下游要消费的次数 refs，
+  每个消费方用完 release 一次，归零后槽位可以被下一帧复用；要转交给更多消费方时先 retain
+- seq 是槽位的写入代数，句柄里也带一份，槽位被重写后旧句柄再访问会抛 StaleHandleError
+- 槽位满了 (下游太慢) 时 reserve 返回 None，由调用方丢帧，实时流不积压
+引用计数的修改由一把 multiprocessing.Lock 保护；帧数据的读写不加锁，
+靠“写完才把句柄发出去、引用没归零就不会被复用”保证一致。
+FrameRing 可以直接作为 Process 的参数传给子进程 (pickle 时只传名字和锁，子进程按名字重新挂载)。
+"""
+import multiprocessing as mp
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_META = np.dtype([
+    ('refs', '<i4'),
+    ('seq', '<i8'),
+    ('frame_index', '<i8'),
+    ('timestamp', '<f8'),
+    ('camera_id', 'S32'),
+    ('shape', '<i4', (3,)),
+], align=True)
+
+# 进程间传递的帧句柄 (元数据冗余一份在句柄里，消费方不用再读共享内存)
+FrameHandle = namedtuple('FrameHandle', 'slot seq camera_id timestamp frame_index shape')
+
+
+class StaleHandleError(RuntimeError):
+    """句柄对应的槽位已被回收重写 (引用计数用错了)"""
+
+
+def _align(n, to=64):
+    return (n + to - 1) // to * to
+
+
+def _attach(name):
+    """
+    按名字挂载已有的共享内存
+    子进程和创建方共用同一个 resource_tracker (重复登记只算一次)，由创建方 unlink 时注销；
+    Python 3.13+ 直接不登记
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class FrameRing:
+    """
+    :param n_slots: 槽位数，要大于 各阶段队列里在途的帧数 + 录像预录缓存的帧数
+    :param max_shape: 单帧最大尺寸 (H, W, C)，uint8
+    :param ctx: multiprocessing 上下文 (锁要和子进程用同一种启动方式创建)
+    """
+
+    def __init__(self, n_slots=32, max_shape=(1080, 1920, 3), ctx=None):
+        self.n_slots = int(n_slots)
+        self.slot_bytes = _align(int(np.prod(max_shape)))
+        self._lock = (ctx or mp).Lock()
+        size = _align(self.n_slots * _META.itemsize) + self.n_slots * self.slot_bytes
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._owner = True
+        self._map()
+        self._meta[:] = np.zeros(1, dtype=_META)
+
+    def _map(self):
+        self._data_offset = _align(self.n_slots * _META.itemsize)
+        self._meta = np.ndarray((self.n_slots,), dtype=_META, buffer=self._shm.buf)
+        self._next = 0      # 下次从哪个槽位开始找空闲
+        self.dropped = 0    # 本进程因槽位不足丢掉的帧数
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __getstate__(self):
+        return {'name': self._shm.name, 'n_slots': self.n_slots, 'slot_bytes': self.slot_bytes,
+                'lock': self._lock}
+
+    def __setstate__(self, state):
+        self.n_slots = state['n_slots']
+        self.slot_bytes = state['slot_bytes']
+        self._lock = state['lock']
+        self._shm = _attach(state['name'])
+        self._owner = False
+        self._map()
+
+    # --- 写入方 ---
+
+    def reserve(self, shape, camera_id="", timestamp=0.0, frame_index=0, refs=1):
+        """
+        占一个空闲槽位，返回 (句柄, 可直接写入的 numpy 视图)；没有空闲槽位时返回 (None, None)
+        refs 是下游要 release 的次数
+        """
+        shape = tuple(int(v) for v in shape)
+        if len(shape) == 2:
+            shape += (1,)
+        if int(np.prod(shape)) > self.slot_bytes:
+            raise ValueError(f"帧尺寸 {shape} 超出槽位容量 {self.slot_bytes} 字节")
+
+        with self._lock:
+            refs_now = self._meta['refs']
+            free = np.flatnonzero(np.roll(refs_now, -self._next) == 0)
+            if not len(free):
+                self.dropped += 1
+                return None, None
+            slot = int((free[0] + self._next) % self.n_slots)
+            self._next = (slot + 1) % self.n_slots
+            meta = self._meta[slot]
+            meta['refs'] = refs
+            meta['seq'] += 1
+            meta['frame_index'] = frame_index
+            meta['timestamp'] = timestamp
+            meta['camera_id'] = str(camera_id).encode()[:32]
+            meta['shape'] = shape
+            seq = int(meta['seq'])
+
+        handle = FrameHandle(slot, seq, str(camera_id), float(timestamp), int(frame_index), shape)
+        return handle, self._view(slot, shape)
+
+    def put(self, frame, camera_id="", timestamp=0.0, frame_index=0, refs=1):
+        """把一帧拷进共享内存 (一次拷贝)，槽位满时返回 None"""
+        handle, view = self.reserve(frame.shape, camera_id, timestamp, frame_index, refs)
+        if handle is not None:
+            view[...] = frame.reshape(view.shape)
+        return handle
+
+    # --- 消费方 ---
+
+    def view(self, handle):
+        """句柄 -> 共享内存里的帧 (不拷贝；release 之后不能再用这个视图)"""
+        if self._meta is None:
+            raise StaleHandleError(f"帧缓冲已关闭 (帧 {handle.frame_index})")
+        if int(self._meta['seq'][handle.slot]) != handle.seq:
+            raise StaleHandleError(f"槽位 {handle.slot} 已被重写 (帧 {handle.frame_index})")
+        frame = self._view(handle.slot, handle.shape)
+        return frame[..., 0] if frame.shape[2] == 1 else frame
+
+    def retain(self, handle, n=1):
+        """转交给更多消费方前增加引用"""
+        with self._lock:
+            meta = self._meta[handle.slot]
+            if int(meta['seq']) != handle.seq or meta['refs'] <= 0:
+                raise StaleHandleError(f"槽位 {handle.slot} 已被回收 (帧 {handle.frame_index})")
+            meta['refs'] += n
+
+    def release(self, handle, n=1):
+        """用完一帧；引用归零后槽位可复用 (缓冲已关闭时什么都不做)"""
+        with self._lock:
+            if self._meta is None:
+                return
+            meta = self._meta[handle.slot]
+            if int(meta['seq']) == handle.seq and meta['refs'] > 0:
+                meta['refs'] = max(int(meta['refs']) - n, 0)
+
+    def _view(self, slot, shape):
+        return np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf,
+                          offset=self._data_offset + slot * self.slot_bytes)
+
+    # --- 管理 ---
+
+    def stats(self):
+        """(在用槽位数, 总槽位数)"""
+        with self._lock:
+            return int(np.count_nonzero(self._meta['refs'])), self.n_slots
+
+    def reset(self):
+        """清空所有引用 (流水线停止、所有消费方都退出后调用)"""
+        with self._lock:
+            self._meta['refs'] = 0
+
+    def close(self):
+        """断开映射；创建方同时删除共享内存 (外部还持有帧视图时无法断开，只打印警告)"""
+        self._meta = None
+        try:
+            self._shm.close()
+        except BufferError:
+            print("⚠️ 共享内存帧还有视图在使用，暂不断开")
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._owner = False
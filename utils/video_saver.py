@@ -7,10 +7,19 @@ from collections import deque
 
 
 class VideoSaver:
-    def __init__(self, save_dir="records", max_cache_frames=150):
+    """
+    报警录像 (预录缓存 + 之后 duration 秒)
+    传了 ring (utils.shm_ring.FrameRing) 时，缓存里存的是共享内存帧句柄而不是 numpy 帧：
+    update_frame 收到的句柄归缓存所有 (调用方已经为它计过一次引用)，挤出缓存时 release；
+    录像线程取帧前先 retain，写完再 release，期间槽位不会被复用。
+    """
+
+    def __init__(self, save_dir="records", max_cache_frames=150, ring=None):
         self.save_dir = save_dir
         self.max_cache_frames = max_cache_frames
         self.frame_buffer = deque(maxlen=max_cache_frames)
+        self.ring = ring
+        self._buffer_lock = threading.Lock()  # 句柄模式下，挤出缓存和录像线程取帧要互斥
         self.is_recording = False
         self._ensure_dir()
 
@@ -19,13 +28,66 @@ class VideoSaver:
             os.makedirs(self.save_dir)
 
     def update_frame(self, frame):
+        """frame: numpy 帧，或 ring 模式下的 FrameHandle"""
         if frame is None: return
-        self.frame_buffer.append(frame)
+        if self.ring is None:
+            self.frame_buffer.append(frame)
+            return
+        with self._buffer_lock:
+            evicted = self.frame_buffer[0] if len(self.frame_buffer) == self.max_cache_frames else None
+            self.frame_buffer.append(frame)
+        if evicted is not None:
+            self.ring.release(evicted)
+
+    def clear(self):
+        """清空预录缓存 (换源 / 停止时调用，ring 模式下归还所有槽位)"""
+        with self._buffer_lock:
+            items = list(self.frame_buffer)
+            self.frame_buffer.clear()
+        if self.ring is not None:
+            for handle in items:
+                self.ring.release(handle)
+
+    def set_ring(self, ring):
+        """切换帧来源 (换视频源时共享内存按新分辨率重建)，旧缓存先归还"""
+        self.clear()
+        with self._buffer_lock:
+            self.ring = ring
+
+    def _snapshot(self, last_only=False):
+        """
+        取缓存里的帧 (ring 模式下先 retain，用完交给 _done 归还)
+        返回 (ring, items)：句柄只对取出它的那个 ring 有效，录像途中换源后也要拿原来的 ring 取帧/归还
+        """
+        with self._buffer_lock:
+            ring = self.ring
+            items = list(self.frame_buffer)[-1:] if last_only else list(self.frame_buffer)
+            if ring is not None:
+                for handle in items:
+                    ring.retain(handle)
+        return ring, items
+
+    @staticmethod
+    def _frame(ring, item):
+        return item if ring is None else ring.view(item)
+
+    @staticmethod
+    def _done(ring, items):
+        if ring is not None:
+            for handle in items:
+                ring.release(handle)
 
     # 🟢 [关键修改] 增加 on_finish 参数
-    def start_recording(self, duration=10, filename=None, on_finish=None):
+    def start_recording(self, duration=10, filename=None, on_finish=None, on_error=None):
+        """
+        后台录制 (预录缓存 + 之后 duration 秒)
+        :param on_finish: 文件关闭后回调 on_finish(filepath) (在录像线程里调用)
+        :param on_error: 没录成时回调 on_error(原因)，包括正在录制中被跳过的情况
+        """
         if self.is_recording:
             print("⚠️ 正在录制中，跳过本次请求")
+            if on_error:
+                on_error("正在录制中")
             return None
 
         if filename is None:
@@ -37,42 +99,51 @@ class VideoSaver:
         # 启动线程，把 on_finish 传进去
         t = threading.Thread(
             target=self._record_process,
-            args=(filepath, duration, on_finish)
+            args=(filepath, duration, on_finish, on_error)
         )
         t.start()
         return filepath
 
-    # 🟢 [关键修改] 接收 on_finish
-    def _record_process(self, filepath, duration, on_finish):
+    # 🟢 [关键修改] 接收 on_finish / on_error
+    def _record_process(self, filepath, duration, on_finish, on_error=None):
+        error = None
         try:
             self.is_recording = True
             print(f"🎥 [后台] 开始录制: {filepath}")
 
-            current_buffer = list(self.frame_buffer)
+            ring, current_buffer = self._snapshot()
             if not current_buffer:
-                print("❌ 缓存为空，无法录制")
-                self.is_recording = False
+                error = "缓存为空，无法录制"
                 return
 
-            h, w, _ = current_buffer[0].shape
-            # 使用 mp4v 编码，兼容性较好
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            out = cv2.VideoWriter(filepath, fourcc, 30.0, (w, h))
+            try:
+                h, w = self._frame(ring, current_buffer[0]).shape[:2]
+                # 使用 mp4v 编码，兼容性较好
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                out = cv2.VideoWriter(filepath, fourcc, 30.0, (w, h))
 
-            if not out.isOpened():
-                print("❌ 无法创建视频文件，请检查路径或权限")
-                self.is_recording = False
-                return
+                if not out.isOpened():
+                    error = "无法创建视频文件，请检查路径或权限"
+                    return
 
-            # 1. 写入过去的缓存
-            for frame in current_buffer:
-                out.write(frame)
+                # 1. 写入过去的缓存
+                for item in current_buffer:
+                    out.write(self._frame(ring, item))
+            finally:
+                self._done(ring, current_buffer)
 
             # 2. 写入未来的画面
             start_time = time.time()
             while time.time() - start_time < duration:
-                if self.frame_buffer:
-                    out.write(self.frame_buffer[-1])
+                latest_ring, latest = self._snapshot(last_only=True)
+                try:
+                    if latest_ring is not ring:
+                        # 录像途中换了视频源 (分辨率可能不同)，只保留换源之前的部分
+                        break
+                    if latest:
+                        out.write(self._frame(ring, latest[0]))
+                finally:
+                    self._done(latest_ring, latest)
                 time.sleep(0.03)  # 模拟 30FPS
 
             out.release()
@@ -84,5 +155,10 @@ class VideoSaver:
                 on_finish(filepath)
 
         except Exception as e:
-            print(f"❌ 录像线程出错: {e}")
+            error = f"录像线程出错: {e}"
+        finally:
             self.is_recording = False
+            if error is not None:
+                print(f"❌ {error}")
+                if on_error:
+                    on_error(error)